@@ -0,0 +1,87 @@
+"""Per-note memory: the former dict-based Note vs the slotted Note with integer timestamps"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Optional
+
+from models import Note
+
+
+class DictNote:
+    """Note model as it was before __slots__ (date kept as a formatted string)"""
+
+    def __init__(self, content: str, title: str = "", note_id: Optional[int] = None, date: Optional[str] = None):
+        self.id = note_id
+        self.title = title
+        self.content = content
+        self.date = date if date else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DictNote':
+        return cls(
+            content=data.get("content", ""),
+            title=data.get("title", ""),
+            note_id=data.get("id"),
+            date=data.get("date")
+        )
+
+
+def make_payloads(count: int, seed: int = 1):
+    """Encoded records as stored on disk (titles and contents repeat, dates do not)"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    titles = [f"Not {i}" for i in range(100)]
+    contents = [f"İçerik {i} " * 10 for i in range(100)]
+    return [
+        json.dumps({
+            "id": note_id,
+            "title": titles[note_id % 100],
+            "content": contents[note_id % 100],
+            "date": (start + timedelta(seconds=rng.randint(0, 60 * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+        }, ensure_ascii=False)
+        for note_id in range(1, count + 1)
+    ]
+
+
+def measure(build, payloads) -> float:
+    """Bytes per note still held after decoding payloads and building notes"""
+    # Share title/content strings between notes so only the per-note overhead counts
+    strings = {}
+
+    def decode(payload):
+        data = json.loads(payload)
+        data["title"] = strings.setdefault(data["title"], data["title"])
+        data["content"] = strings.setdefault(data["content"], data["content"])
+        return data
+
+    gc.collect()
+    tracemalloc.start()
+    notes = build(decode(payload) for payload in payloads)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del notes
+    gc.collect()
+    return retained / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of notes")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.count)
+    before = measure(lambda items: [DictNote.from_dict(data) for data in items], payloads)
+    after = measure(Note.from_dicts, payloads)
+
+    print(f"{args.count} notes (per-note objects, date and list slot; title/content excluded)")
+    print(f"{'model':<28}{'bytes/note':>12}{'total MiB':>12}")
+    print(f"{'dict Note, string date':<28}{before:>12.1f}{before * args.count / 2**20:>12.1f}")
+    print(f"{'slotted Note, int timestamp':<28}{after:>12.1f}{after * args.count / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
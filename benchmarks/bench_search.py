@@ -0,0 +1,79 @@
+"""Search latency: linear filter_notes_by_query vs the word and trigram indexes"""
+import argparse
+import random
+import time
+
+from models import Note
+from search_index import SearchIndex, TrigramIndex
+from utils import filter_notes_by_query
+
+WORDS = (
+    "not toplantı alışveriş proje fikir günlük yapılacak kitap film müzik "
+    "meeting shopping project idea daily todo book movie music travel "
+    "python encryption storage search index tab window keyboard shortcut"
+).split()
+
+QUERIES = ["proj", "ış", "music", "zzz", "daily todo", "ta", "encryption storage"]
+
+
+def make_notes(count: int, seed: int = 1):
+    """Synthetic notes with a Zipf-like word mix and some unique words"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    notes = []
+    for note_id in range(1, count + 1):
+        words = rng.choices(WORDS, weights, k=rng.randint(5, 60))
+        words.append(f"kelime{rng.randint(0, count)}")
+        notes.append(Note(
+            content=" ".join(words),
+            title=" ".join(rng.choices(WORDS, weights, k=3)),
+            note_id=note_id
+        ))
+    return notes
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """Fastest run in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="Comma-separated note counts")
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        notes = make_notes(size)
+        indexes = {}
+        build_times = []
+        for name, index_class in (("word", SearchIndex), ("trigram", TrigramIndex)):
+            start = time.perf_counter()
+            indexes[name] = index_class(notes)
+            build_times.append(f"{name} {(time.perf_counter() - start) * 1000:.0f} ms")
+        print(f"\n{size} notes (index build: {', '.join(build_times)})")
+        print(f"{'query':<22}{'matches':>9}{'scan ms':>10}{'word ms':>10}{'trigram ms':>12}")
+
+        for query in QUERIES:
+            scan_ms = best_of(lambda: filter_notes_by_query(notes, query), repeat=3)
+            word = indexes["word"]
+            # Drop the typing cache so every run does the full lookup
+            word_ms = best_of(lambda: (setattr(word, "_last_query", None), word.search(query)))
+            trigram_ms = best_of(lambda: indexes["trigram"].search(query))
+            matches = len(filter_notes_by_query(notes, query))
+            assert matches == len(word.search(query)) == len(indexes["trigram"].search(query))
+            print(f"{query!r:<22}{matches:>9}{scan_ms:>10.2f}{word_ms:>10.3f}{trigram_ms:>12.3f}")
+
+        # Updating one note after a save
+        note = notes[size // 2]
+        note.content += " yeni kelime"
+        for name, index in indexes.items():
+            print(f"update one note ({name}): {best_of(lambda: index.update(note)):.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Save and load time of the record store: JSON metadata (before) vs binary metadata (after)"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from body_cache import BodyCache
+from compression import Compressor
+from encryption import KeyManager
+from models import Note
+from record_store import CODEC_BINARY, CODEC_PACKED, RecordStore
+
+WORDS = (
+    "not toplantı alışveriş proje fikir günlük yapılacak kitap film müzik "
+    "meeting shopping project idea daily todo book movie music travel"
+).split()
+
+FORMATS = [("json", CODEC_PACKED), ("binary", CODEC_BINARY)]
+
+
+def make_notes(count: int, seed: int = 1):
+    """Synthetic notes; a quarter are untitled so their records carry a preview"""
+    rng = random.Random(seed)
+    return [
+        Note(
+            content=" ".join(rng.choices(WORDS, k=rng.randint(5, 80))),
+            title="" if note_id % 4 == 0 else " ".join(rng.choices(WORDS, k=3)),
+            note_id=note_id
+        )
+        for note_id in range(1, count + 1)
+    ]
+
+
+def run(notes, codec: int, keys: KeyManager, directory: Path) -> dict:
+    """Time a full save, a lazy load (what load_notes does) and a full load"""
+    path = directory / f"notes-{codec}.nsr"
+    store = RecordStore(path, keys, Compressor("zlib"))
+    store.write_codec = codec
+
+    start = time.perf_counter()
+    store.save(notes)
+    save_ms = (time.perf_counter() - start) * 1000
+
+    reader = RecordStore(path, keys)
+    start = time.perf_counter()
+    reader.load(bodies=BodyCache(reader.read_body, keys))
+    lazy_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    RecordStore(path, keys).load()
+    full_ms = (time.perf_counter() - start) * 1000
+
+    return {"save": save_ms, "lazy": lazy_ms, "full": full_ms, "size": path.stat().st_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="Comma-separated note counts")
+    args = parser.parse_args()
+
+    # A password-derived key, so the user's key file is never touched
+    keys = KeyManager(password="benchmark")
+    keys.unlock()
+
+    print(f"{'notes':>8} {'format':<8}{'save ms':>10}{'load ms':>10}{'full ms':>10}{'KiB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(size) for size in args.sizes.split(",")):
+            notes = make_notes(count)
+            for name, codec in FORMATS:
+                result = run(notes, codec, keys, Path(directory))
+                print(
+                    f"{count:>8} {name:<8}{result['save']:>10.1f}{result['lazy']:>10.1f}"
+                    f"{result['full']:>10.1f}{result['size'] / 1024:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmark suite: storage, encryption, search and tab updates from 100 to 1M notes
+
+Results are written as JSON (one entry per case and size) so runs of
+different versions can be compared:
+
+    python -m benchmarks.bench_suite --output before.json
+    python -m benchmarks.bench_suite --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.corpus import CONTENTS, MIXES, TITLES, generate_notes
+from benchmarks.headless import fake_app
+from body_cache import BodyCache
+from compression import Compressor
+from config import (
+    APP_VERSION, BODY_CACHE_BYTES, BODY_CACHE_ENTRIES, COMPRESSION, COMPRESSION_DICTIONARY, COMPRESSION_LEVEL,
+    JOURNAL_COMPACT_BYTES, JOURNAL_COMPACT_ENTRIES, JOURNAL_ENABLED, JOURNAL_SYNC_INTERVAL_MS
+)
+from encryption import KeyManager, decrypt_data, encrypt_data
+from main import DesktopApp
+from models import NoteCollection, now_timestamp
+from storage_backend import FileBackend, StorageBackend
+from ui.components import get_tab_label
+from utils import filter_notes_by_query
+
+DEFAULT_SIZES = "100,1000,10000,100000,1000000"
+QUERIES = ["proj", "ış", "İstanbul", "kelime1", "zzz", "ta", "📝"]
+# Share of notes edited before the incremental save
+EDIT_SHARE = 0.01
+
+CASES = [
+    "save_notes", "load_notes", "save_notes_incremental", "encrypt_data", "decrypt_data",
+    "filter_notes_by_query", "get_tab_label", "update_tabs_initial", "update_tabs_unchanged",
+    "update_tabs_highlight",
+]
+
+
+def timed(func, repeat: int) -> list:
+    """Run func repeat times, returning each run in milliseconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - start) * 1000)
+    return runs
+
+
+@contextmanager
+def isolated_backend(directory: Path, keys: KeyManager, backend: str):
+    """
+    A storage backend in directory and its body cache, configured like the app's
+
+    The backend is built here rather than through the storage module, whose
+    load_notes creates the data directory and looks for notes to migrate,
+    so the user's notes and key file are never touched.
+    """
+    if backend == "sqlite":
+        from sqlite_backend import SqliteBackend
+        store = SqliteBackend(directory / "notes.db", keys)
+    else:
+        store = FileBackend(
+            directory / "notes.nsr",
+            directory / "notes.journal",
+            journal_enabled=JOURNAL_ENABLED,
+            sync_interval=JOURNAL_SYNC_INTERVAL_MS / 1000,
+            compact_entries=JOURNAL_COMPACT_ENTRIES,
+            compact_bytes=JOURNAL_COMPACT_BYTES,
+            keys=keys,
+            compressor=Compressor(COMPRESSION, COMPRESSION_LEVEL) if COMPRESSION != "none" else None,
+            train_dictionary=COMPRESSION_DICTIONARY
+        )
+    try:
+        yield store, BodyCache(store.read_body, keys, BODY_CACHE_ENTRIES, BODY_CACHE_BYTES)
+    finally:
+        store.close()
+
+
+def load_collection(store: StorageBackend, bodies: BodyCache) -> NoteCollection:
+    """What storage.load_notes does once there is nothing left to migrate"""
+    collection = NoteCollection(store.load(bodies=bodies), next_id=store.next_id, bodies=bodies)
+    store.adopt(collection)
+    return collection
+
+
+def bench_storage(notes, keys: KeyManager, backend: str, repeat: int) -> dict:
+    """Full save into an empty store, lazy load, then a save of a few edited notes"""
+    results = {"save_notes": [], "load_notes": [], "save_notes_incremental": []}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            with isolated_backend(Path(directory), keys, backend) as (store, _):
+                results["save_notes"] += timed(lambda: store.save(notes), 1)
+            with isolated_backend(Path(directory), keys, backend) as (store, bodies):
+                loaded = []
+                results["load_notes"] += timed(lambda: loaded.append(load_collection(store, bodies)), 1)
+                collection = loaded[0]
+                step = max(1, int(1 / EDIT_SHARE))
+                for note in list(collection)[::step]:
+                    collection.update(note.id, content=note.content + " düzenlendi", timestamp=now_timestamp())
+                results["save_notes_incremental"] += timed(lambda: store.save(collection), 1)
+    return results
+
+
+def bench_encryption(notes, keys: KeyManager, repeat: int) -> dict:
+    """encrypt_data/decrypt_data of the notes as one JSON document (the legacy notes.json layout)"""
+    document = json.dumps([note.to_dict() for note in notes], ensure_ascii=False)
+    token = encrypt_data(document, keys.key)
+    return {
+        "encrypt_data": timed(lambda: encrypt_data(document, keys.key), repeat),
+        "decrypt_data": timed(lambda: decrypt_data(token, keys.key), repeat),
+    }
+
+
+def bench_search(notes, repeat: int) -> dict:
+    """Linear filter_notes_by_query over every query in QUERIES"""
+    def run():
+        for query in QUERIES:
+            filter_notes_by_query(notes, query)
+    return {"filter_notes_by_query": timed(run, repeat)}
+
+
+def bench_tabs(notes, repeat: int) -> dict:
+    """Tab labels and headless DesktopApp._update_tabs_with_notes"""
+    results = {"get_tab_label": timed(lambda: [get_tab_label(note) for note in notes], repeat)}
+    matched = {note.id for note in notes[::7]}
+    initial, unchanged, highlight = [], [], []
+    for _ in range(repeat):
+        app = fake_app(len(notes))
+        initial += timed(lambda: DesktopApp._update_tabs_with_notes(app, notes), 1)
+        unchanged += timed(lambda: DesktopApp._update_tabs_with_notes(app, notes), 1)
+        highlight += timed(lambda: DesktopApp._update_tabs_with_notes(app, notes, matched), 1)
+    results.update(update_tabs_initial=initial, update_tabs_unchanged=unchanged, update_tabs_highlight=highlight)
+    return results
+
+
+def run_size(count: int, args, keys: KeyManager) -> list:
+    """Every selected case at one corpus size"""
+    notes = generate_notes(count, args.mix, args.titles, args.contents, args.seed)
+    results = {}
+    selected = set(args.cases)
+    if selected & {"save_notes", "load_notes", "save_notes_incremental"}:
+        results.update(bench_storage(notes, keys, args.backend, args.repeat))
+    if selected & {"encrypt_data", "decrypt_data"}:
+        results.update(bench_encryption(notes, keys, args.repeat))
+    if "filter_notes_by_query" in selected:
+        results.update(bench_search(notes, args.repeat))
+    if selected & {"get_tab_label", "update_tabs_initial", "update_tabs_unchanged", "update_tabs_highlight"}:
+        results.update(bench_tabs(notes, args.repeat))
+    return [
+        {"case": case, "notes": count, "best_ms": min(runs), "runs_ms": runs}
+        for case, runs in results.items()
+        if case in selected
+    ]
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Cases that got slower than the baseline by more than tolerance (a fraction)"""
+    before = {(entry["case"], entry["notes"]): entry["best_ms"] for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = before.get((entry["case"], entry["notes"]))
+        if old and entry["best_ms"] > old * (1 + tolerance):
+            regressions.append({**entry, "baseline_ms": old, "ratio": entry["best_ms"] / old})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated note counts")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases to run")
+    parser.add_argument("--mix", default="mixed", choices=sorted(MIXES), help="Unicode mix of the corpus")
+    parser.add_argument("--titles", default="mixed", choices=sorted(TITLES), help="Title distribution")
+    parser.add_argument("--contents", default="mixed", choices=sorted(CONTENTS), help="Content length distribution")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (the best one is reported)")
+    parser.add_argument("--backend", default="file", choices=["file", "sqlite"], help="Storage backend")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+    args.cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    # A password-derived key, so the user's key file is never touched
+    keys = KeyManager(password="benchmark")
+    keys.unlock()
+
+    results = []
+    for count in (int(size) for size in args.sizes.split(",")):
+        print(f"{count} notes...", file=sys.stderr)
+        results += run_size(count, args, keys)
+
+    report = {
+        "version": APP_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"mix": args.mix, "titles": args.titles, "contents": args.contents, "seed": args.seed},
+        "backend": args.backend,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for entry in regressions:
+            print(
+                f"slower: {entry['case']} at {entry['notes']} notes: "
+                f"{entry['baseline_ms']:.1f} -> {entry['best_ms']:.1f} ms ({entry['ratio']:.2f}x)",
+                file=sys.stderr
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Synthetic note corpora for benchmarks: sizes, Unicode mixes and title/content distributions"""
+import random
+from typing import List
+
+from models import Note
+
+_ASCII_WORDS = (
+    "meeting shopping project idea daily todo book movie music travel python "
+    "encryption storage search index window keyboard shortcut release budget "
+    "report draft review call email plan notes weekend garden recipe"
+).split()
+
+# Includes ı/İ and ş/ğ, whose case mapping differs from ASCII
+_TURKISH_WORDS = (
+    "not toplantı alışveriş proje fikir günlük yapılacak kitap film müzik "
+    "İstanbul Iğdır ılık ışık çiçek şeker ğ öğrenci üzüm çalışma görüşme "
+    "hafta sonu bütçe rapor taslak inceleme arama plan yemek tarifi bahçe"
+).split()
+
+_OTHER_WORDS = (
+    "naïve café Größe straße Ελλάδα данные 東京 メモ 데이터 ملاحظة"
+).split()
+
+_EMOJI = "📝 ✅ 🚀 🔥 💡 📌 🎉 ⚠️ 👍🏽 👨‍👩‍👧 🇹🇷".split()
+
+# Word pools and weights of each Unicode mix
+MIXES = {
+    "ascii": ((_ASCII_WORDS, 1.0),),
+    "turkish": ((_TURKISH_WORDS, 1.0),),
+    "mixed": ((_ASCII_WORDS, 0.45), (_TURKISH_WORDS, 0.45), (_OTHER_WORDS, 0.05), (_EMOJI, 0.05)),
+    "emoji": ((_ASCII_WORDS, 0.5), (_EMOJI, 0.5)),
+}
+
+# Title distributions: (share untitled, share repeating an earlier title, words per title)
+TITLES = {
+    "short": (0.0, 0.0, (1, 3)),
+    "long": (0.0, 0.0, (5, 12)),
+    "untitled": (1.0, 0.0, (0, 0)),
+    "duplicate": (0.1, 0.5, (1, 3)),
+    "mixed": (0.25, 0.1, (1, 6)),
+}
+
+# Content distributions: (median words, spread of the log-normal, max words)
+CONTENTS = {
+    "short": (12, 0.5, 60),
+    "medium": (80, 0.8, 2000),
+    "long": (600, 0.6, 20000),
+    "mixed": (40, 1.2, 20000),
+}
+
+
+def _word_source(mix: str, rng: random.Random):
+    """Function returning k words drawn from mix"""
+    pools = MIXES[mix]
+    words = [word for pool, _ in pools for word in pool]
+    # Zipf-like within each pool, scaled by the pool's share
+    weights = [
+        share / (rank + 1) / sum(1 / (r + 1) for r in range(len(pool)))
+        for pool, share in pools
+        for rank in range(len(pool))
+    ]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return lambda k: rng.choices(words, cum_weights=cumulative, k=k)
+
+
+def generate_notes(count: int, mix: str = "mixed", titles: str = "mixed", contents: str = "mixed",
+                   seed: int = 1) -> List[Note]:
+    """
+    Build a reproducible corpus
+
+    Args:
+        count: Number of notes
+        mix: Unicode mix (key of MIXES)
+        titles: Title distribution (key of TITLES)
+        contents: Content length distribution (key of CONTENTS)
+        seed: Random seed; the same arguments always give the same notes
+
+    Returns:
+        Notes with ids 1..count and timestamps spread over about two years
+    """
+    rng = random.Random(seed)
+    words = _word_source(mix, rng)
+    untitled, repeated, (min_title, max_title) = TITLES[titles]
+    median, sigma, max_words = CONTENTS[contents]
+    base = 1_700_000_000
+    notes = []
+    used_titles = []
+    for note_id in range(1, count + 1):
+        length = min(max_words, max(1, int(rng.lognormvariate(0, sigma) * median)))
+        # Unique words keep searches from matching everything
+        body = words(length)
+        body.append(f"kelime{rng.randint(0, count)}")
+        content = " ".join(body)
+        if rng.random() < 0.2:
+            content = content.replace(" ", "\n", rng.randint(1, 5))
+
+        roll = rng.random()
+        if roll < untitled:
+            title = ""
+        elif used_titles and roll < untitled + repeated:
+            title = rng.choice(used_titles)
+        else:
+            title = " ".join(words(rng.randint(min_title, max_title)))
+            used_titles.append(title)
+
+        notes.append(Note(
+            content=content,
+            title=title,
+            note_id=note_id,
+            timestamp=base + rng.randint(0, 63_000_000)
+        ))
+    return notes
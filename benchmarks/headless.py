@@ -0,0 +1,102 @@
+"""Widget stand-ins for timing the tab code without a display"""
+from types import SimpleNamespace
+
+from config import NOTE_LIST_ROW_HEIGHT, NOTE_LIST_VISIBLE_ROWS
+from ui.components import use_note_list
+from ui.note_list import VirtualNoteList
+
+
+class FakeWidget:
+    """Accepts the configure/place calls the tab code makes and counts them"""
+
+    def __init__(self, height: int = 0):
+        self.height = height
+        self.calls = 0
+
+    def configure(self, **kwargs):
+        self.calls += 1
+
+    def place(self, **kwargs):
+        self.calls += 1
+
+    def place_forget(self):
+        self.calls += 1
+
+    def set(self, first, last):
+        pass
+
+    def winfo_height(self) -> int:
+        return self.height
+
+
+class FakeSegmentedButton:
+    """The parts of CTkSegmentedButton that reconcile_tabs reads"""
+
+    def __init__(self):
+        self._value_list = []
+        self._buttons_dict = {}
+
+
+class FakeTabview:
+    """CTkTabview with the insert/delete/rename/move API but no widgets behind it"""
+
+    def __init__(self):
+        self._segmented_button = FakeSegmentedButton()
+        self.tab_references = {}
+        self.tab_highlights = set()
+
+    def insert(self, index: int, name: str):
+        if name in self._segmented_button._buttons_dict:
+            raise ValueError(f"CTkTabview already has tab named '{name}'")
+        self._segmented_button._value_list.insert(index, name)
+        self._segmented_button._buttons_dict[name] = FakeWidget()
+        return SimpleNamespace()
+
+    def delete(self, name: str):
+        if name not in self._segmented_button._buttons_dict:
+            raise ValueError(f"CTkTabview has no tab named '{name}'")
+        self._segmented_button._value_list.remove(name)
+        del self._segmented_button._buttons_dict[name]
+
+    def rename(self, old_name: str, new_name: str):
+        values = self._segmented_button._value_list
+        values[values.index(old_name)] = new_name
+        buttons = self._segmented_button._buttons_dict
+        buttons[new_name] = buttons.pop(old_name)
+
+    def move(self, index: int, name: str):
+        values = self._segmented_button._value_list
+        values.remove(name)
+        values.insert(index, name)
+
+
+def fake_note_list() -> VirtualNoteList:
+    """VirtualNoteList whose frame, rows and scrollbar are FakeWidgets"""
+    note_list = VirtualNoteList.__new__(VirtualNoteList)
+    note_list.on_tab_select = None
+    note_list.on_delete = None
+    note_list.row_height = NOTE_LIST_ROW_HEIGHT
+    note_list.tab_references = {}
+    note_list.tab_highlights = set()
+    note_list._entries = []
+    note_list._index_by_name = {}
+    note_list._current_name = ""
+    note_list._first = 0
+    note_list._rows = [FakeWidget() for _ in range(NOTE_LIST_VISIBLE_ROWS)]
+    note_list._row_states = [None] * NOTE_LIST_VISIBLE_ROWS
+    note_list._menu_note_id = None
+    note_list._body = FakeWidget(NOTE_LIST_ROW_HEIGHT * NOTE_LIST_VISIBLE_ROWS)
+    note_list._scrollbar = FakeWidget()
+    return note_list
+
+
+def fake_app(note_count: int) -> SimpleNamespace:
+    """
+    Enough of a DesktopApp for DesktopApp._update_tabs_with_notes
+
+    Args:
+        note_count: Number of notes, which picks the tab strip or the note list
+            the way create_note_tabs does
+    """
+    notebook = fake_note_list() if use_note_list(note_count) else FakeTabview()
+    return SimpleNamespace(notebook=notebook)
@@ -0,0 +1,132 @@
+"""Bounded cache of decrypted note bodies"""
+import io
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from encryption import KeyManager, get_key_manager
+
+
+class _CachedBody:
+    """A decrypted body and the ciphertext it came from"""
+
+    __slots__ = ("sealed", "body", "size")
+
+    def __init__(self, sealed: Optional[bytes], body: str):
+        self.sealed = sealed
+        self.body = body
+        self.size = sys.getsizeof(body)
+
+
+class BodyCache:
+    """
+    LRU cache of decrypted note contents
+
+    A body is decrypted on first access, either from the record file (via
+    loader) or from the sealed copy a note holds after it was edited. When
+    the cache exceeds max_entries or max_bytes the least recently used
+    plaintext is dropped; its ciphertext stays in the note or on disk.
+    """
+
+    def __init__(self, loader: Callable[[int], str], keys: Optional[KeyManager] = None,
+                 max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            loader: Reads and decrypts the stored body of a note id
+            keys: Key manager to seal edited bodies with (shared default if None)
+            max_entries: Number of bodies kept
+            max_bytes: Memory the kept bodies may use
+        """
+        self.loader = loader
+        self.keys = keys if keys is not None else get_key_manager()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bodies: Dict[int, _CachedBody] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def get(self, note_id: int, sealed: Optional[bytes] = None, keep: bool = True) -> str:
+        """
+        Body of a note, decrypting it if it is not cached
+
+        Args:
+            note_id: Note ID
+            sealed: Ciphertext returned by seal (None to read the stored body)
+            keep: Cache the body on a miss (False for one-off bulk reads)
+
+        Returns:
+            Note content
+        """
+        with self._lock:
+            entry = self._bodies.get(note_id)
+            if entry is not None and entry.sealed is sealed:
+                self._bodies.move_to_end(note_id)
+                self.hits += 1
+                return entry.body
+            self.misses += 1
+
+        if sealed is not None:
+            body = b"".join(self.keys.decrypt_stream(io.BytesIO(sealed))).decode('utf-8')
+        else:
+            body = self.loader(note_id)
+        if keep:
+            self._store(note_id, _CachedBody(sealed, body))
+        return body
+
+    def seal(self, note_id: int, body: str) -> bytes:
+        """
+        Encrypt an edited body and cache its plaintext
+
+        Returns:
+            Ciphertext to keep in the note
+        """
+        sealed = b"".join(self.keys.encrypt_stream([body.encode('utf-8')]))
+        self._store(note_id, _CachedBody(sealed, body))
+        return sealed
+
+    def discard(self, note_id: int):
+        """Drop a cached body (e.g. after the note was deleted)"""
+        with self._lock:
+            entry = self._bodies.pop(note_id, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def clear(self):
+        """Drop every cached body"""
+        with self._lock:
+            self._bodies.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters and current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._bodies),
+                "bytes": self._size,
+            }
+
+    def _store(self, note_id: int, entry: _CachedBody):
+        """Insert an entry and evict least recently used ones over the limits"""
+        with self._lock:
+            previous = self._bodies.pop(note_id, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._bodies[note_id] = entry
+            self._size += entry.size
+            # The newest entry is always kept, even if it alone exceeds max_bytes
+            while len(self._bodies) > 1 and (
+                len(self._bodies) > self.max_entries or self._size > self.max_bytes
+            ):
+                _, evicted = self._bodies.popitem(last=False)
+                self._size -= evicted.size
+                self.evictions += 1
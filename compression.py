@@ -0,0 +1,146 @@
+"""Compression stage between serialization and encryption"""
+import lzma
+import re
+import struct
+import zlib
+from collections import Counter
+from typing import Iterable, Mapping, Optional
+
+# First byte of every compressed payload
+METHOD_RAW = 0  # Stored as is (compression did not help)
+METHOD_ZLIB = 1  # Raw deflate
+METHOD_LZMA = 2  # .lzma container (records its own dictionary size)
+METHOD_ZLIB_DICT = 3  # Raw deflate with a preset dictionary, followed by its id
+
+_DICT_ID = struct.Struct(">I")
+_DEFLATE_WBITS = -15  # No zlib header or checksum; the container authenticates anyway
+
+DICTIONARY_SIZE = 16 * 1024
+# Words with their trailing whitespace (dictionary candidates)
+_FRAGMENT = re.compile(rb"\S+\s*")
+
+
+class CompressionError(Exception):
+    """Raised when a payload uses an unknown method or a missing dictionary"""
+
+
+def dictionary_id(dictionary: bytes) -> int:
+    """Id stored with payloads compressed against dictionary"""
+    return zlib.crc32(dictionary)
+
+
+class Compressor:
+    """
+    Compresses payloads and prefixes them with the method used
+
+    Payloads that do not get smaller are stored raw, so compressing never
+    costs more than one byte. With a dictionary (zlib only) small payloads
+    that share vocabulary with it compress as well.
+    """
+
+    def __init__(self, method: str = "zlib", level: int = 6, dictionary: Optional[bytes] = None):
+        """
+        Args:
+            method: "zlib", "lzma" or "none"
+            level: Compression level (zlib 0-9, lzma preset 0-9)
+            dictionary: Preset dictionary (zlib only, see train_dictionary)
+        """
+        if method not in ("zlib", "lzma", "none"):
+            raise ValueError(f"Unknown compression method: {method!r}")
+        self.method = method
+        self.level = level
+        self.dictionary = dictionary if method == "zlib" else None
+        self._dictionary_id = dictionary_id(dictionary) if self.dictionary else None
+
+    @property
+    def uses_dictionaries(self) -> bool:
+        """Whether a trained dictionary would be used"""
+        return self.method == "zlib"
+
+    def with_dictionary(self, dictionary: Optional[bytes]) -> 'Compressor':
+        """Same settings, compressing against dictionary (None for no dictionary)"""
+        return Compressor(self.method, self.level, dictionary)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compressed payload with its method prefix"""
+        if self.method == "zlib":
+            if self.dictionary:
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, _DEFLATE_WBITS, zdict=self.dictionary)
+                packed = (
+                    bytes((METHOD_ZLIB_DICT,)) + _DICT_ID.pack(self._dictionary_id)
+                    + compressor.compress(data) + compressor.flush()
+                )
+            else:
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, _DEFLATE_WBITS)
+                packed = bytes((METHOD_ZLIB,)) + compressor.compress(data) + compressor.flush()
+        elif self.method == "lzma":
+            packed = bytes((METHOD_LZMA,)) + lzma.compress(data, format=lzma.FORMAT_ALONE, preset=self.level)
+        else:
+            packed = None
+
+        if packed is None or len(packed) > len(data):
+            return bytes((METHOD_RAW,)) + data
+        return packed
+
+
+def decompress(payload: bytes, dictionaries: Mapping[int, bytes] = None) -> bytes:
+    """
+    Undo Compressor.compress
+
+    Args:
+        payload: Compressed payload with its method prefix
+        dictionaries: Known dictionaries by dictionary_id
+
+    Raises:
+        CompressionError: If the method is unknown or the dictionary is missing
+    """
+    if not payload:
+        raise CompressionError("Empty payload")
+    method = payload[0]
+    if method == METHOD_RAW:
+        return payload[1:]
+    if method == METHOD_ZLIB:
+        return zlib.decompress(payload[1:], _DEFLATE_WBITS)
+    if method == METHOD_LZMA:
+        return lzma.decompress(payload[1:], format=lzma.FORMAT_ALONE)
+    if method == METHOD_ZLIB_DICT:
+        dict_id, = _DICT_ID.unpack_from(payload, 1)
+        dictionary = (dictionaries or {}).get(dict_id)
+        if dictionary is None:
+            raise CompressionError(f"Unknown compression dictionary: {dict_id:08x}")
+        decompressor = zlib.decompressobj(_DEFLATE_WBITS, zdict=dictionary)
+        return decompressor.decompress(payload[1 + _DICT_ID.size:]) + decompressor.flush()
+    raise CompressionError(f"Unknown compression method: {method}")
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Build a preset dictionary from sample payloads
+
+    Words (with their trailing whitespace) and pairs of words that occur in
+    more than one place are ranked by the bytes they would save; the best
+    ones are packed into at most size bytes, most valuable last, since
+    deflate encodes matches near the end of the dictionary most cheaply.
+
+    Returns:
+        Dictionary bytes (empty if the samples have nothing in common)
+    """
+    counts = Counter()
+    for sample in samples:
+        fragments = _FRAGMENT.findall(sample)
+        counts.update(fragment for fragment in fragments if len(fragment) > 3)
+        counts.update(first + second for first, second in zip(fragments, fragments[1:]))
+
+    ranked = sorted(
+        ((count - 1) * len(fragment), fragment)
+        for fragment, count in counts.items()
+        if count > 1 and len(fragment) < 256
+    )
+    chosen = []
+    used = 0
+    for _, fragment in reversed(ranked):
+        if used + len(fragment) > size:
+            continue
+        chosen.append(fragment)
+        used += len(fragment)
+    return b"".join(reversed(chosen))
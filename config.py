@@ -6,7 +6,68 @@ APP_NAME = "NoteStack"
 APP_VERSION = "1.0.2"
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 800
-MAX_NOTE_LENGTH = 5000
+# Longest note in characters; bodies are loaded into the editor in pieces,
+# EDITOR_FIRST_CHUNK_CHARS right away and the rest in EDITOR_CHUNK_CHARS
+# pieces whenever Tk is idle, for up to EDITOR_CHUNK_BUDGET_MS at a time
+MAX_NOTE_LENGTH = 64 * 1024 * 1024
+EDITOR_FIRST_CHUNK_CHARS = 16 * 1024
+EDITOR_CHUNK_CHARS = 64 * 1024
+EDITOR_CHUNK_BUDGET_MS = 12
+# Text boxes of recently opened notes are kept (with cursor, scroll position
+# and undo history) up to this many notes and this estimated memory use
+EDITOR_CACHE_ENTRIES = 8
+EDITOR_CACHE_BYTES = 64 * 1024 * 1024
+
+# Search index: "trigram" (fast for any query) or "word" (less memory)
+SEARCH_INDEX = "trigram"
+# Search runs in the background once the query is unchanged for this long
+SEARCH_DEBOUNCE_MS = 150
+
+# Note bodies are decrypted on first access; the most recently used ones
+# stay cached up to these limits (the rest is kept only encrypted)
+BODY_CACHE_ENTRIES = 256
+BODY_CACHE_BYTES = 16 * 1024 * 1024
+
+# Storage backend: "file" (encrypted record file and journal) or "sqlite"
+# (encrypted rows in an SQLite database with an FTS5 search index)
+STORAGE_BACKEND = "file"
+
+# Records are compressed before encryption: "zlib", "lzma" or "none", at
+# COMPRESSION_LEVEL (0-9). With COMPRESSION_DICTIONARY a dictionary trained
+# on the notes is stored once, so short notes compress too (zlib only)
+COMPRESSION = "zlib"
+COMPRESSION_LEVEL = 6
+COMPRESSION_DICTIONARY = True
+
+# Background saving: saves within the debounce window are written once
+SAVE_DEBOUNCE_MS = 300
+SAVE_QUEUE_SIZE = 64
+# Autosave of the note on screen: runs when Tk is idle after AUTOSAVE_DELAY_MS
+# without edits, and at least every AUTOSAVE_MAX_DELAY_MS while typing on
+AUTOSAVE_ENABLED = True
+AUTOSAVE_DELAY_MS = 1500
+AUTOSAVE_MAX_DELAY_MS = 10000
+
+# Write-ahead journal: saves append small encrypted entries that are folded
+# back into the record file in the background
+JOURNAL_ENABLED = True
+JOURNAL_SYNC_INTERVAL_MS = 200
+JOURNAL_COMPACT_ENTRIES = 500
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+
+# Note list: "tabs" (one tab per note), "list" (scrolling list that only
+# creates widgets for visible rows) or "auto" (list above the threshold)
+NOTE_LIST_MODE = "auto"
+NOTE_LIST_AUTO_THRESHOLD = 100
+NOTE_LIST_ROW_HEIGHT = 28
+NOTE_LIST_VISIBLE_ROWS = 6
+# Pointer motion over the tab strip is hit-tested at most this often
+HOVER_THROTTLE_MS = 30
+
+# Instrumentation: timers, counters and histograms of the hot paths, shown
+# behind the ⚙️ button and appended to METRICS_FILE as JSON lines on exit.
+# The NOTESTACK_METRICS environment variable ("1" or "0") overrides this
+METRICS_ENABLED = False
 
 def get_app_data_dir() -> Path:
     """Get application data directory based on platform (returns Path object to avoid redirection)"""
@@ -22,6 +83,10 @@ def get_app_data_dir() -> Path:
 # Centralized path management - all paths as Path objects
 # All file operations should use these Path objects to avoid Windows Store Python redirection
 DATA_DIR: Path = get_app_data_dir()
-NOTES_FILE: Path = DATA_DIR / "notes.json"
+NOTES_FILE: Path = DATA_DIR / "notes.json"  # Legacy single-blob store (migrated on load)
+RECORDS_FILE: Path = DATA_DIR / "notes.nsr"
+JOURNAL_FILE: Path = DATA_DIR / "notes.journal"
+SQLITE_FILE: Path = DATA_DIR / "notes.db"
 KEY_FILE: Path = DATA_DIR / ".key"
+METRICS_FILE: Path = DATA_DIR / "metrics.jsonl"
 
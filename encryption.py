@@ -1,12 +1,33 @@
 """Simple encryption utilities for note storage"""
 import os
+import struct
+import threading
+from functools import lru_cache
 from pathlib import Path
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, Optional
 import base64
 from config import KEY_FILE
+from metrics import metrics
+from startup_profile import startup_profile
+
+# cryptography is imported on first use so that importing this module (and
+# the storage layer on top of it) stays cheap
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Chunked stream container: header, then chunks that are each sealed with
+# AES-GCM under their own nonce (prefix + counter). The chunk header and a
+# final-chunk flag are authenticated, so reordering or truncation is detected.
+STREAM_MAGIC = b"NSTSTR"
+STREAM_VERSION = 1
+STREAM_CHUNK_SIZE = 64 * 1024
+# magic, version, chunk size, nonce prefix
+_STREAM_HEADER = struct.Struct(">6sBI8s")
+# sealed chunk length, final flag
+_CHUNK_HEADER = struct.Struct(">IB")
+_TAG_SIZE = 16
+_MAX_CHUNKS = 2 ** 32
 
 
 def get_or_create_key(password: str = None) -> bytes:
@@ -19,10 +40,11 @@ def get_or_create_key(password: str = None) -> bytes:
     Returns:
         Encryption key as bytes
     """
-    from config import DATA_DIR
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    
     if password:
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        
         # Derive key from password
         salt = b'notestack_salt_2025'  # Fixed salt for simplicity
         kdf = PBKDF2HMAC(
@@ -39,12 +61,263 @@ def get_or_create_key(password: str = None) -> bytes:
         with KEY_FILE.open('rb') as f:
             return f.read()
     
+    from cryptography.fernet import Fernet
     key = Fernet.generate_key()
+    KEY_FILE.parent.mkdir(parents=True, exist_ok=True)
     with KEY_FILE.open('wb') as f:
         f.write(key)
     return key
 
 
+class KeyLockedError(Exception):
+    """Raised when encrypting or decrypting with a locked KeyManager"""
+
+
+class StreamFormatError(Exception):
+    """Raised when a stream container is truncated, tampered with or not a stream"""
+
+
+def is_stream(data: bytes) -> bool:
+    """Check whether data starts with a stream container header"""
+    return data[:len(STREAM_MAGIC)] == STREAM_MAGIC
+
+
+def _derive_subkey(key: bytes, info: bytes) -> bytes:
+    """32-byte key for a separate purpose, derived from the Fernet key"""
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=info,
+        backend=default_backend()
+    )
+    return hkdf.derive(base64.urlsafe_b64decode(key))
+
+
+def _derive_stream_key(key: bytes) -> 'AESGCM':
+    """AES-GCM cipher for stream containers, derived from the Fernet key"""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM(_derive_subkey(key, b"notestack-stream-v1"))
+
+
+def _read_exact(reader: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes or fail on a truncated stream"""
+    data = reader.read(size)
+    if len(data) != size:
+        raise StreamFormatError("Stream is truncated")
+    return data
+
+
+def _encrypt_stream(aead: 'AESGCM', chunks: Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    """Yield the container header followed by sealed fixed-size chunks"""
+    prefix = os.urandom(8)
+    header = _STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, chunk_size, prefix)
+    yield header
+    
+    def seal(counter: int, piece: bytes, final: bool) -> bytes:
+        if counter >= _MAX_CHUNKS:
+            raise StreamFormatError("Stream is too long")
+        chunk_header = _CHUNK_HEADER.pack(len(piece) + _TAG_SIZE, final)
+        nonce = prefix + counter.to_bytes(4, "big")
+        with metrics.timer("crypto.seal_chunk"):
+            return chunk_header + aead.encrypt(nonce, piece, header + chunk_header)
+    
+    counter = 0
+    buffer = bytearray()
+    for data in chunks:
+        buffer += data
+        # Always keep the tail back so the last chunk can carry the final flag
+        while len(buffer) > chunk_size:
+            yield seal(counter, bytes(buffer[:chunk_size]), False)
+            del buffer[:chunk_size]
+            counter += 1
+    yield seal(counter, bytes(buffer), True)
+
+
+def _decrypt_stream(aead: 'AESGCM', reader: BinaryIO) -> Iterator[bytes]:
+    """Yield plaintext chunks, reading no further than the final chunk"""
+    from cryptography.exceptions import InvalidTag
+    
+    header = _read_exact(reader, _STREAM_HEADER.size)
+    magic, version, chunk_size, prefix = _STREAM_HEADER.unpack(header)
+    if magic != STREAM_MAGIC:
+        raise StreamFormatError("Not a stream container")
+    if version != STREAM_VERSION:
+        raise StreamFormatError(f"Unsupported stream version: {version}")
+    
+    counter = 0
+    while True:
+        chunk_header = _read_exact(reader, _CHUNK_HEADER.size)
+        length, final = _CHUNK_HEADER.unpack(chunk_header)
+        if length < _TAG_SIZE or length > chunk_size + _TAG_SIZE:
+            raise StreamFormatError("Invalid chunk length")
+        sealed = _read_exact(reader, length)
+        nonce = prefix + counter.to_bytes(4, "big")
+        try:
+            with metrics.timer("crypto.open_chunk"):
+                plaintext = aead.decrypt(nonce, sealed, header + chunk_header)
+        except InvalidTag:
+            raise StreamFormatError("Stream chunk failed authentication") from None
+        yield plaintext
+        if final:
+            return
+        counter += 1
+
+
+@lru_cache(maxsize=4)
+def _fernet_for(key: bytes) -> 'Fernet':
+    """Reusable Fernet instance for an explicitly passed key"""
+    from cryptography.fernet import Fernet
+    return Fernet(key)
+
+
+class KeyManager:
+    """
+    Encryption session: resolves the key once and keeps a reusable cipher
+    
+    The key file is read (or the password derived) on first use only.
+    lock() drops the cipher and overwrites the in-memory key copy; this is
+    best effort, since the cryptography library keeps its own copies.
+    """
+    
+    def __init__(self, password: Optional[str] = None):
+        """
+        Args:
+            password: Optional password to derive key from. If None, uses stored key.
+        """
+        self._lock = threading.Lock()
+        self._password = password
+        self._key: Optional[bytearray] = None
+        self._fernet: Optional['Fernet'] = None
+        self._aead: Optional['AESGCM'] = None
+        # A stored key can be loaded on demand; after an explicit lock() or in
+        # password mode the caller has to unlock() first
+        self._auto_unlock = password is None
+    
+    @property
+    def is_unlocked(self) -> bool:
+        """Whether a key is loaded"""
+        return self._fernet is not None
+    
+    def unlock(self, password: Optional[str] = None):
+        """
+        Resolve the key and build the cipher
+        
+        Args:
+            password: Password to derive the key from (uses stored key or the
+                password given at construction if None)
+        """
+        with self._lock, startup_profile.phase("key load"):
+            from cryptography.fernet import Fernet
+            if password is not None:
+                self._password = password
+            self._wipe()
+            key = get_or_create_key(self._password)
+            self._key = bytearray(key)
+            self._fernet = Fernet(key)
+            self._aead = _derive_stream_key(key)
+            self._auto_unlock = self._password is None
+    
+    def lock(self):
+        """Forget the key and cipher until the next unlock()"""
+        with self._lock:
+            self._wipe()
+            self._password = None
+            self._auto_unlock = False
+    
+    @property
+    def key(self) -> bytes:
+        """The active encryption key"""
+        self._cipher()
+        return bytes(self._key)
+    
+    def derive_key(self, info: bytes) -> bytes:
+        """
+        Key for another purpose (e.g. keyed search tokens), derived from the active key
+        
+        Args:
+            info: Purpose label; different labels give unrelated keys
+        """
+        return _derive_subkey(self.key, info)
+    
+    @metrics.timed("crypto.encrypt")
+    def encrypt(self, data: str) -> bytes:
+        """Encrypt a string"""
+        return self._cipher().encrypt(data.encode('utf-8'))
+    
+    @metrics.timed("crypto.decrypt")
+    def decrypt(self, encrypted_data: bytes) -> str:
+        """Decrypt bytes to string"""
+        return self._cipher().decrypt(encrypted_data).decode('utf-8')
+    
+    def encrypt_stream(self, chunks: Iterable[bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Encrypt a stream of bytes into a chunked container
+        
+        Args:
+            chunks: Plaintext pieces of any size
+            chunk_size: Plaintext bytes per sealed chunk
+        
+        Returns:
+            Iterator over the container bytes
+        """
+        return _encrypt_stream(self._stream_cipher(), chunks, chunk_size)
+    
+    def decrypt_stream(self, reader: BinaryIO) -> Iterator[bytes]:
+        """
+        Decrypt a chunked container, one chunk at a time
+        
+        Args:
+            reader: Binary file-like object positioned at the container start
+        
+        Returns:
+            Iterator over plaintext chunks (raises StreamFormatError on damage)
+        """
+        return _decrypt_stream(self._stream_cipher(), reader)
+    
+    def _cipher(self) -> 'Fernet':
+        """Get the cipher, loading the stored key on first use"""
+        fernet = self._fernet
+        if fernet is None:
+            if not self._auto_unlock:
+                raise KeyLockedError("Encryption key is locked")
+            self.unlock()
+            fernet = self._fernet
+        return fernet
+    
+    def _stream_cipher(self) -> 'AESGCM':
+        """Get the stream cipher, loading the stored key on first use"""
+        self._cipher()
+        aead = self._aead
+        if aead is None:
+            raise KeyLockedError("Encryption key is locked")
+        return aead
+    
+    def _wipe(self):
+        """Overwrite and drop the key (lock held)"""
+        if self._key is not None:
+            for i in range(len(self._key)):
+                self._key[i] = 0
+        self._key = None
+        self._fernet = None
+        self._aead = None
+
+
+_default_manager: Optional[KeyManager] = None
+
+
+def get_key_manager() -> KeyManager:
+    """Get the shared key manager used when no key is passed explicitly"""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = KeyManager()
+    return _default_manager
+
+
 def encrypt_data(data: str, key: bytes = None) -> bytes:
     """
     Encrypt string data
@@ -57,10 +330,8 @@ def encrypt_data(data: str, key: bytes = None) -> bytes:
         Encrypted bytes
     """
     if key is None:
-        key = get_or_create_key()
-    
-    fernet = Fernet(key)
-    return fernet.encrypt(data.encode('utf-8'))
+        return get_key_manager().encrypt(data)
+    return _fernet_for(key).encrypt(data.encode('utf-8'))
 
 
 def decrypt_data(encrypted_data: bytes, key: bytes = None) -> str:
@@ -75,8 +346,5 @@ def decrypt_data(encrypted_data: bytes, key: bytes = None) -> str:
         Decrypted string
     """
     if key is None:
-        key = get_or_create_key()
-    
-    fernet = Fernet(key)
-    return fernet.decrypt(encrypted_data).decode('utf-8')
-
+        return get_key_manager().decrypt(encrypted_data)
+    return _fernet_for(key).decrypt(encrypted_data).decode('utf-8')
@@ -0,0 +1,379 @@
+"""Write-ahead journal for note changes (folded into the record file in the background)"""
+import json
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from encryption import KeyLockedError, KeyManager, get_key_manager
+from models import Note
+from record_store import fingerprint
+
+MAGIC = b"NSTJRN\x00\x01"
+# entry length, entry crc32
+_ENTRY_HEADER = struct.Struct(">II")
+
+
+class JournalError(Exception):
+    """The journal cannot be read (wrong key or damaged entries), as opposed to a torn tail"""
+
+
+def _copy_note(note: Note) -> Note:
+    """Detached copy so later in-place edits don't leak into journaled state"""
+    return note.copy()
+
+
+def _apply_ops(state: Dict[int, Note], order: List[int], ops: List[dict]) -> int:
+    """
+    Apply journal operations to an id -> Note map and its display order
+
+    Returns:
+        Highest note id written by the operations (0 if none)
+    """
+    highest = 0
+    for op in ops:
+        kind = op.get("op")
+        if kind == "put":
+            note = Note.from_dict(op["note"])
+            if note.id not in state:
+                order.append(note.id)
+            state[note.id] = note
+            highest = max(highest, note.id)
+        elif kind == "delete":
+            if state.pop(op["id"], None) is not None:
+                order.remove(op["id"])
+        elif kind == "order":
+            order[:] = [note_id for note_id in op["ids"] if note_id in state]
+    return highest
+
+
+class Journal:
+    """
+    Append-only log of note operations
+
+    Each save_notes call becomes one encrypted entry holding only the notes that
+    were created, changed or deleted. Entries are written immediately and
+    fsynced in batches (group commit); once the journal grows past the
+    configured limits it is folded into a new snapshot on a background thread.
+    """
+
+    def __init__(self, path: Path, snapshot_writer: Callable[[List[Note], int], bool],
+                 sync_interval: float = 0.2, compact_entries: int = 500,
+                 compact_bytes: int = 4 * 1024 * 1024, keys: Optional[KeyManager] = None):
+        """
+        Args:
+            path: Journal file path
+            snapshot_writer: Writes a full list of notes and the id counter as the new snapshot, returns success
+            sync_interval: Seconds to batch appends before fsync
+            compact_entries: Entry count that triggers compaction
+            compact_bytes: Journal size that triggers compaction
+            keys: Key manager to encrypt with (shared default if None)
+        """
+        self.path = Path(path)
+        self.snapshot_writer = snapshot_writer
+        self.sync_interval = sync_interval
+        self.compact_entries = compact_entries
+        self.compact_bytes = compact_bytes
+        self.keys = keys if keys is not None else get_key_manager()
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._state: Dict[int, Note] = {}
+        self._order: List[int] = []
+        self._next_id = 1
+        self._size = 0
+        self._entry_count = 0
+        self._dirty = False
+        self._sync_timer: Optional[threading.Timer] = None
+        self._compaction: Optional[threading.Thread] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the journal has been replayed and accepts appends"""
+        return self._file is not None
+
+    @property
+    def entry_count(self) -> int:
+        """Number of entries not yet folded into the snapshot"""
+        return self._entry_count
+
+    @property
+    def next_id(self) -> int:
+        """Id counter including notes created (and maybe deleted again) since the snapshot"""
+        return self._next_id
+
+    def open(self, snapshot: List[Note], next_id: int = 1) -> List[Note]:
+        """
+        Replay the journal on top of a snapshot and start accepting appends
+
+        Args:
+            snapshot: Notes loaded from the snapshot file
+            next_id: Id counter stored with the snapshot
+
+        Returns:
+            Notes with every journaled change applied
+        """
+        with self._lock:
+            self._close_file()
+            state = {note.id: _copy_note(note) for note in snapshot}
+            order = [note.id for note in snapshot]
+
+            # Raises instead of truncating when intact entries cannot be read
+            entries, good_end = self._read_entries()
+            for ops in entries:
+                next_id = max(next_id, _apply_ops(state, order, ops) + 1)
+
+            if good_end == 0:
+                self._write_file(b"")
+            elif good_end < self.path.stat().st_size:
+                # Drop a torn entry left by a crash mid-append
+                with self.path.open('r+b') as f:
+                    f.truncate(good_end)
+
+            self._state = state
+            self._order = order
+            self._next_id = max(next_id, max(order, default=0) + 1)
+            self._size = max(good_end, len(MAGIC))
+            self._entry_count = len(entries)
+            self._file = self.path.open('ab')
+
+        return [_copy_note(state[note_id]) for note_id in order]
+
+    def record(self, notes: Iterable[Note]) -> int:
+        """
+        Append the difference between notes and the journaled state
+
+        Args:
+            notes: Full ordered list of notes
+
+        Returns:
+            Number of operations appended
+        """
+        with self._lock:
+            ops = []
+            order = []
+            new_ids = []
+            for note in notes:
+                order.append(note.id)
+                previous = self._state.get(note.id)
+                if previous is None or fingerprint(previous) != fingerprint(note):
+                    if previous is None:
+                        new_ids.append(note.id)
+                        self._next_id = max(self._next_id, note.id + 1)
+                    self._state[note.id] = _copy_note(note)
+                    ops.append({"op": "put", "note": note.to_dict()})
+
+            live = set(order)
+            for note_id in [note_id for note_id in self._order if note_id not in live]:
+                del self._state[note_id]
+                ops.append({"op": "delete", "id": note_id})
+
+            # Appends and removals replay on their own; only explicit reorders need an entry
+            expected = [note_id for note_id in self._order if note_id in live] + new_ids
+            if expected != order:
+                ops.append({"op": "order", "ids": order})
+            self._order = order
+
+            if not ops:
+                return 0
+
+            self._append(ops)
+
+        if self._should_compact():
+            self.compact()
+        return len(ops)
+
+    def get(self, note_id: int) -> Optional[Note]:
+        """Copy of the journaled state of a note (None if there is none)"""
+        with self._lock:
+            note = self._state.get(note_id)
+            return _copy_note(note) if note is not None else None
+
+    def iter_notes(self) -> List[Note]:
+        """Copies of the journaled notes in display order"""
+        with self._lock:
+            return [_copy_note(self._state[note_id]) for note_id in self._order]
+
+    def put(self, note: Note):
+        """Append a single note (added at the end if it is new)"""
+        with self._lock:
+            if note.id not in self._state:
+                self._order.append(note.id)
+                self._next_id = max(self._next_id, note.id + 1)
+            self._state[note.id] = _copy_note(note)
+            self._append([{"op": "put", "note": note.to_dict()}])
+
+        if self._should_compact():
+            self.compact()
+
+    def delete(self, note_id: int) -> bool:
+        """
+        Append the removal of a single note
+
+        Returns:
+            True if the note was in the journaled state
+        """
+        with self._lock:
+            if self._state.pop(note_id, None) is None:
+                return False
+            self._order.remove(note_id)
+            self._append([{"op": "delete", "id": note_id}])
+
+        if self._should_compact():
+            self.compact()
+        return True
+
+    def adopt(self, notes: Iterable[Note]):
+        """
+        Swap journaled copies for copies of equivalent notes
+        
+        Used after the loaded notes were attached to a body cache, so the
+        journal does not keep plaintext copies of their content.
+        """
+        with self._lock:
+            for note in notes:
+                previous = self._state.get(note.id)
+                if previous is not None and fingerprint(previous) == fingerprint(note):
+                    self._state[note.id] = _copy_note(note)
+
+    def sync(self):
+        """Flush pending appends to disk"""
+        with self._lock:
+            self._sync_timer = None
+            if self._dirty and self._file:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def compact(self, wait: bool = False):
+        """
+        Fold the journal into a new snapshot
+
+        Args:
+            wait: Run on the calling thread instead of in the background
+        """
+        with self._lock:
+            if self._compaction is not None or self._entry_count == 0:
+                return
+            notes = [self._state[note_id] for note_id in self._order]
+            next_id = self._next_id
+            cutoff = self._size
+            folded = self._entry_count
+            self._compaction = threading.current_thread() if wait else threading.Thread(
+                target=lambda: self._run_compaction(notes, next_id, cutoff, folded), daemon=True
+            )
+            worker = self._compaction
+
+        if wait:
+            self._run_compaction(notes, next_id, cutoff, folded)
+        else:
+            worker.start()
+
+    def close(self):
+        """Wait for compaction, fsync and close the journal"""
+        worker = self._compaction
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+        self.sync()
+        with self._lock:
+            if self._sync_timer:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._close_file()
+
+    def _append(self, ops: List[dict]):
+        """Write one encrypted entry and schedule the group fsync (lock held)"""
+        payload = json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+        token = self.keys.encrypt(payload)
+        self._file.write(_ENTRY_HEADER.pack(len(token), zlib.crc32(token)) + token)
+        self._file.flush()
+        self._size += _ENTRY_HEADER.size + len(token)
+        self._entry_count += 1
+        self._dirty = True
+
+        if self._sync_timer is None:
+            self._sync_timer = threading.Timer(self.sync_interval, self.sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _should_compact(self) -> bool:
+        """Check whether the journal has grown past its limits"""
+        return self._entry_count >= self.compact_entries or self._size >= self.compact_bytes
+
+    def _run_compaction(self, notes: List[Note], next_id: int, cutoff: int, folded: int):
+        """Write the snapshot, then drop the journal prefix it covers"""
+        try:
+            if not self.snapshot_writer(notes, next_id):
+                return
+            with self._lock:
+                self._close_file()
+                with self.path.open('rb') as f:
+                    f.seek(cutoff)
+                    tail = f.read()
+                # Replaying already-folded entries is harmless, so a crash
+                # between the snapshot and this rewrite loses nothing
+                self._write_file(tail)
+                self._size = len(MAGIC) + len(tail)
+                self._entry_count -= folded
+                self._file = self.path.open('ab')
+        finally:
+            self._compaction = None
+
+    def _read_entries(self) -> tuple:
+        """
+        Decode all intact entries
+
+        Only a short or CRC-mismatched entry counts as a torn tail; an entry
+        that is intact but cannot be decrypted means a wrong key or tampering,
+        so nothing may be dropped.
+
+        Returns:
+            (ops per entry, end of last intact entry or 0 if there is no journal yet)
+
+        Raises:
+            JournalError: The file is not a journal or an intact entry cannot be decrypted
+            KeyLockedError: The key manager is locked
+        """
+        if not self.path.exists():
+            return [], 0
+
+        data = self.path.read_bytes()
+        if not data.startswith(MAGIC):
+            if len(data) < len(MAGIC) and MAGIC.startswith(data):
+                # Cut off while the file was first written
+                return [], 0
+            raise JournalError("Not a NoteStack journal")
+
+        entries = []
+        position = len(MAGIC)
+        while position + _ENTRY_HEADER.size <= len(data):
+            length, crc = _ENTRY_HEADER.unpack_from(data, position)
+            start = position + _ENTRY_HEADER.size
+            token = data[start:start + length]
+            if len(token) != length or zlib.crc32(token) != crc:
+                break
+            try:
+                entries.append(json.loads(self.keys.decrypt(token)))
+            except KeyLockedError:
+                raise
+            except Exception as e:
+                raise JournalError(f"Journal entry at offset {position} cannot be read: {e!r}") from e
+            position = start + length
+        return entries, position
+
+    def _write_file(self, body: bytes):
+        """Atomically replace the journal file"""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open('wb') as f:
+            f.write(MAGIC + body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _close_file(self):
+        """Close the append handle (lock held)"""
+        if self._file:
+            self._file.close()
+            self._file = None
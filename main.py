@@ -1,14 +1,29 @@
+# Imported first so the import phase of --startup-profile covers everything below
+from startup_profile import startup_profile
+
+import argparse
+import time
+
 import customtkinter as ctk
-from datetime import datetime
 
-from config import APP_NAME, WINDOW_HEIGHT, WINDOW_WIDTH
-from models import Note
-from storage import load_notes, save_notes
+from config import (
+    APP_NAME, AUTOSAVE_DELAY_MS, AUTOSAVE_ENABLED, AUTOSAVE_MAX_DELAY_MS, METRICS_FILE, SAVE_DEBOUNCE_MS,
+    SAVE_QUEUE_SIZE, SEARCH_DEBOUNCE_MS, SEARCH_INDEX, WINDOW_HEIGHT, WINDOW_WIDTH
+)
+from metrics import metrics
+from models import Note, now_timestamp
+from save_queue import SaveQueue
+from search_index import BackgroundIndex, StoredIndex
+from search_worker import SearchWorker
+from storage import (
+    flush as flush_storage, get_body_cache, has_search_index, load_notes, save_notes, search_notes
+)
 from ui import components
-from ui.components import get_tab_label
-from ui.handlers import clear_text, get_text_content, setup_search_handler, setup_text_handlers
-from ui.tab_handlers import TabHoverHandler, highlight_matching_tabs
-from utils import confirm_delete, filter_notes_by_query, validate_note
+from ui.editor import EditorCache
+from ui.handlers import clear_text, setup_search_handler, setup_text_handlers
+from ui.tab_handlers import TabHoverHandler
+from ui.tab_reconciler import reconcile_tabs
+from utils import confirm_delete, validate_note
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -20,37 +35,71 @@ class DesktopApp:
         self.root.title(APP_NAME)
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.root.minsize(600, 400)
+        startup_profile.mark("window")
         
         self.notes = load_notes()
+        if has_search_index():
+            self.search_index = StoredIndex(search_notes, self.notes)
+        else:
+            # Built in the background: it reads every note body
+            self.search_index = BackgroundIndex(self.notes, SEARCH_INDEX, keep_text=False)
+        self.save_queue = SaveQueue(
+            save_notes,
+            dispatch=lambda callback: self.root.after(0, callback),
+            debounce_ms=SAVE_DEBOUNCE_MS,
+            maxsize=SAVE_QUEUE_SIZE
+        )
+        self.search_worker = SearchWorker(
+            self.search_index.search,
+            dispatch=lambda callback: self.root.after(0, callback),
+            debounce_ms=SEARCH_DEBOUNCE_MS
+        )
+        self.notes.subscribe(self._on_notes_changed)
         self.current_note_id = None
+        # Last search result applied to the tabs, reused when the tabs are refreshed
+        self._search_query = ""
+        self._search_matches = set()
+        self.stats_panel = None
+        self._autosave_job = None
+        self._autosave_started = None  # time.monotonic() of the first unsaved edit
+        startup_profile.mark("load notes")
         self.create_widgets()
         self.setup_tab_hover()
         self.setup_keyboard_shortcuts()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        startup_profile.mark("widget creation")
     
     def create_widgets(self):
         """Create main widgets"""
         self.options_button = components.create_options_button(self.root)
+        self.options_button.configure(command=self.show_stats)
         self.notebook = components.create_note_tabs(
             self.root, 
             self.notes,
             on_tab_select=self.on_tab_select,
-            new_note_command=self.new_note
+            new_note_command=self.new_note,
+            on_delete=self.delete_note
         )
         components.create_title(self.root)
         self.title_input = components.create_title_input(self.root)
-        self.text_input, _ = components.create_text_area(self.root)
-        setup_text_handlers(self.text_input)
+        self.title_input.bind("<KeyRelease>", self._schedule_autosave)
+        text_input, self.text_frame = components.create_text_area(self.root)
+        setup_text_handlers(text_input)
+        self.editors = EditorCache(self._create_text_input, text_input, on_change=self._schedule_autosave)
+        metrics.add_source("editor_cache", self.editors.stats)
         _, self.clear_btn = components.create_buttons(
             self.root,
             save_command=self.save_note,
             clear_command=self.clear_note
         )
-        self.notes_label, _ = components.create_labels(self.root, len(self.notes))
+        self.notes_label, footer = components.create_labels(self.root, len(self.notes))
+        if not AUTOSAVE_ENABLED:
+            footer.configure(text="💡 İpucu: Notlarınızı 💾 Kaydet ile kaydedin")
         self.update_clear_button()
         self.setup_search()
         
         if self.notes:
-            first_note = self.notes[0]
+            first_note = self.notes.first()
             tab_name = None
             for t_name, note_id in self.notebook.tab_references.items():
                 if note_id == first_note.id:
@@ -60,6 +109,22 @@ class DesktopApp:
                 self.notebook.set(tab_name)
                 self.on_tab_select(first_note.id)
     
+    @property
+    def text_input(self):
+        """Text box on screen"""
+        return self.editors.widget
+    
+    @property
+    def editor(self):
+        """Buffer of the text box on screen"""
+        return self.editors.buffer
+    
+    def _create_text_input(self):
+        """Text box for a note opened into the editor cache"""
+        text_input = components.create_text_box(self.text_frame)
+        setup_text_handlers(text_input)
+        return text_input
+    
     def setup_tab_hover(self):
         """Setup hover events for tab context menu"""
         self.tab_hover_handler = TabHoverHandler(
@@ -110,23 +175,28 @@ class DesktopApp:
                     else:
                         self.notebook.clear_filter_btn.configure(state="disabled")
             
+            def on_search_result(query, matched_note_ids):
+                self._search_query = query.strip()
+                self._search_matches = matched_note_ids
+                self._reorder_tabs_with_matches(matched_note_ids)
+            
             def on_search_query(query):
                 if query.strip():
-                    filtered_notes = filter_notes_by_query(self.notes, query)
-                    matched_note_ids = {note.id for note in filtered_notes}
-                    self._reorder_tabs_with_matches(matched_note_ids)
+                    # Searched in the background; only the newest result is applied
+                    self.search_worker.submit(query, on_search_result)
                 else:
+                    self.search_worker.cancel()
+                    self._search_query = ""
+                    self._search_matches = set()
                     self._update_tabs_with_notes(self.notes)
                 update_clear_button_state()
             
-            setup_search_handler(self.notebook.search_entry, on_search_query)
+            on_search = setup_search_handler(self.notebook.search_entry, on_search_query)
             
             if hasattr(self.notebook, 'clear_filter_btn'):
                 def clear_filter():
                     self.notebook.search_entry.delete(0, "end")
-                    self._update_tabs_with_notes(self.notes)
-                    highlight_matching_tabs(self.notebook, self.notebook.tab_references, set())
-                    update_clear_button_state()
+                    on_search()
                 
                 self.notebook.clear_filter_btn.configure(command=clear_filter)
                 self.notebook.clear_filter_btn.configure(state="disabled")
@@ -143,8 +213,7 @@ class DesktopApp:
                 unmatched_notes.append(note)
         
         reordered_notes = matched_notes + unmatched_notes
-        self._update_tabs_with_notes(reordered_notes)
-        highlight_matching_tabs(self.notebook, self.notebook.tab_references, matched_note_ids)
+        self._update_tabs_with_notes(reordered_notes, matched_note_ids)
         
         if matched_notes:
             first_matched_note = matched_notes[0]
@@ -157,82 +226,167 @@ class DesktopApp:
                 self.notebook.set(actual_tab_name)
                 self.on_tab_select(first_matched_note.id)
     
-    def _update_tabs_with_notes(self, notes):
-        """Update tabs with given notes list"""
-        for tab_name in list(self.notebook.tab_references.keys()):
-            try:
-                self.notebook.delete(tab_name)
-            except:
-                pass
-        
-        self.notebook.tab_references = {}
-        used_tab_names = set()
-        
-        for note in notes:
-            base_tab_name = get_tab_label(note)
-            tab_name = base_tab_name
-            
-            counter = 1
-            while tab_name in used_tab_names:
-                tab_name = f"{base_tab_name} ({counter})"
-                counter += 1
-            
-            used_tab_names.add(tab_name)
-            tab_frame = self.notebook.add(tab_name)
-            tab_frame.note_id = note.id
-            self.notebook.tab_references[tab_name] = note.id
-        
-        if hasattr(self.notebook, '_segmented_button'):
-            def on_tab_changed(value=None):
-                selected_tab = value if value else self.notebook.get()
-                if selected_tab and selected_tab in self.notebook.tab_references:
-                    note_id = self.notebook.tab_references[selected_tab]
-                    self.on_tab_select(note_id)
-            
-            self.notebook._segmented_button.configure(command=on_tab_changed)
+    def _update_tabs_with_notes(self, notes, matched_note_ids=()):
+        """Update tabs with given notes list, touching only tabs that changed"""
+        with metrics.timer("ui.update_tabs"):
+            if hasattr(self.notebook, 'reconcile'):
+                changed = self.notebook.reconcile(notes, matched_note_ids)
+            else:
+                changed = reconcile_tabs(self.notebook, notes, matched_note_ids)
         
-        if hasattr(self, 'tab_hover_handler'):
+        if changed and hasattr(self, 'tab_hover_handler'):
             self.tab_hover_handler.reset()
-        
-        highlight_matching_tabs(self.notebook, self.notebook.tab_references, set())
     
     def save_note(self):
         """Save note"""
         title = self.title_input.get().strip()
-        content = get_text_content(self.text_input)
+        content = self.editor.get_content()
         is_valid, error_msg = validate_note(content)
         
         if not is_valid:
             self.notes_label.configure(text=f"❌ {error_msg}")
             return
         
+        self._cancel_autosave()
         if self.current_note_id:
-            note = next((n for n in self.notes if n.id == self.current_note_id), None)
-            if note:
-                note.title = title
-                note.content = content
-                note.date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                save_notes(self.notes)
-                self.notes_label.configure(text=f"Not güncellendi ✓")
-                self.refresh_tabs()
-                self._restore_current_tab_selection()
-                self._restore_search_highlights()
+            if self.current_note_id in self.notes:
+                if self._update_current_note(title, content):
+                    self.notes_label.configure(text=f"Not güncellendi ✓")
+                    self.refresh_tabs()
+                    self._restore_current_tab_selection()
+                else:
+                    self.notes_label.configure(text="Değişiklik yok ✓")
                 self.update_clear_button()
         else:
-            new_note = Note(content=content, title=title)
-            new_note.id = len(self.notes) + 1
-            self.notes.append(new_note)
-            save_notes(self.notes)
+            self.notes.add(Note(content=content, title=title))
             self.notes_label.configure(text=f"Toplam {len(self.notes)} not ✓")
             self.clear_inputs()
             clear_text(self.text_input)
             self.refresh_tabs()
-            self._restore_search_highlights()
             self.update_clear_button()
     
+    def _update_current_note(self, title, content):
+        """
+        Store title and content in the note on screen unless both are unchanged
+        
+        Content is compared by hash, so unchanged notes keep their timestamp
+        and are never re-encrypted or written.
+        
+        Returns:
+            True if the note was updated
+        """
+        note = self.notes.get(self.current_note_id)
+        self.editor.mark_saved()
+        digest = note.content_digest
+        if digest is None:
+            digest = hash(note.content)
+        if title == note.title and hash(content) == digest:
+            metrics.count("save.unchanged")
+            return False
+        
+        note = self.notes.update(
+            self.current_note_id,
+            title=title,
+            content=content,
+            timestamp=now_timestamp()
+        )
+        self.editors.saved(note)
+        return True
+    
+    def _schedule_autosave(self, event=None):
+        """Autosave once edits pause, but at least every AUTOSAVE_MAX_DELAY_MS"""
+        if not AUTOSAVE_ENABLED:
+            return
+        now = time.monotonic()
+        if self._autosave_started is None:
+            self._autosave_started = now
+        remaining = AUTOSAVE_MAX_DELAY_MS - (now - self._autosave_started) * 1000
+        if self._autosave_job is not None:
+            self.root.after_cancel(self._autosave_job)
+        self._autosave_job = self.root.after(
+            max(0, int(min(AUTOSAVE_DELAY_MS, remaining))),
+            self._autosave_when_idle
+        )
+    
+    def _autosave_when_idle(self):
+        """Wait until Tk has no pending events, so saving never delays typing or redraws"""
+        self._autosave_job = self.root.after_idle(self.autosave)
+    
+    def _cancel_autosave(self):
+        """Drop a scheduled autosave"""
+        if self._autosave_job is not None:
+            self.root.after_cancel(self._autosave_job)
+            self._autosave_job = None
+        self._autosave_started = None
+    
+    def _flush_autosave(self):
+        """Run a scheduled autosave now (before the note on screen changes)"""
+        if self._autosave_job is not None:
+            # The tabs already show the note being switched to: leave them there
+            self.autosave(restore_selection=False)
+    
+    def autosave(self, restore_selection=True):
+        """
+        Save the note on screen if its title or text changed since the last save
+        
+        Args:
+            restore_selection: Select the saved note's tab again after the tabs
+                were refreshed (False while switching away from it)
+        """
+        self._cancel_autosave()
+        title = self.title_input.get().strip()
+        note = self.notes.get(self.current_note_id) if self.current_note_id else None
+        if self.current_note_id and note is None:
+            return
+        if not self.editor.has_unsaved_edits and title == (note.title if note else ""):
+            return
+        
+        content = self.editor.get_content()
+        if not validate_note(content)[0]:
+            # Empty or oversized notes wait for an explicit save, which reports why
+            return
+        
+        with metrics.timer("autosave"):
+            if note is not None:
+                if not self._update_current_note(title, content):
+                    return
+            else:
+                # A new note: its text box becomes the note's and editing goes on there
+                note = self.notes.add(Note(content=content, title=title))
+                self.editors.adopt(note)
+                self.editor.mark_saved()
+                self.current_note_id = note.id
+                self.update_clear_button()
+            self.refresh_tabs()
+            if restore_selection:
+                self._restore_current_tab_selection()
+        self.notes_label.configure(text="Otomatik kaydedildi ✓")
+    
+    def _on_notes_changed(self, event, note):
+        """Keep the search index in sync and save after every change to the notes"""
+        with metrics.timer("search.index_update"):
+            if event == "add":
+                self.search_index.add(note)
+            elif event == "update":
+                self.search_index.update(note)
+            elif event == "remove":
+                self.search_index.remove(note.id)
+                get_body_cache().discard(note.id)
+                self.editors.discard(note.id)
+        self._queue_save()
+    
+    def _queue_save(self):
+        """Save notes on the writer thread, reporting failures in the notes label"""
+        self.save_queue.submit(self.notes, on_error=self._on_save_error)
+    
+    def _on_save_error(self, error):
+        """Show a failed background save"""
+        self.notes_label.configure(text=f"❌ Kaydedilemedi: {error}")
+    
     def refresh_tabs(self):
-        """Refresh tabs to show all notes"""
-        self._update_tabs_with_notes(self.notes)
+        """Refresh tabs to show all notes (search matches stay highlighted)"""
+        self._update_tabs_with_notes(self.notes, self._search_matches)
+        self._refresh_search_matches()
     
     def _restore_current_tab_selection(self):
         """Restore the selected tab highlight after refresh"""
@@ -242,31 +396,45 @@ class DesktopApp:
                     self.notebook.set(tab_name)
                     break
     
-    def _restore_search_highlights(self):
-        """Restore search highlights if search is active"""
-        if hasattr(self.notebook, 'search_entry'):
-            query = self.notebook.search_entry.get().strip()
-            if query:
-                filtered_notes = filter_notes_by_query(self.notes, query)
-                matched_note_ids = {note.id for note in filtered_notes}
-                highlight_matching_tabs(self.notebook, self.notebook.tab_references, matched_note_ids)
+    def _refresh_search_matches(self):
+        """
+        Search the applied query again in the background after the notes changed
+        
+        The tabs keep the last result until the new one arrives. A query
+        still being typed is left alone; its own result is searched after
+        the change anyway.
+        """
+        if not self._search_query or not hasattr(self.notebook, 'search_entry'):
+            return
+        if self.notebook.search_entry.get().strip() != self._search_query:
+            return
+        
+        def on_result(query, matched_note_ids):
+            if matched_note_ids != self._search_matches:
+                self._search_matches = matched_note_ids
+                self._update_tabs_with_notes(self.notes, matched_note_ids)
+                self._restore_current_tab_selection()
+        
+        self.search_worker.submit(self._search_query, on_result, force=True)
     
     def on_tab_select(self, note_id):
         """Handle tab selection"""
-        note = next((n for n in self.notes if n.id == note_id), None)
+        self._flush_autosave()
+        note = self.notes.get(note_id)
         if note:
             self.current_note_id = note_id
-            self.clear_inputs()
-            self.title_input.insert(0, note.title)
-            self.text_input.delete("1.0", "end")
-            self.text_input.insert("1.0", note.content)
-            self.text_input.configure(text_color=("gray10", "gray90"))
+            # Recently opened notes come back with their cursor, scroll position
+            # and undo history; others are loaded (large ones in the background)
+            self.editors.open(note, self.title_input.get())
+            self.title_input.delete(0, "end")
+            self.title_input.insert(0, self.editors.title)
             self.update_clear_button()
 
     def clear_inputs(self):
-        """Clear input fields"""
+        """Clear input fields (switching to the new-note text box)"""
+        self.editors.open_scratch(self.title_input.get())
         self.title_input.delete(0, "end")
-        self.text_input.delete("1.0", "end")
+        self.editor.clear()
     
     def clear_note(self):
         """Clear note or delete if editing existing note"""
@@ -289,6 +457,7 @@ class DesktopApp:
     
     def new_note(self):
         """Create new note - clear inputs and reset state"""
+        self._flush_autosave()
         self.current_note_id = None
         self.clear_inputs()
         clear_text(self.text_input)
@@ -297,14 +466,13 @@ class DesktopApp:
     
     def delete_note(self, note_id):
         """Delete note after confirmation"""
-        note = next((n for n in self.notes if n.id == note_id), None)
+        note = self.notes.get(note_id)
         if not note:
             return
         
         note_title = note.title if note.title else None
         if confirm_delete(self.root, note_title):
-            self.notes = [n for n in self.notes if n.id != note_id]
-            save_notes(self.notes)
+            self.notes.remove(note_id)
             
             if self.current_note_id == note_id:
                 self.current_note_id = None
@@ -315,11 +483,56 @@ class DesktopApp:
             self.refresh_tabs()
             self.notes_label.configure(text=f"Toplam {len(self.notes)} not ✓")
     
+    def show_stats(self):
+        """Open the metrics panel (or bring it to the front)"""
+        if self.stats_panel is not None and self.stats_panel.winfo_exists():
+            self.stats_panel.focus()
+            return
+        from ui.stats_panel import StatsPanel
+        self.stats_panel = StatsPanel(self.root, metrics, dump_path=METRICS_FILE)
+    
+    def _on_close(self):
+        """Autosave pending edits, then close the window"""
+        self._flush_autosave()
+        self.root.destroy()
+    
     def run(self):
         """Run the application"""
-        self.root.mainloop()
+        try:
+            if startup_profile.enabled:
+                # Process the pending map and redraw events before reporting
+                self.root.update()
+                startup_profile.mark("first paint")
+                print(startup_profile.report())
+            self.root.mainloop()
+        finally:
+            # Write anything still queued before the process exits
+            self.search_worker.close()
+            self.save_queue.close()
+            flush_storage()
+            if metrics.enabled:
+                try:
+                    metrics.dump(METRICS_FILE)
+                except OSError:
+                    pass
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Parse command line options and start the app"""
+    parser = argparse.ArgumentParser(description=APP_NAME)
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="print how long each startup phase took"
+    )
+    args = parser.parse_args(argv)
+    startup_profile.mark("imports")
+    if args.startup_profile:
+        startup_profile.enable()
+    
     app = DesktopApp()
     app.run()
+
+
+if __name__ == "__main__":
+    main()
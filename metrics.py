@@ -0,0 +1,266 @@
+"""Hot-path instrumentation: named timers, counters and histograms"""
+import json
+import math
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from config import APP_VERSION, METRICS_ENABLED
+
+ENV_VAR = "NOTESTACK_METRICS"
+_PERCENTILES = (50, 95, 99)
+# Bucket of zero and negative values (below every frexp exponent)
+_ZERO_BUCKET = -1075
+
+
+class Histogram:
+    """
+    Distribution of observed values in power-of-two buckets
+
+    Buckets keep memory constant however many values are observed;
+    percentiles are interpolated within the bucket they fall in and clamped
+    to the smallest and largest value seen.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buckets: Dict[int, int] = {}
+
+    def add(self, value: float):
+        """Record one value"""
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        # Bucket e holds values in [2^(e-1), 2^e); zero and below share one
+        bucket = math.frexp(value)[1] if value > 0 else _ZERO_BUCKET
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent: float) -> float:
+        """Estimated value below which percent of the observations fall"""
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for bucket in sorted(self._buckets):
+            count = self._buckets[bucket]
+            if seen + count >= rank:
+                if bucket == _ZERO_BUCKET:
+                    return max(self.min, 0.0)
+                low = math.ldexp(1.0, bucket - 1)
+                value = low + low * (rank - seen) / count
+                return max(self.min, min(self.max, value))
+            seen += count
+        return self.max
+
+    def summary(self) -> dict:
+        """Count, total, mean, min, max and percentile estimates"""
+        if not self.count:
+            return {"count": 0}
+        result = {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+        for percent in _PERCENTILES:
+            result[f"p{percent}"] = self.percentile(percent)
+        return result
+
+
+class _Timer:
+    """Context manager that observes its duration in milliseconds"""
+
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, (time.perf_counter() - self.started) * 1000)
+
+
+class _NoTimer:
+    """Shared no-op timer used while metrics are off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+class Metrics:
+    """
+    Registry of counters and histograms
+
+    Timers are histograms of durations in milliseconds. While disabled,
+    timer() returns a shared no-op, timed() functions call straight through
+    after one attribute check and count()/observe() return immediately, so
+    instrumented code costs next to nothing. Sources are callables whose
+    dicts (e.g. BodyCache.stats) are included in every snapshot.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._sources: Dict[str, Callable[[], dict]] = {}
+        self._started = time.time()
+
+    def enable(self):
+        """Start recording"""
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording (recorded values are kept)"""
+        self.enabled = False
+
+    def timer(self, name: str):
+        """Context manager that records its duration under name"""
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: str):
+        """Decorator recording every call of a function under name"""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, (time.perf_counter() - started) * 1000)
+            return wrapper
+        return decorate
+
+    def count(self, name: str, value: int = 1):
+        """Add value to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        """Add a value to a histogram"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(value)
+
+    def add_source(self, name: str, source: Callable[[], dict]):
+        """Include source() in every snapshot under name (replaces an earlier source)"""
+        self._sources[name] = source
+
+    def reset(self):
+        """Forget every recorded value (sources stay registered)"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._started = time.time()
+
+    def snapshot(self) -> dict:
+        """Counters, histogram summaries and source values"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: histogram.summary() for name, histogram in self._histograms.items()}
+        sources = {}
+        for name, source in list(self._sources.items()):
+            try:
+                sources[name] = source()
+            except Exception:
+                # A failing source must not break the stats panel or the dump
+                continue
+        return {"counters": counters, "histograms": histograms, "sources": sources}
+
+    def report(self) -> str:
+        """Snapshot as text tables (timers in ms)"""
+        snapshot = self.snapshot()
+        lines = [f"{'name':<28}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"]
+        for name, summary in sorted(snapshot["histograms"].items()):
+            lines.append(
+                f"{name:<28}{summary['count']:>8}{summary['mean']:>10.2f}{summary['p50']:>10.2f}"
+                f"{summary['p95']:>10.2f}{summary['p99']:>10.2f}{summary['max']:>10.2f}"
+            )
+        if snapshot["counters"]:
+            lines.append("")
+            for name, value in sorted(snapshot["counters"].items()):
+                lines.append(f"{name:<28}{value:>8}")
+        for source, values in sorted(snapshot["sources"].items()):
+            lines.append("")
+            for name, value in values.items():
+                lines.append(f"{source + '.' + name:<28}{value:>8}")
+        return "\n".join(lines)
+
+    def dump(self, path: Path) -> int:
+        """
+        Append the snapshot to path as JSON lines
+
+        One line per counter, histogram and source, each carrying the run's
+        start time, the dump time, the app version and the process id.
+
+        Returns:
+            Number of lines written
+        """
+        snapshot = self.snapshot()
+        common = {
+            "started": round(self._started, 3),
+            "time": round(time.time(), 3),
+            "version": APP_VERSION,
+            "pid": os.getpid(),
+        }
+        lines = []
+        for name, value in snapshot["counters"].items():
+            lines.append({**common, "type": "counter", "name": name, "value": value})
+        for name, summary in snapshot["histograms"].items():
+            lines.append({**common, "type": "histogram", "name": name, **summary})
+        for name, values in snapshot["sources"].items():
+            lines.append({**common, "type": "source", "name": name, "values": values})
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        return len(lines)
+
+
+def enabled_by_default(env: Optional[Dict[str, str]] = None) -> bool:
+    """METRICS_ENABLED, overridden by the NOTESTACK_METRICS environment variable"""
+    value = (os.environ if env is None else env).get(ENV_VAR, "").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return METRICS_ENABLED
+
+
+# Shared registry used by every instrumented module
+metrics = Metrics(enabled_by_default())
@@ -1,11 +1,86 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date as Date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"  # Stored date format (local wall-clock time)
+DISPLAY_DATE_FORMAT = "%d %b %Y, %H:%M"
+PREVIEW_LENGTH = 40  # Characters of content kept for notes whose body is not loaded
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+@lru_cache(maxsize=4096)
+def _day_start(day: str) -> int:
+    """Seconds from the epoch to the start of a "%Y-%m-%d" day"""
+    return (Date.fromisoformat(day).toordinal() - _EPOCH_ORDINAL) * 86400
+
+
+def parse_timestamp(text: str) -> int:
+    """
+    Convert a stored date string to an integer timestamp
+    
+    Timestamps count wall-clock seconds since 1970-01-01 00:00:00 without a
+    timezone, so they convert back to exactly the stored string.
+    
+    Raises:
+        ValueError: If text is not in DATE_FORMAT
+    """
+    if len(text) == 19 and text[10] == " " and text[13] == ":" and text[16] == ":":
+        hours, minutes, seconds = int(text[11:13]), int(text[14:16]), int(text[17:19])
+        if hours < 24 and minutes < 60 and seconds < 60:
+            return _day_start(text[:10]) + hours * 3600 + minutes * 60 + seconds
+    raise ValueError(f"Invalid date: {text!r}")
+
+
+def now_timestamp() -> int:
+    """Timestamp of the current local time"""
+    now = datetime.now()
+    return (now.toordinal() - _EPOCH_ORDINAL) * 86400 + now.hour * 3600 + now.minute * 60 + now.second
+
+
+def format_stored_date(timestamp: int) -> str:
+    """Timestamp as a stored date string"""
+    return (_EPOCH + timedelta(seconds=timestamp)).strftime(DATE_FORMAT)
+
+
+@lru_cache(maxsize=4096)
+def _format_minute(minute: int) -> str:
+    """Display string for a whole minute"""
+    return (_EPOCH + timedelta(minutes=minute)).strftime(DISPLAY_DATE_FORMAT)
+
+
+def format_timestamp(timestamp: int) -> str:
+    """Timestamp as a display string (cached, notes saved in the same minute share it)"""
+    return _format_minute(timestamp // 60)
+
+
+def timestamp_from_date(date: Optional[str]) -> int:
+    """Timestamp for a stored date string (current time if missing or unreadable)"""
+    if date:
+        try:
+            return parse_timestamp(date)
+        except ValueError:
+            pass
+    return now_timestamp()
 
 
 class Note:
-    """Note model"""
+    """
+    Note model (slotted; the date is kept as an integer timestamp)
+    
+    Content is held in one of three forms: plaintext (a str), sealed by a
+    body source (bytes) or only on disk (None, for notes created with
+    Note.lazy). Sealed and on-disk content is decrypted through the body
+    source (e.g. a BodyCache) on each access, so plaintext only lives in
+    that cache. Once a note is attached to a body source, assigned content
+    is sealed as well.
+    """
+    
+    __slots__ = ("id", "title", "timestamp", "_content", "_preview", "_bodies", "_digest")
     
-    def __init__(self, content: str, title: str = "", note_id: Optional[int] = None, date: Optional[str] = None):
+    def __init__(self, content: str, title: str = "", note_id: Optional[int] = None,
+                 date: Optional[str] = None, timestamp: Optional[int] = None):
         """
         Create a Note
         
@@ -13,12 +88,120 @@ class Note:
             content: Note content
             title: Note title
             note_id: Note ID (auto-generated if not provided)
-            date: Date (current time used if not provided)
+            date: Date string in DATE_FORMAT (current time used if not provided)
+            timestamp: Date as returned by parse_timestamp (takes precedence over date)
         """
         self.id = note_id
         self.title = title
-        self.content = content
-        self.date = date if date else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._content = content
+        self._preview = None
+        self._bodies = None
+        self._digest = None
+        self.timestamp = timestamp if timestamp is not None else timestamp_from_date(date)
+    
+    @classmethod
+    def lazy(cls, note_id: int, title: str, timestamp: int, bodies, preview: Optional[str] = None) -> 'Note':
+        """
+        Create a Note whose content is loaded on demand
+        
+        Args:
+            note_id: Note ID
+            title: Note title
+            timestamp: Date as returned by parse_timestamp
+            bodies: Body source (BodyCache) that loads the content
+            preview: Start of the content (for labels) if known
+        """
+        note = cls.__new__(cls)
+        note.id = note_id
+        note.title = title
+        note.timestamp = timestamp
+        note._content = None
+        note._preview = preview
+        note._bodies = bodies
+        note._digest = None
+        return note
+    
+    @property
+    def content(self) -> str:
+        """Note content (decrypted through the body source if not held as plaintext)"""
+        content = self._content
+        if isinstance(content, str):
+            return content
+        if self._bodies is not None:
+            return self._bodies.get(self.id, content)
+        return ""
+    
+    @content.setter
+    def content(self, value: str):
+        self._preview = None
+        if self._bodies is not None:
+            self._content = self._bodies.seal(self.id, value)
+            self._digest = hash(value)
+        else:
+            self._content = value
+    
+    def peek_content(self) -> str:
+        """Content without adding it to the body cache (for bulk scans)"""
+        content = self._content
+        if isinstance(content, str):
+            return content
+        if self._bodies is not None:
+            return self._bodies.get(self.id, content, keep=False)
+        return ""
+    
+    def attach(self, bodies):
+        """Use bodies as the body source, sealing plaintext content"""
+        self._bodies = bodies
+        if isinstance(self._content, str):
+            self.content = self._content
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the content is held by the note itself (plaintext or sealed)"""
+        return self._content is not None
+    
+    @property
+    def content_digest(self) -> Optional[int]:
+        """Hash of content held by the note (None if the content is only on disk)"""
+        content = self._content
+        if isinstance(content, str):
+            return hash(content)
+        if content is None:
+            return None
+        return self._digest
+    
+    @property
+    def preview(self) -> str:
+        """Start of the content, without loading it when a stored preview exists"""
+        if self._preview is None:
+            self._preview = self.content[:PREVIEW_LENGTH]
+        return self._preview
+    
+    def copy(self) -> 'Note':
+        """Detached copy (shares sealed or on-disk content)"""
+        note = Note.__new__(Note)
+        note.id = self.id
+        note.title = self.title
+        note.timestamp = self.timestamp
+        note._content = self._content
+        note._preview = self._preview
+        note._bodies = self._bodies
+        note._digest = self._digest
+        return note
+    
+    @property
+    def date(self) -> str:
+        """Date string in DATE_FORMAT (as stored on disk)"""
+        return format_stored_date(self.timestamp)
+    
+    @date.setter
+    def date(self, value: str):
+        self.timestamp = parse_timestamp(value)
+    
+    @property
+    def display_date(self) -> str:
+        """Date formatted for display"""
+        return format_timestamp(self.timestamp)
     
     def to_dict(self) -> dict:
         """Convert Note to dictionary"""
@@ -32,17 +215,238 @@ class Note:
     @classmethod
     def from_dict(cls, data: dict) -> 'Note':
         """Create Note from dictionary"""
-        return cls(
-            content=data.get("content", ""),
-            title=data.get("title", ""),
-            note_id=data.get("id"),
-            date=data.get("date")
-        )
+        return cls.from_dicts([data])[0]
+    
+    @classmethod
+    def from_dicts(cls, items: Iterable[dict]) -> List['Note']:
+        """Create Notes from decoded records in one pass"""
+        new = cls.__new__
+        notes = []
+        append = notes.append
+        for data in items:
+            note = new(cls)
+            note.id = data.get("id")
+            note.title = data.get("title", "")
+            note._content = data.get("content", "")
+            note._preview = None
+            note._bodies = None
+            note._digest = None
+            note.timestamp = timestamp_from_date(data.get("date"))
+            append(note)
+        return notes
     
     def __str__(self) -> str:
         title_str = f"title='{self.title}'" if self.title else "title=''"
-        return f"Note(id={self.id}, {title_str}, content={self.content[:50]}...)"
+        return f"Note(id={self.id}, {title_str}, content={self.preview}...)"
     
     def __repr__(self) -> str:
         return self.__str__()
 
+
+class _Block:
+    """A run of consecutive note ids in display order"""
+    
+    __slots__ = ("ids",)
+    
+    def __init__(self, ids: List[int]):
+        self.ids = ids
+
+
+class _NoteOrder:
+    """
+    Display order of note ids, stored as a list of blocks of at most 2 * BLOCK_SIZE ids
+    
+    Appending is O(1) and removing an id touches only its block (found
+    through a dict), O(BLOCK_SIZE). Inserting at an index first walks the
+    block lengths, so it is O(n / BLOCK_SIZE + BLOCK_SIZE): about 2,000
+    steps for a million notes instead of rebuilding the whole order.
+    """
+    
+    BLOCK_SIZE = 512
+    
+    def __init__(self):
+        self._blocks: List[_Block] = []
+        self._block_of: Dict[int, _Block] = {}
+    
+    def __len__(self) -> int:
+        return len(self._block_of)
+    
+    def __iter__(self) -> Iterator[int]:
+        for block in self._blocks:
+            yield from block.ids
+    
+    def first(self) -> Optional[int]:
+        """First id (None if empty)"""
+        return self._blocks[0].ids[0] if self._blocks else None
+    
+    def append(self, note_id: int):
+        """Add an id at the end"""
+        if not self._blocks or len(self._blocks[-1].ids) >= self.BLOCK_SIZE:
+            self._blocks.append(_Block([]))
+        block = self._blocks[-1]
+        block.ids.append(note_id)
+        self._block_of[note_id] = block
+    
+    def insert(self, index: int, note_id: int):
+        """Add an id at index (clamped to the start and the end)"""
+        if not self._blocks or index >= len(self._block_of):
+            self.append(note_id)
+            return
+        position = max(index, 0)
+        for number, block in enumerate(self._blocks):
+            if position < len(block.ids):
+                break
+            position -= len(block.ids)
+        block.ids.insert(position, note_id)
+        self._block_of[note_id] = block
+        if len(block.ids) > 2 * self.BLOCK_SIZE:
+            # Split a full block in halves
+            half = _Block(block.ids[self.BLOCK_SIZE:])
+            del block.ids[self.BLOCK_SIZE:]
+            for moved_id in half.ids:
+                self._block_of[moved_id] = half
+            self._blocks.insert(number + 1, half)
+    
+    def remove(self, note_id: int):
+        """Drop an id"""
+        block = self._block_of.pop(note_id)
+        block.ids.remove(note_id)
+        if not block.ids:
+            # Blocks compare by identity, so this finds exactly this block
+            self._blocks.remove(block)
+
+
+class NoteCollection:
+    """
+    Ordered notes with lookup by id
+    
+    Notes are kept in a dict keyed by id, so lookup is O(1); the display
+    order is a _NoteOrder, where appending is O(1), removal touches one
+    block and inserts and moves to any position are O(sqrt n). Ids come from a
+    counter that only grows (it is persisted with the notes), so a deleted
+    note's id is never handed out again. Subscribers are told about every
+    change as callback(event, note) with event "add", "update", "remove" or
+    "move".
+    """
+    
+    def __init__(self, notes: Iterable[Note] = (), next_id: int = 1, bodies=None):
+        """
+        Create a NoteCollection
+        
+        Args:
+            notes: Initial notes in display order (ids must be unique; missing ids are assigned)
+            next_id: Lowest id that may be handed out (raised past existing ids)
+            bodies: Body source (BodyCache) that notes are attached to, so
+                their content is kept sealed instead of as plaintext
+        """
+        self._notes: Dict[int, Note] = {}
+        self._order = _NoteOrder()
+        self._next_id = next_id
+        self._bodies = bodies
+        self._subscribers: List[Callable[[str, Note], None]] = []
+        for note in notes:
+            self._insert(note)
+    
+    def __len__(self) -> int:
+        return len(self._notes)
+    
+    def __iter__(self) -> Iterator[Note]:
+        notes = self._notes
+        return iter([notes[note_id] for note_id in self._order])
+    
+    def __contains__(self, note_id) -> bool:
+        return note_id in self._notes
+    
+    def __bool__(self) -> bool:
+        return bool(self._notes)
+    
+    @property
+    def next_id(self) -> int:
+        """Id the next new note will get"""
+        return self._next_id
+    
+    def get(self, note_id: Optional[int]) -> Optional[Note]:
+        """Find a note by id (None if there is none)"""
+        return self._notes.get(note_id)
+    
+    def first(self) -> Optional[Note]:
+        """First note in display order"""
+        return self._notes.get(self._order.first())
+    
+    def ids(self) -> List[int]:
+        """Note ids in display order"""
+        return list(self._order)
+    
+    def add(self, note: Note, index: Optional[int] = None) -> Note:
+        """
+        Add a note, assigning a new id if it has none
+        
+        Args:
+            note: Note to add
+            index: Position to insert at (appended if None)
+        
+        Returns:
+            The added note
+        """
+        self._insert(note, index)
+        self._notify("add", note)
+        return note
+    
+    def update(self, note_id: int, **fields) -> Note:
+        """
+        Change fields of a note (title, content, date or timestamp)
+        
+        Returns:
+            The updated note
+        """
+        note = self._notes[note_id]
+        for name, value in fields.items():
+            if name not in ("title", "content", "date", "timestamp"):
+                raise AttributeError(f"Note field cannot be updated: {name}")
+            setattr(note, name, value)
+        self._notify("update", note)
+        return note
+    
+    def remove(self, note_id: int) -> Note:
+        """Remove a note by id and return it"""
+        note = self._notes.pop(note_id)
+        self._order.remove(note_id)
+        self._notify("remove", note)
+        return note
+    
+    def move(self, note_id: int, index: int):
+        """Move a note to a new position (clamped to the start and the end)"""
+        note = self._notes[note_id]
+        self._order.remove(note_id)
+        self._order.insert(index, note_id)
+        self._notify("move", note)
+    
+    def subscribe(self, callback: Callable[[str, Note], None]) -> Callable[[], None]:
+        """
+        Register a change callback
+        
+        Returns:
+            Function that removes the callback again
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+    
+    def _insert(self, note: Note, index: Optional[int] = None):
+        """Place a note at index (the end if None), allocating or reserving its id"""
+        if note.id is None:
+            note.id = self._next_id
+        elif note.id in self._notes:
+            raise ValueError(f"Duplicate note id: {note.id}")
+        self._next_id = max(self._next_id, note.id + 1)
+        if self._bodies is not None and note._bodies is None:
+            note.attach(self._bodies)
+        self._notes[note.id] = note
+        if index is None:
+            self._order.append(note.id)
+        else:
+            self._order.insert(index, note.id)
+    
+    def _notify(self, event: str, note: Note):
+        """Call every subscriber"""
+        for callback in list(self._subscribers):
+            callback(event, note)
@@ -0,0 +1,117 @@
+"""Compact binary encoding of record metadata (JSON stays available for import/export)"""
+import json
+from typing import Iterable, List, Tuple
+
+from models import PREVIEW_LENGTH, Note
+
+# Metadata flags
+_HAS_PREVIEW = 0x01
+
+
+class NoteCodecError(Exception):
+    """Raised when encoded data is truncated or malformed"""
+
+
+def encode_varint(value: int) -> bytes:
+    """Unsigned LEB128"""
+    if value < 0:
+        raise ValueError("varint must not be negative")
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data: bytes, position: int) -> Tuple[int, int]:
+    """
+    Read an unsigned LEB128 value
+
+    Returns:
+        (value, position after it)
+    """
+    result = 0
+    shift = 0
+    try:
+        while True:
+            byte = data[position]
+            position += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result, position
+            shift += 7
+    except IndexError:
+        raise NoteCodecError("Truncated varint") from None
+
+
+def _zigzag(value: int) -> int:
+    """Map signed to unsigned so small negative timestamps stay short"""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _encode_text(text: str) -> bytes:
+    """Length-prefixed UTF-8"""
+    data = text.encode('utf-8')
+    return encode_varint(len(data)) + data
+
+
+def _decode_text(data: bytes, position: int) -> Tuple[str, int]:
+    length, position = decode_varint(data, position)
+    end = position + length
+    if end > len(data):
+        raise NoteCodecError("Truncated text field")
+    return data[position:end].decode('utf-8'), end
+
+
+def encode_meta(note: Note, content: str) -> bytes:
+    """
+    Metadata of a note: flags, id, timestamp, title and (for untitled notes) a preview
+
+    Args:
+        note: Note to encode
+        content: Its content (only the preview is taken from it)
+    """
+    # Labels of untitled notes show the start of the content
+    preview = b"" if note.title else _encode_text(content[:PREVIEW_LENGTH])
+    return b"".join((
+        bytes((0 if note.title else _HAS_PREVIEW,)),
+        encode_varint(note.id),
+        encode_varint(_zigzag(note.timestamp)),
+        _encode_text(note.title or ""),
+        preview
+    ))
+
+
+def decode_meta(data: bytes, bodies=None) -> Note:
+    """
+    Build a Note from encoded metadata without an intermediate dict
+
+    Args:
+        data: Output of encode_meta
+        bodies: Body source the note loads its content from
+    """
+    if not data:
+        raise NoteCodecError("Empty metadata")
+    flags = data[0]
+    note_id, position = decode_varint(data, 1)
+    timestamp, position = decode_varint(data, position)
+    title, position = _decode_text(data, position)
+    preview = None
+    if flags & _HAS_PREVIEW:
+        preview, position = _decode_text(data, position)
+    return Note.lazy(note_id, title, _unzigzag(timestamp), bodies, preview)
+
+
+def export_json(notes: Iterable[Note]) -> str:
+    """Notes as a JSON array of {id, title, content, date} (plaintext, for export)"""
+    return json.dumps([note.to_dict() for note in notes], ensure_ascii=False, indent=2)
+
+
+def import_json(text: str) -> List[Note]:
+    """Notes from export_json output (or the old notes.json layout)"""
+    return Note.from_dicts(json.loads(text))
@@ -0,0 +1,510 @@
+"""Record-oriented note store: one encrypted record per note plus an offset table"""
+import json
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from compression import Compressor, decompress, dictionary_id, train_dictionary
+from encryption import KeyManager, get_key_manager
+from models import PREVIEW_LENGTH, Note, timestamp_from_date
+from note_codec import decode_meta, encode_meta
+from startup_profile import startup_profile
+
+MAGIC = b"NSTREC"
+VERSION = 2
+
+# magic, version, index offset, index length, index crc32, next note id
+_HEADER = struct.Struct(">6sHQIIq")
+# Version 1 header (no id counter)
+_HEADER_V1 = struct.Struct(">6sHQII")
+# record length (payload only), codec
+_RECORD_HEADER = struct.Struct(">IB")
+# note id, record offset, record length (header included)
+_INDEX_ENTRY = struct.Struct(">qQI")
+# sealed metadata length (split records)
+_SPLIT_HEADER = struct.Struct(">I")
+
+CODEC_FERNET_JSON = 0  # Single Fernet token (files written before streaming records)
+CODEC_STREAM_JSON = 1  # Chunked stream container
+CODEC_SPLIT = 2  # Metadata container followed by a separate body container
+CODEC_PACKED = 3  # Split record whose containers hold compressed payloads
+CODEC_DICTIONARY = 4  # Compression dictionary (listed first in the offset table)
+CODEC_BINARY = 5  # Packed split record with binary metadata (note_codec)
+
+# Offset table id of the dictionary record (note ids start at 1)
+DICTIONARY_ID = 0
+# A dictionary is trained once a save writes at least this many notes
+DICTIONARY_MIN_SAMPLES = 32
+DICTIONARY_MAX_SAMPLES = 256
+
+_SPLIT_CODECS = (CODEC_SPLIT, CODEC_PACKED, CODEC_BINARY)
+_PACKED_CODECS = (CODEC_PACKED, CODEC_BINARY)
+# Framing for payloads written without a compressor
+_STORED = Compressor("none")
+
+# Rewrite the file once dead records take more than this share of it
+COMPACT_GARBAGE_RATIO = 0.5
+COMPACT_MIN_BYTES = 1 << 20
+
+
+class RecordStoreError(Exception):
+    """Raised when the record file is missing or damaged"""
+
+
+class _Entry:
+    """Location of a note record and the state it was written from"""
+
+    __slots__ = ("offset", "length", "fingerprint")
+
+    def __init__(self, offset: int, length: int, fingerprint: tuple):
+        self.offset = offset
+        self.length = length
+        self.fingerprint = fingerprint
+
+
+def fingerprint(note: Note) -> tuple:
+    """State used to decide whether a note must be written again (never decrypts a body)"""
+    return (note.title, note.content_digest, note.timestamp)
+
+
+def _metadata(data: dict) -> dict:
+    """Metadata dict (id, title, date, preview) from a decoded meta or legacy record"""
+    title = data.get("title", "")
+    preview = data.get("preview")
+    if preview is None and not title and "content" in data:
+        preview = data["content"][:PREVIEW_LENGTH]
+    return {"id": data.get("id"), "title": title, "date": data.get("date"), "preview": preview}
+
+
+def _serialize_meta(note: Note, content: str) -> bytes:
+    """Plaintext metadata of a split record"""
+    meta = {"id": note.id, "title": note.title, "date": note.date}
+    if not note.title:
+        # Labels of untitled notes show the start of the content
+        meta["preview"] = content[:PREVIEW_LENGTH]
+    return json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+
+class RecordStore:
+    """
+    Append-friendly note file
+
+    Layout: a fixed header pointing at the current offset table, followed by
+    length-prefixed encrypted records. A save appends only the records of
+    changed notes and a fresh offset table, then flips the header pointer, so
+    an interrupted save leaves the previous table (and its records) intact.
+    Records are read and written one at a time through stream containers, so
+    memory use is bounded by the largest note rather than the whole file.
+
+    Each record keeps the metadata (id, title, date, preview) and the body in
+    separate encrypted containers, so notes can be loaded without their
+    bodies and read_body decrypts a single body on demand. With a
+    compressor both are compressed before encryption; the record codec says
+    whether they were, and the payload's first byte says how.
+    """
+
+    # Codec of newly written records (older codecs are still read)
+    write_codec = CODEC_BINARY
+
+    def __init__(self, path: Path, keys: Optional[KeyManager] = None,
+                 compressor: Optional[Compressor] = None, train_dictionary: bool = True):
+        """
+        Args:
+            path: Record file path
+            keys: Key manager to encrypt with (shared default if None)
+            compressor: Compresses records before encryption (None to store them uncompressed)
+            train_dictionary: Train a shared dictionary on the notes of the
+                first large save, so small records compress too
+        """
+        self.path = Path(path)
+        self.keys = keys if keys is not None else get_key_manager()
+        self.compressor = compressor
+        self.train_dictionary = train_dictionary
+        # Dictionaries by id (for reading) and the dictionary record, if any
+        self._dictionaries: Dict[int, bytes] = {}
+        self._dictionary_entry: Optional[_Entry] = None
+        self._entries: Dict[int, _Entry] = {}
+        self._order: List[int] = []
+        self._end = 0
+        self._live_bytes = 0
+        self._version = VERSION
+        # Held while the file is replaced, so body reads never see stale offsets
+        self._lock = threading.RLock()
+        # Never reused: stays above every id ever saved, even after deletions
+        self.next_id = 1
+
+    def exists(self) -> bool:
+        """Check whether the record file exists"""
+        return self.path.exists()
+
+    def load(self, bodies=None) -> List[Note]:
+        """
+        Read every note from the record file
+
+        Args:
+            bodies: Body source (e.g. a BodyCache over read_body); if given,
+                notes are returned without content and load it from there
+
+        Returns:
+            List of Note objects in stored order
+        """
+        notes = []
+        entries = {}
+        order = []
+        live_bytes = 0
+        header = {}
+        for note, offset, length, codec in self._iter_records(header, bodies):
+            # Older records are rewritten in the split layout on the next save
+            entries[note.id] = _Entry(offset, length, fingerprint(note) if codec in _SPLIT_CODECS else None)
+            order.append(note.id)
+            live_bytes += length
+            notes.append(note)
+
+        self._entries = entries
+        self._order = order
+        self._end = self.path.stat().st_size
+        self._dictionary_entry = header.get("dictionary")
+        if self._dictionary_entry is not None:
+            live_bytes += self._dictionary_entry.length
+            if self.compressor is not None and self.compressor.uses_dictionaries:
+                self.compressor = self.compressor.with_dictionary(self._dictionaries[header["dictionary_id"]])
+        self._live_bytes = live_bytes
+        self._version = header["version"]
+        self.next_id = max(header["next_id"], max(order, default=0) + 1)
+        return notes
+
+    def read_body(self, note_id: int) -> str:
+        """
+        Decrypt the body of one note
+
+        Args:
+            note_id: Note ID
+
+        Returns:
+            Note content
+
+        Raises:
+            KeyError: If the note is not in the file
+        """
+        with self._lock, self.path.open('rb') as f:
+            entry = self._entries[note_id]
+            f.seek(entry.offset)
+            record_length, codec = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            if codec not in _SPLIT_CODECS:
+                return self._read_payload(f, codec, record_length).get("content", "")
+            meta_length, = _SPLIT_HEADER.unpack(f.read(_SPLIT_HEADER.size))
+            f.seek(meta_length, os.SEEK_CUR)
+            return self._open(f, codec).decode('utf-8')
+
+    def save(self, notes: Iterable[Note], next_id: Optional[int] = None) -> int:
+        """
+        Write notes, encrypting only those that changed since the last load/save
+
+        Args:
+            notes: Full ordered list of notes (ids must be unique)
+            next_id: Id counter to store (raised past the saved ids if lower)
+
+        Returns:
+            Number of records written
+        """
+        notes = list(notes)
+        order = [note.id for note in notes]
+        # A recreated file holds none of the earlier records
+        stored = self._entries if self.path.exists() else {}
+        changed = [
+            note for note in notes
+            if (entry := stored.get(note.id)) is None
+            or entry.fingerprint != fingerprint(note)
+        ]
+        return self._write(changed, order, next_id)
+
+    def put(self, note: Note):
+        """Write one note (appended to the order if it is new)"""
+        order = self._order if note.id in self._entries else self._order + [note.id]
+        self._write([note], order)
+
+    def delete(self, note_id: int) -> bool:
+        """
+        Remove one note
+
+        Returns:
+            True if the note was stored
+        """
+        if note_id not in self._entries:
+            return False
+        self._write([], [other for other in self._order if other != note_id])
+        return True
+
+    def read_note(self, note_id: int) -> Optional[Note]:
+        """Read and decrypt one note (None if it is not stored)"""
+        if note_id not in self._entries:
+            return None
+        meta = self.read_metadata(note_id)
+        return Note(self.read_body(note_id), meta["title"], note_id, timestamp=timestamp_from_date(meta["date"]))
+
+    def read_metadata(self, note_id: int) -> dict:
+        """
+        Decrypt the metadata of one note
+
+        Returns:
+            Dict with id, title, date and preview (None if not stored)
+
+        Raises:
+            KeyError: If the note is not in the file
+        """
+        with self._lock, self.path.open('rb') as f:
+            entry = self._entries[note_id]
+            f.seek(entry.offset)
+            record_length, codec = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            if codec not in _SPLIT_CODECS:
+                return _metadata(self._read_payload(f, codec, record_length))
+            f.read(_SPLIT_HEADER.size)
+            note = self._decode_meta(self._open(f, codec), codec)
+            return {"id": note.id, "title": note.title, "date": note.date, "preview": note._preview}
+
+    def iter_metadata(self) -> Iterator[dict]:
+        """Yield the metadata of every note in stored order without decrypting bodies"""
+        for note, _, _, _ in self._iter_records(lazy=True):
+            yield {"id": note.id, "title": note.title, "date": note.date, "preview": None if note.title else note.preview}
+
+    def _write(self, changed: List[Note], order: List[int], next_id: Optional[int] = None) -> int:
+        """Append records for changed notes and a new offset table for order"""
+        new_next_id = max(self.next_id, next_id or 0, max(order, default=0) + 1)
+        if not changed and order == self._order and new_next_id == self.next_id and self.path.exists():
+            return 0
+        self.next_id = new_next_id
+
+        if not self.path.exists() or self._end < _HEADER.size:
+            self._create_empty()
+        elif self._version != VERSION:
+            # Older header is shorter: rewrite before appending behind it
+            self.compact()
+
+        entries = {note_id: self._entries[note_id] for note_id in order if note_id in self._entries}
+        position = self._end
+        compressor = self.compressor
+        codec = self.write_codec
+
+        with self.path.open('r+b') as f:
+            f.seek(position)
+            if (compressor is not None and compressor.uses_dictionaries and self.train_dictionary
+                    and self._dictionary_entry is None and len(changed) >= DICTIONARY_MIN_SAMPLES):
+                dictionary = train_dictionary(
+                    note.content.encode('utf-8') for note in changed[:DICTIONARY_MAX_SAMPLES]
+                )
+                if dictionary:
+                    sealed = b"".join(self.keys.encrypt_stream([dictionary]))
+                    record = _RECORD_HEADER.pack(len(sealed), CODEC_DICTIONARY) + sealed
+                    f.write(record)
+                    self._dictionary_entry = _Entry(position, len(record), None)
+                    self._dictionaries[dictionary_id(dictionary)] = dictionary
+                    compressor = self.compressor = compressor.with_dictionary(dictionary)
+                    position += len(record)
+
+            packer = compressor if compressor is not None else _STORED
+            for note in changed:
+                content = note.content
+                if codec == CODEC_BINARY:
+                    meta = packer.compress(encode_meta(note, content))
+                    body = packer.compress(content.encode('utf-8'))
+                else:
+                    meta = _serialize_meta(note, content)
+                    body = content.encode('utf-8')
+                    if codec == CODEC_PACKED:
+                        meta = packer.compress(meta)
+                        body = packer.compress(body)
+                sealed_meta = b"".join(self.keys.encrypt_stream([meta]))
+                sealed_body = b"".join(self.keys.encrypt_stream([body]))
+                payload_length = _SPLIT_HEADER.size + len(sealed_meta) + len(sealed_body)
+                record = b"".join((
+                    _RECORD_HEADER.pack(payload_length, codec),
+                    _SPLIT_HEADER.pack(len(sealed_meta)),
+                    sealed_meta,
+                    sealed_body
+                ))
+                f.write(record)
+                entries[note.id] = _Entry(position, len(record), fingerprint(note))
+                position += len(record)
+
+            index = _pack_index(self._table(order, entries))
+            f.write(index)
+            f.flush()
+            os.fsync(f.fileno())
+            # The new table only becomes visible once its records are on disk
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, position, len(index), zlib.crc32(index), self.next_id))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._entries = entries
+        self._order = order
+        self._end = position + len(index)
+        self._live_bytes = sum(entry.length for _, entry in self._table(order, entries))
+
+        if self._should_compact():
+            self.compact()
+        return len(changed)
+
+    def compact(self):
+        """Rewrite the file with only live records (ciphertext is copied, not re-encrypted)"""
+        table = self._table(self._order, self._entries)
+        moved = []
+        position = _HEADER.size
+        for note_id, entry in table:
+            moved.append((note_id, _Entry(position, entry.length, entry.fingerprint)))
+            position += entry.length
+        index = _pack_index(moved)
+
+        def chunks() -> Iterator[bytes]:
+            yield _HEADER.pack(MAGIC, VERSION, position, len(index), zlib.crc32(index), self.next_id)
+            # The source is closed before the temporary file replaces it
+            with self.path.open('rb') as source:
+                for _, entry in table:
+                    source.seek(entry.offset)
+                    yield source.read(entry.length)
+            yield index
+
+        with self._lock:
+            _atomic_write(self.path, chunks())
+            self._entries = {note_id: entry for note_id, entry in moved if note_id != DICTIONARY_ID}
+            if self._dictionary_entry is not None:
+                self._dictionary_entry = moved[0][1]
+            self._end = position + len(index)
+            self._version = VERSION
+
+    def _table(self, order: List[int], entries: Dict[int, _Entry]) -> List[Tuple[int, _Entry]]:
+        """Offset table rows: the dictionary record (if any), then notes in display order"""
+        table = [(DICTIONARY_ID, self._dictionary_entry)] if self._dictionary_entry is not None else []
+        table.extend((note_id, entries[note_id]) for note_id in order)
+        return table
+
+    def _iter_records(self, header: Optional[dict] = None, bodies=None,
+                      lazy: Optional[bool] = None) -> Iterator[Tuple[Note, int, int, int]]:
+        """
+        Yield (note, record offset, record length, codec) in stored order
+
+        Args:
+            header: Filled with the file's "version" and "next_id" once iteration starts
+            bodies: Body source for lazy notes
+            lazy: Skip split record bodies instead of decrypting them (default: if bodies is given)
+        """
+        if lazy is None:
+            lazy = bodies is not None
+        phase = startup_profile.phase
+        with self.path.open('rb') as f:
+            table, (version, next_id) = self._read_index(f)
+            if header is not None:
+                header.update(version=version, next_id=next_id)
+            for _, offset, length in table:
+                f.seek(offset)
+                record_length, codec = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+                if _RECORD_HEADER.size + record_length != length:
+                    raise RecordStoreError("Record length does not match the offset table")
+                if codec == CODEC_DICTIONARY:
+                    dictionary = b"".join(self.keys.decrypt_stream(f))
+                    self._dictionaries[dictionary_id(dictionary)] = dictionary
+                    if header is not None:
+                        header.update(dictionary=_Entry(offset, length, None), dictionary_id=dictionary_id(dictionary))
+                    continue
+                if codec not in _SPLIT_CODECS:
+                    yield Note.from_dict(self._read_payload(f, codec, record_length)), offset, length, codec
+                    continue
+
+                f.read(_SPLIT_HEADER.size)
+                with phase("decrypt"):
+                    payload = self._open(f, codec)
+                    if not lazy:
+                        content = self._open(f, codec).decode('utf-8')
+                with phase("parse"):
+                    note = self._decode_meta(payload, codec, bodies)
+                    if not lazy:
+                        note = Note(content, note.title, note.id, timestamp=note.timestamp)
+                yield note, offset, length, codec
+
+    @staticmethod
+    def _decode_meta(payload: bytes, codec: int, bodies=None) -> Note:
+        """Note without content from the metadata container of a split record"""
+        if codec == CODEC_BINARY:
+            return decode_meta(payload, bodies)
+        meta = json.loads(payload)
+        timestamp = timestamp_from_date(meta.get("date"))
+        return Note.lazy(meta.get("id"), meta.get("title", ""), timestamp, bodies, meta.get("preview"))
+
+    def _open(self, f: BinaryIO, codec: int) -> bytes:
+        """Decrypt one container of a split record, decompressing packed ones"""
+        payload = b"".join(self.keys.decrypt_stream(f))
+        if codec in _PACKED_CODECS:
+            return decompress(payload, self._dictionaries)
+        return payload
+
+    def _read_payload(self, f: BinaryIO, codec: int, record_length: int) -> dict:
+        """Decode a single-container (pre-split) record positioned after its header"""
+        with startup_profile.phase("decrypt"):
+            if codec == CODEC_STREAM_JSON:
+                payload = b"".join(self.keys.decrypt_stream(f))
+            elif codec == CODEC_FERNET_JSON:
+                payload = self.keys.decrypt(f.read(record_length))
+            else:
+                raise RecordStoreError(f"Unknown record codec: {codec}")
+        with startup_profile.phase("parse"):
+            return json.loads(payload)
+
+    def _should_compact(self) -> bool:
+        """Check whether dead records are worth reclaiming"""
+        garbage = self._end - _HEADER.size - self._live_bytes
+        return garbage > COMPACT_MIN_BYTES and garbage > self._end * COMPACT_GARBAGE_RATIO
+
+    def _create_empty(self):
+        """Start a new record file with an empty offset table"""
+        _atomic_write(self.path, [_HEADER.pack(MAGIC, VERSION, _HEADER.size, 0, zlib.crc32(b""), self.next_id)])
+        self._entries = {}
+        self._order = []
+        self._dictionary_entry = None
+        if self.compressor is not None and self.compressor.dictionary:
+            # The new file has no dictionary record: stop referring to the old one
+            self.compressor = self.compressor.with_dictionary(None)
+        self._end = _HEADER.size
+        self._live_bytes = 0
+        self._version = VERSION
+
+    @staticmethod
+    def _read_index(f: BinaryIO) -> Tuple[List[tuple], Tuple[int, int]]:
+        """Validate the header and return (note_id, offset, length) tuples and (version, next id)"""
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER_V1.size:
+            raise RecordStoreError("Record file is truncated")
+        magic, version = struct.unpack_from(">6sH", header)
+        if magic != MAGIC:
+            raise RecordStoreError("Not a NoteStack record file")
+        if version == VERSION and len(header) == _HEADER.size:
+            _, _, index_offset, index_length, index_crc, next_id = _HEADER.unpack(header)
+        elif version == 1:
+            _, _, index_offset, index_length, index_crc = _HEADER_V1.unpack_from(header)
+            next_id = 1
+        else:
+            raise RecordStoreError(f"Unsupported record file version: {version}")
+
+        f.seek(index_offset)
+        index = f.read(index_length)
+        if len(index) != index_length or zlib.crc32(index) != index_crc:
+            raise RecordStoreError("Record offset table is damaged")
+        return list(_INDEX_ENTRY.iter_unpack(index)), (version, next_id)
+
+
+def _pack_index(table: Iterable[Tuple[int, _Entry]]) -> bytes:
+    """Build the offset table from (note id, entry) rows"""
+    return b"".join(_INDEX_ENTRY.pack(note_id, entry.offset, entry.length) for note_id, entry in table)
+
+
+def _atomic_write(path: Path, chunks: Iterable[bytes]):
+    """Write a file via a temporary sibling so readers never see a partial file"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open('wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
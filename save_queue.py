@@ -0,0 +1,163 @@
+"""Background note saving with coalescing of bursts of saves"""
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from metrics import metrics
+from models import Note
+
+
+class _Save:
+    """A queued save request"""
+
+    __slots__ = ("notes", "on_done", "on_error")
+
+    def __init__(self, notes, on_done, on_error):
+        self.notes = notes
+        self.on_done = on_done
+        self.on_error = on_error
+
+
+class _Flush:
+    """Marker asking the worker to write immediately and signal when done"""
+
+    __slots__ = ("event",)
+
+    def __init__(self):
+        self.event = threading.Event()
+
+
+_STOP = object()
+
+
+class SaveQueue:
+    """
+    Run save_notes on a writer thread
+
+    Saves submitted within the debounce window are collapsed into a single
+    write of the latest state. Completion and error callbacks are handed to
+    the dispatch function (e.g. a root.after wrapper) so they run on the UI
+    thread.
+    """
+
+    def __init__(self, save_func: Callable[[List[Note]], Optional[bool]],
+                 dispatch: Optional[Callable[[Callable], None]] = None,
+                 debounce_ms: int = 300, maxsize: int = 64):
+        """
+        Args:
+            save_func: Function that writes a full list of notes (returning False means it failed)
+            dispatch: Runs a callback on the UI thread (callbacks run on the writer thread if None)
+            debounce_ms: How long to wait for further saves before writing
+            maxsize: Queue size; submit blocks while the queue is full
+        """
+        self.save_func = save_func
+        self.dispatch = dispatch
+        self.debounce = debounce_ms / 1000
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="SaveQueue", daemon=True)
+        self._worker.start()
+
+    def submit(self, notes: List[Note], on_done: Optional[Callable[[], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        Queue a save of the given notes
+
+        Args:
+            notes: Full ordered list of notes (the list is copied, the notes are not)
+            on_done: Called after the write that includes this save
+            on_error: Called with the exception if that write fails
+        """
+        if self._closed:
+            raise RuntimeError("SaveQueue is closed")
+        self._queue.put(_Save(list(notes), on_done, on_error))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write any pending save now and wait for it
+
+        Args:
+            timeout: Seconds to wait (forever if None)
+
+        Returns:
+            True if everything queued before the call has been written
+        """
+        if self._closed or not self._worker.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.event.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush pending saves and stop the writer thread"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _run(self):
+        """Writer loop"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            pending = []
+            flushes = []
+            if isinstance(item, _Flush):
+                flushes.append(item)
+            else:
+                pending.append(item)
+                # Collect everything that arrives in the debounce window
+                deadline = time.monotonic() + self.debounce
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.put(_STOP)
+                        break
+                    if isinstance(item, _Flush):
+                        flushes.append(item)
+                        break
+                    pending.append(item)
+
+            if pending:
+                self._write(pending)
+            for marker in flushes:
+                marker.event.set()
+
+    def _write(self, pending: List[_Save]):
+        """Write the newest state and report to every coalesced request"""
+        metrics.count("save_queue.coalesced", len(pending) - 1)
+        try:
+            with metrics.timer("save_queue.write"):
+                saved = self.save_func(pending[-1].notes)
+            if saved is False:
+                raise IOError("Notes could not be written")
+        except Exception as e:
+            for request in pending:
+                if request.on_error:
+                    self._dispatch(lambda cb=request.on_error, error=e: cb(error))
+        else:
+            for request in pending:
+                if request.on_done:
+                    self._dispatch(request.on_done)
+
+    def _dispatch(self, callback: Callable[[], None]):
+        """Hand a callback to the UI thread"""
+        try:
+            if self.dispatch:
+                self.dispatch(callback)
+            else:
+                callback()
+        except Exception:
+            # The UI may already be gone during shutdown
+            pass
@@ -0,0 +1,664 @@
+"""In-memory search indexes over note titles and contents"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from models import Note
+
+# Trigram positions recorded per note (keep_text=False); notes whose text is
+# no longer than this are searched without reading them
+MASK_BITS = 64
+# Rebuild a keep_text=False index once this many (and a quarter of its)
+# notes were edited or removed after indexing
+COMPACT_MIN = 256
+
+
+def _tokenize(note: Note) -> Set[str]:
+    """Whitespace-separated lowercase words of a note's title and content"""
+    tokens = set(note.title.lower().split()) if note.title else set()
+    content = note.peek_content()
+    if content:
+        tokens.update(content.lower().split())
+    return tokens
+
+
+class SearchIndex:
+    """
+    Word index answering the same substring queries as filter_notes_by_query
+
+    A query without whitespace can only occur inside a single word, so its
+    matches are exactly the notes holding a word that contains it. Those
+    words are found with one C-level scan over the joined vocabulary, which
+    is far smaller than the notes themselves. Queries with whitespace use the
+    words as a filter and check the remaining candidates directly.
+    """
+
+    def __init__(self, notes: Iterable[Note] = ()):
+        """
+        Args:
+            notes: Notes to index initially
+        """
+        self._notes: Dict[int, Note] = {}
+        self._tokens_by_note: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        # Vocabulary joined by newlines (never part of a token) for str.find
+        # scans; removed words stay in the blob until it is rebuilt
+        self._blob = ""
+        self._blob_tokens: List[str] = []
+        self._blob_starts: List[int] = []
+        self._pending_tokens: List[str] = []
+        self._stale_tokens = 0
+        # Matching words of the last query, reused while the user keeps typing
+        self._last_query: Optional[str] = None
+        self._last_tokens: List[str] = []
+
+        for note in notes:
+            self.add(note)
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def add(self, note: Note):
+        """Index a new note (or re-index an existing one)"""
+        self.update(note)
+
+    def update(self, note: Note):
+        """Re-index a note after its title or content changed"""
+        old_tokens = self._tokens_by_note.get(note.id, set())
+        new_tokens = _tokenize(note)
+        self._notes[note.id] = note
+        self._tokens_by_note[note.id] = new_tokens
+
+        for token in old_tokens - new_tokens:
+            self._discard(token, note.id)
+        for token in new_tokens - old_tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                self._postings[token] = {note.id}
+                self._pending_tokens.append(token)
+                self._last_query = None
+            else:
+                posting.add(note.id)
+
+    def remove(self, note_id: int):
+        """Drop a note from the index"""
+        self._notes.pop(note_id, None)
+        for token in self._tokens_by_note.pop(note_id, ()):
+            self._discard(token, note_id)
+
+    def search(self, query: str) -> Set[int]:
+        """
+        Find notes whose title or content contains the query (case-insensitive)
+
+        Args:
+            query: Search query string
+
+        Returns:
+            Set of matching note ids
+        """
+        query_lower = query.strip().lower() if query else ""
+        if not query_lower:
+            return set(self._notes)
+
+        parts = query_lower.split()
+        if len(parts) == 1:
+            result = set()
+            for token in self._matching_tokens(query_lower):
+                posting = self._postings.get(token)
+                if posting:
+                    result |= posting
+            return result
+
+        # Every part lies inside some word of a matching note
+        candidates = None
+        for part in sorted(parts, key=len, reverse=True):
+            ids = set()
+            for token in self._matching_tokens(part, remember=False):
+                posting = self._postings.get(token)
+                if posting:
+                    ids |= posting
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+
+        # Peek so verifying the candidates does not flush the body cache
+        return {
+            note_id for note_id in candidates
+            if query_lower in (self._notes[note_id].title or "").lower()
+            or query_lower in (self._notes[note_id].peek_content() or "").lower()
+        }
+
+    def _matching_tokens(self, fragment: str, remember: bool = True) -> List[str]:
+        """Words of the vocabulary containing the fragment"""
+        if self._last_query is not None and self._last_query in fragment:
+            tokens = [token for token in self._last_tokens if fragment in token]
+        else:
+            self._refresh_blob()
+            tokens = []
+            blob = self._blob
+            starts = self._blob_starts
+            position = blob.find(fragment)
+            while position != -1:
+                i = bisect_right(starts, position) - 1
+                tokens.append(self._blob_tokens[i])
+                # Continue after this word so each word is reported once
+                next_start = starts[i + 1] if i + 1 < len(starts) else len(blob)
+                position = blob.find(fragment, next_start)
+
+        if remember:
+            self._last_query = fragment
+            self._last_tokens = tokens
+        return tokens
+
+    def _discard(self, token: str, note_id: int):
+        """Remove a note from a word's posting, dropping the word when unused"""
+        posting = self._postings.get(token)
+        if posting is None:
+            return
+        posting.discard(note_id)
+        if not posting:
+            del self._postings[token]
+            self._stale_tokens += 1
+
+    def _refresh_blob(self):
+        """Append new words to the vocabulary blob, rebuilding it when mostly stale"""
+        if self._stale_tokens > len(self._blob_tokens) // 2:
+            self._blob = ""
+            self._blob_tokens = []
+            self._blob_starts = []
+            self._pending_tokens = list(self._postings)
+            self._stale_tokens = 0
+        if not self._pending_tokens:
+            return
+
+        position = len(self._blob) + 1 if self._blob else 0
+        for token in self._pending_tokens:
+            self._blob_starts.append(position)
+            position += len(token) + 1
+        self._blob_tokens.extend(self._pending_tokens)
+        addition = "\n".join(self._pending_tokens)
+        self._blob = f"{self._blob}\n{addition}" if self._blob else addition
+        self._pending_tokens = []
+
+
+def _searchable_text(note: Note) -> str:
+    """
+    Lowercase title and content, NUL-separated and NUL-padded
+    
+    NUL never appears in a search query. The padding puts every one and two
+    character substring into some trigram. The content is read without
+    adding it to the body cache, so searching never evicts open notes.
+    """
+    content = note.peek_content()
+    return f"\0{note.title or ''}\0{content or ''}\0".lower()
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Distinct three-character substrings of text"""
+    return set(map("".join, zip(text, text[1:], text[2:])))
+
+
+def _position_masks(text: str) -> Dict[str, int]:
+    """Bit p set for each trigram starting at position p, for the first MASK_BITS positions"""
+    masks: Dict[str, int] = {}
+    for position in range(min(len(text) - 2, MASK_BITS)):
+        trigram = text[position:position + 3]
+        masks[trigram] = masks.get(trigram, 0) | (1 << position)
+    return masks
+
+
+def _posting_contains(posting: array, note_id: int) -> bool:
+    """Membership test on a sorted posting array"""
+    i = bisect_left(posting, note_id)
+    return i < len(posting) and posting[i] == note_id
+
+
+class TrigramIndex:
+    """
+    Trigram index answering the same substring queries as filter_notes_by_query
+
+    Every three-character substring of a note's lowercase title and content
+    maps to a sorted array of note ids. A query is answered by intersecting
+    the arrays of its trigrams, rarest first, and checking the few remaining
+    candidates. Queries shorter than three characters scan the stored
+    lowercase text instead.
+
+    With keep_text=False no text is kept. Each posting entry carries a bit
+    mask of where the trigram starts within the first MASK_BITS characters,
+    so a candidate is confirmed from the masks when the query occurs there,
+    and rejected when the whole text fits into the masks. Only the remaining
+    candidates are read (without filling the body cache). Short queries use
+    the trigrams that contain them. Trigrams of edited or removed notes stay
+    in place, edited notes are always read, and needs_compaction tells when
+    the index is worth rebuilding.
+    """
+
+    # Stop intersecting once this few candidates remain; checking them is cheaper
+    VERIFY_THRESHOLD = 32
+
+    def __init__(self, notes: Iterable[Note] = (), keep_text: bool = True):
+        """
+        Args:
+            notes: Notes to index initially
+            keep_text: Keep each note's lowercase text for checking candidates
+        """
+        self.keep_text = keep_text
+        self._texts: Dict[int, str] = {}
+        self._notes: Dict[int, Note] = {}
+        self._postings: Dict[str, array] = {}
+        # Position masks parallel to the postings (keep_text=False)
+        self._masks: Dict[str, array] = {}
+        # Notes whose text is longer than the masks cover
+        self._partial: Set[int] = set()
+        # Notes edited since they were indexed, and removed notes still in postings
+        self._stale: Set[int] = set()
+        self._removed = 0
+
+        building: Dict[str, list] = {}
+        for note in notes:
+            text = _searchable_text(note)
+            if keep_text:
+                self._texts[note.id] = text
+                entries = dict.fromkeys(_trigrams(text), note.id)
+            else:
+                self._notes[note.id] = note
+                masks = self._note_masks(note.id, text)
+                entries = {trigram: (note.id, masks.get(trigram, 0)) for trigram in _trigrams(text)}
+            for trigram, entry in entries.items():
+                ids = building.get(trigram)
+                if ids is None:
+                    building[trigram] = [entry]
+                else:
+                    ids.append(entry)
+        for trigram, entries in building.items():
+            entries.sort()
+            if keep_text:
+                self._postings[trigram] = array('I', entries)
+            else:
+                self._postings[trigram] = array('I', [note_id for note_id, _ in entries])
+                self._masks[trigram] = array('Q', [mask for _, mask in entries])
+
+    def __len__(self) -> int:
+        return len(self._texts) if self.keep_text else len(self._notes)
+
+    @property
+    def needs_compaction(self) -> bool:
+        """Whether enough notes changed since indexing that a rebuild pays off (keep_text=False)"""
+        outdated = len(self._stale) + self._removed
+        return outdated > max(COMPACT_MIN, len(self._notes) // 4)
+
+    def notes(self) -> List[Note]:
+        """Indexed notes, to build a compacted index from (keep_text=False)"""
+        return list(self._notes.values())
+
+    def add(self, note: Note):
+        """Index a new note (or re-index an existing one)"""
+        self.update(note)
+
+    def update(self, note: Note):
+        """Re-index a note after its title or content changed"""
+        if not self.keep_text:
+            if note.id in self._notes:
+                # Its old trigrams are unknown; they stay until compaction
+                self._stale.add(note.id)
+            self._notes[note.id] = note
+            text = _searchable_text(note)
+            masks = self._note_masks(note.id, text)
+            for trigram in _trigrams(text):
+                self._insert(trigram, note.id, masks.get(trigram, 0))
+            return
+
+        old_text = self._texts.get(note.id)
+        text = _searchable_text(note)
+        if text == old_text:
+            return
+        old_trigrams = _trigrams(old_text) if old_text is not None else set()
+        new_trigrams = _trigrams(text)
+        self._texts[note.id] = text
+
+        for trigram in old_trigrams - new_trigrams:
+            self._discard(trigram, note.id)
+        for trigram in new_trigrams - old_trigrams:
+            self._insert(trigram, note.id)
+
+    def remove(self, note_id: int):
+        """Drop a note from the index"""
+        if not self.keep_text:
+            if self._notes.pop(note_id, None) is not None:
+                self._stale.discard(note_id)
+                self._partial.discard(note_id)
+                self._removed += 1
+            return
+
+        text = self._texts.pop(note_id, None)
+        if text is None:
+            return
+        for trigram in _trigrams(text):
+            self._discard(trigram, note_id)
+
+    def search(self, query: str) -> Set[int]:
+        """
+        Find notes whose title or content contains the query (case-insensitive)
+
+        Args:
+            query: Search query string
+
+        Returns:
+            Set of matching note ids
+        """
+        query_lower = query.strip().lower() if query else ""
+        if not query_lower:
+            return set(self._texts) if self.keep_text else set(self._notes)
+
+        texts = self._texts
+        if len(query_lower) < 3:
+            if self.keep_text:
+                return {note_id for note_id, text in texts.items() if query_lower in text}
+            # Padding puts every short substring into a trigram
+            ids = set()
+            for trigram, posting in self._postings.items():
+                if query_lower in trigram:
+                    ids.update(posting)
+            return self._verify(ids, query_lower)
+
+        postings = []
+        for trigram in _trigrams(query_lower):
+            posting = self._postings.get(trigram)
+            if posting is None:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if len(candidates) <= self.VERIFY_THRESHOLD:
+                break
+            if len(candidates) * 16 < len(posting):
+                # Few candidates against a long array: binary search each one
+                candidates = [note_id for note_id in candidates if _posting_contains(posting, note_id)]
+            else:
+                candidates = set(candidates)
+                candidates.intersection_update(posting)
+            if not candidates:
+                return set()
+
+        if not self.keep_text:
+            return self._verify(candidates, query_lower)
+        if len(query_lower) == 3:
+            # A single trigram's posting is already exact
+            return set(candidates)
+        return {note_id for note_id in candidates if query_lower in texts[note_id]}
+
+    def _verify(self, candidates, query_lower: str) -> Set[int]:
+        """
+        Check candidates of a keep_text=False search
+
+        Postings are exact for queries of up to three characters; longer
+        queries are checked against the position masks first. Notes are only
+        read when neither settles it.
+        """
+        notes = self._notes
+        stale = self._stale
+        trigrams = None
+        if len(query_lower) > 3:
+            trigrams = [query_lower[i:i + 3] for i in range(len(query_lower) - 2)]
+
+        result = set()
+        for note_id in candidates:
+            note = notes.get(note_id)
+            if note is None:
+                continue
+            if note_id not in stale:
+                found = True if trigrams is None else self._occurs(note_id, trigrams)
+                if found is not None:
+                    if found:
+                        result.add(note_id)
+                    continue
+            if query_lower in _searchable_text(note):
+                result.add(note_id)
+        return result
+
+    def _occurs(self, note_id: int, trigrams: List[str]) -> Optional[bool]:
+        """
+        Whether consecutive trigrams occur in a note, from the position masks
+
+        Returns:
+            True or False when the masks settle it, None when the text must be read
+        """
+        # Bit p stays set while trigram i starts at p + i for every i so far
+        chain = ~0
+        for offset, trigram in enumerate(trigrams):
+            posting = self._postings.get(trigram)
+            if posting is None:
+                return False
+            i = bisect_left(posting, note_id)
+            if i == len(posting) or posting[i] != note_id:
+                return False
+            chain &= self._masks[trigram][i] >> offset
+        if chain:
+            return True
+        return None if note_id in self._partial else False
+
+    def _note_masks(self, note_id: int, text: str) -> Dict[str, int]:
+        """Position masks of a note's text, remembering whether they cover all of it"""
+        if len(text) - 2 > MASK_BITS:
+            self._partial.add(note_id)
+        else:
+            self._partial.discard(note_id)
+        return _position_masks(text)
+
+    def _insert(self, trigram: str, note_id: int, mask: int = 0):
+        """Add a note id (and its position mask) to a trigram's posting array"""
+        posting = self._postings.get(trigram)
+        masks = self._masks.get(trigram) if not self.keep_text else None
+        if posting is None:
+            self._postings[trigram] = array('I', [note_id])
+            if not self.keep_text:
+                self._masks[trigram] = array('Q', [mask])
+            return
+        i = len(posting)
+        if posting and posting[-1] >= note_id:
+            i = bisect_left(posting, note_id)
+            if posting[i] == note_id:
+                if masks is not None:
+                    masks[i] = mask
+                return
+        # New notes get increasing ids, so this is usually an append
+        posting.insert(i, note_id)
+        if masks is not None:
+            masks.insert(i, mask)
+
+    def _discard(self, trigram: str, note_id: int):
+        """Remove a note from a trigram's posting array"""
+        posting = self._postings.get(trigram)
+        if posting is None:
+            return
+        i = bisect_left(posting, note_id)
+        if i < len(posting) and posting[i] == note_id:
+            del posting[i]
+            if trigram in self._masks:
+                del self._masks[trigram][i]
+            if not posting:
+                del self._postings[trigram]
+                self._masks.pop(trigram, None)
+
+
+def create_index(notes: Iterable[Note] = (), kind: str = "trigram", keep_text: bool = True):
+    """
+    Build a search index
+
+    Args:
+        notes: Notes to index
+        kind: "trigram" (fast for any query, more memory) or "word" (smaller)
+        keep_text: Let the trigram index keep lowercase note text (False reads
+            candidates from position masks and note bodies instead)
+
+    Returns:
+        TrigramIndex or SearchIndex
+    """
+    if kind == "word":
+        return SearchIndex(notes)
+    if kind == "trigram":
+        return TrigramIndex(notes, keep_text=keep_text)
+    raise ValueError(f"Unknown search index kind: {kind}")
+
+
+class BackgroundIndex:
+    """
+    Index built on a background thread so startup does not wait for it
+
+    Building reads every note body, so it runs after the window is up.
+    Changes made while it is building are queued and applied once it is
+    ready; searches wait until then. A trigram index that needs compaction
+    is rebuilt the same way, while searches keep using the current one.
+    Searches and changes may come from different threads: a change never
+    waits for the build, only for a search that is running on the index.
+    """
+
+    def __init__(self, notes: Iterable[Note] = (), kind: str = "trigram", keep_text: bool = True):
+        """
+        Args:
+            notes: Notes to index (the collection is copied, the notes are not)
+            kind: Index kind, see create_index
+            keep_text: See create_index
+        """
+        self._lock = threading.Lock()
+        # Held while the built index is searched or changed
+        self._index_lock = threading.Lock()
+        self._index = None
+        self._pending: Optional[list] = []
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._build, args=(list(notes), kind, keep_text), name="SearchIndexBuild", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the index has been built"""
+        return self._ready.is_set()
+
+    def __len__(self) -> int:
+        self._ready.wait()
+        return len(self._index)
+
+    def add(self, note: Note):
+        """Index a new note (or re-index an existing one)"""
+        self._apply("add", note)
+
+    def update(self, note: Note):
+        """Re-index a note after its title or content changed"""
+        self._apply("update", note)
+
+    def remove(self, note_id: int):
+        """Drop a note from the index"""
+        self._apply("remove", note_id)
+
+    def search(self, query: str) -> Set[int]:
+        """Find matching note ids (waits for the build to finish)"""
+        self._ready.wait()
+        with self._index_lock:
+            return self._index.search(query)
+
+    def _apply(self, method: str, argument):
+        """Forward a change, and queue it while an index is being built"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((method, argument))
+            index = self._index
+        if index is None:
+            return
+        with self._index_lock:
+            getattr(index, method)(argument)
+        if getattr(index, "needs_compaction", False):
+            self._compact(index)
+
+    def _compact(self, index):
+        """Rebuild a trigram index without stale postings on a background thread"""
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = []
+        self._thread = threading.Thread(
+            target=self._build, args=(index.notes(), "trigram", index.keep_text),
+            name="SearchIndexCompact", daemon=True
+        )
+        self._thread.start()
+
+    def _build(self, notes: List[Note], kind: str, keep_text: bool):
+        """Build the index, then replay changes made in the meantime"""
+        try:
+            index = create_index(notes, kind, keep_text)
+        except Exception:
+            # An unreadable note must not leave searches waiting forever
+            index = create_index((), kind, keep_text)
+            for note in notes:
+                try:
+                    index.add(note)
+                except Exception:
+                    pass
+        with self._lock:
+            for method, argument in self._pending:
+                getattr(index, method)(argument)
+            self._index = index
+            self._pending = None
+        self._ready.set()
+
+
+class StoredIndex:
+    """
+    Search through a storage backend's persistent index
+
+    The backend only knows saved notes, so notes added, changed or removed
+    since loading are tracked in a small in-memory trigram index whose
+    results replace the backend's for those notes. Queries the backend
+    cannot answer (e.g. shorter than three characters) scan the notes.
+    The backend is queried without holding the lock that changes wait for.
+    """
+
+    def __init__(self, search: Callable[[str], Optional[Set[int]]], notes: Iterable[Note]):
+        """
+        Args:
+            search: Backend search returning matching ids or None
+            notes: Live note collection (scanned for queries the backend cannot answer)
+        """
+        self._search = search
+        self._notes = notes
+        self._changed = TrigramIndex(keep_text=False)
+        self._touched: Set[int] = set()
+        # Held while the changed notes are searched or updated
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        """Always ready; the persistent index needs no build"""
+        return True
+
+    def add(self, note: Note):
+        """Index a new note (or re-index an existing one)"""
+        self.update(note)
+
+    def update(self, note: Note):
+        """Re-index a note after its title or content changed"""
+        with self._lock:
+            self._touched.add(note.id)
+            self._changed.update(note)
+            if self._changed.needs_compaction:
+                # Only notes changed since loading: small enough to rebuild right away
+                self._changed = TrigramIndex(self._changed.notes(), keep_text=False)
+
+    def remove(self, note_id: int):
+        """Drop a note from the index"""
+        with self._lock:
+            self._touched.add(note_id)
+            self._changed.remove(note_id)
+
+    def search(self, query: str) -> Set[int]:
+        """Find matching note ids"""
+        stored = self._search(query)
+        with self._lock:
+            if stored is None:
+                query_lower = query.strip().lower() if query else ""
+                return {note.id for note in self._notes if query_lower in _searchable_text(note)}
+            return (stored - self._touched) | self._changed.search(query)
@@ -0,0 +1,138 @@
+"""Debounced background search with cancellation of superseded queries"""
+import threading
+import time
+from typing import Callable, Optional, Set
+
+from metrics import metrics
+
+
+class SearchWorker:
+    """
+    Run searches on a worker thread
+
+    Each submit bumps a generation number. The worker waits until no new
+    query arrived for the debounce window, searches for the newest one only,
+    and hands the result to the dispatch function (e.g. a root.after wrapper).
+    A result is dropped if another query or cancel() came in meanwhile, so a
+    burst of keystrokes produces one search and one UI update.
+    """
+
+    def __init__(self, search_func: Callable[[str], Set[int]],
+                 dispatch: Optional[Callable[[Callable], None]] = None,
+                 debounce_ms: int = 150):
+        """
+        Args:
+            search_func: Returns the matching note ids for a query
+            dispatch: Runs a callback on the UI thread (callbacks run on the worker thread if None)
+            debounce_ms: How long the query must stay unchanged before searching
+        """
+        self.search_func = search_func
+        self.dispatch = dispatch
+        self.debounce = debounce_ms / 1000
+
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending = None
+        self._due = 0.0
+        self._last_query: Optional[str] = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="SearchWorker", daemon=True)
+        self._worker.start()
+
+    @property
+    def generation(self) -> int:
+        """Number of the newest query (or cancellation)"""
+        return self._generation
+
+    def submit(self, query: str, on_result: Callable[[str, Set[int]], None], force: bool = False) -> bool:
+        """
+        Search for query once typing pauses
+
+        Args:
+            query: Search query string
+            on_result: Called with (query, matching note ids) unless superseded
+            force: Search even if the query did not change (e.g. after the notes changed)
+
+        Returns:
+            False if the query is the same as the previous one and was skipped
+        """
+        key = query.strip().lower()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SearchWorker is closed")
+            if key == self._last_query and not force:
+                metrics.count("search.skipped")
+                return False
+            self._last_query = key
+            self._generation += 1
+            self._pending = (query, on_result, self._generation)
+            self._due = time.monotonic() + self.debounce
+            self._cond.notify()
+        return True
+
+    def cancel(self):
+        """Drop the pending query and any result that has not been applied yet"""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+            self._last_query = None
+            self._cond.notify()
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop the worker thread"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending = None
+            self._cond.notify()
+        self._worker.join(timeout)
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                # Wait until the query stopped changing
+                while not self._closed and self._pending is not None:
+                    remaining = self._due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                if self._pending is None:
+                    continue
+                query, on_result, generation = self._pending
+                self._pending = None
+
+            try:
+                with metrics.timer("search.query"):
+                    result = self.search_func(query)
+            except Exception:
+                # A failed search leaves the current view as it is
+                continue
+
+            if generation == self._generation:
+                self._dispatch(lambda: self._deliver(generation, query, result, on_result))
+            else:
+                metrics.count("search.superseded")
+
+    def _deliver(self, generation: int, query: str, result: Set[int], on_result):
+        """Apply a result on the UI thread if nothing newer was submitted"""
+        if generation == self._generation:
+            on_result(query, result)
+        else:
+            metrics.count("search.superseded")
+
+    def _dispatch(self, callback: Callable[[], None]):
+        """Hand a callback to the UI thread"""
+        try:
+            if self.dispatch:
+                self.dispatch(callback)
+            else:
+                callback()
+        except Exception:
+            # The UI may already be gone during shutdown
+            pass
@@ -0,0 +1,288 @@
+"""SQLite storage backend with per-row encryption and an FTS5 index of keyed trigram tokens"""
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from encryption import KeyManager, get_key_manager
+from models import PREVIEW_LENGTH, Note, timestamp_from_date
+from record_store import fingerprint
+from storage_backend import StorageBackend
+
+SCHEMA_VERSION = 1
+_SEARCH_KEY_INFO = b"notestack-search-v1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    meta BLOB NOT NULL,
+    body BLOB NOT NULL
+);
+"""
+# Trigram tokens are keyed hashes, so the index reveals nothing without the key
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS note_terms USING fts5(terms, tokenize='ascii')"
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Every three-character substring"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Notes in an SQLite database (WAL mode)
+
+    Each row holds the metadata (id, title, date, preview) and the body as
+    separately encrypted stream containers; only the id and display
+    position are stored in the clear. Saves update the changed rows in one
+    transaction. Searching uses an FTS5 table of the note's trigrams, each
+    replaced by a hash keyed with a key derived for search only; candidates
+    of queries longer than three characters are decrypted and checked.
+    Every thread reads through its own connection, so body reads and
+    searches run alongside a save.
+    """
+
+    def __init__(self, path: Path, keys: Optional[KeyManager] = None):
+        """
+        Args:
+            path: Database file path
+            keys: Key manager to encrypt with (shared default if None)
+        """
+        self.path = Path(path)
+        self.keys = keys if keys is not None else get_key_manager()
+        self._next_id = 1
+        self._fingerprints: Dict[int, tuple] = {}
+        self._order: List[int] = []
+        self._search_key: Optional[bytes] = None
+        self._has_fts = False
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self, bodies=None) -> List[Note]:
+        conn = self._reader()
+        notes = []
+        for note_id, sealed_meta, sealed_body in conn.execute(
+            f"SELECT id, meta, {'NULL' if bodies is not None else 'body'} FROM notes ORDER BY position"
+        ):
+            meta = self._open_meta(sealed_meta)
+            timestamp = timestamp_from_date(meta.get("date"))
+            if bodies is not None:
+                note = Note.lazy(note_id, meta.get("title", ""), timestamp, bodies, meta.get("preview"))
+            else:
+                note = Note(self._open(sealed_body), meta.get("title", ""), note_id, timestamp=timestamp)
+            notes.append(note)
+
+        self._fingerprints = {note.id: fingerprint(note) for note in notes}
+        self._order = [note.id for note in notes]
+        row = conn.execute("SELECT value FROM settings WHERE name = 'next_id'").fetchone()
+        self._next_id = max(row[0] if row else 1, max(self._order, default=0) + 1)
+        return notes
+
+    def get(self, note_id: int) -> Optional[Note]:
+        row = self._reader().execute("SELECT meta, body FROM notes WHERE id = ?", (note_id,)).fetchone()
+        if row is None:
+            return None
+        meta = self._open_meta(row[0])
+        return Note(self._open(row[1]), meta.get("title", ""), note_id, timestamp=timestamp_from_date(meta.get("date")))
+
+    def put(self, note: Note):
+        order = self._order if note.id in self._fingerprints else self._order + [note.id]
+        self._write([note], order)
+
+    def delete(self, note_id: int) -> bool:
+        if note_id not in self._fingerprints:
+            return False
+        self._write([], [other for other in self._order if other != note_id])
+        return True
+
+    def save(self, notes: Iterable[Note]) -> bool:
+        notes = list(notes)
+        changed = [note for note in notes if self._fingerprints.get(note.id) != fingerprint(note)]
+        try:
+            self._write(changed, [note.id for note in notes])
+            return True
+        except sqlite3.Error:
+            return False
+
+    def iter_metadata(self) -> Iterator[dict]:
+        for note_id, sealed_meta in self._reader().execute("SELECT id, meta FROM notes ORDER BY position"):
+            meta = self._open_meta(sealed_meta)
+            yield {"id": note_id, "title": meta.get("title", ""), "date": meta.get("date"), "preview": meta.get("preview")}
+
+    def read_body(self, note_id: int) -> str:
+        row = self._reader().execute("SELECT body FROM notes WHERE id = ?", (note_id,)).fetchone()
+        if row is None:
+            raise KeyError(note_id)
+        return self._open(row[0])
+
+    @property
+    def has_search_index(self) -> bool:
+        return self._reader_has_fts()
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        query_lower = query.strip().lower() if query else ""
+        # Tokens only exist for whole trigrams; shorter queries need a scan
+        if len(query_lower) < 3 or not self._reader_has_fts():
+            return None
+
+        terms = " AND ".join(f'"{token}"' for token in self._tokens(query_lower))
+        conn = self._reader()
+        candidates = [row[0] for row in conn.execute("SELECT rowid FROM note_terms WHERE note_terms MATCH ?", (terms,))]
+        if len(query_lower) == 3:
+            return set(candidates)
+
+        matched = set()
+        for note_id in candidates:
+            row = conn.execute("SELECT meta, body FROM notes WHERE id = ?", (note_id,)).fetchone()
+            if row is None:
+                continue
+            title = self._open_meta(row[0]).get("title", "")
+            if query_lower in title.lower() or query_lower in self._open(row[1]).lower():
+                matched.add(note_id)
+        return matched
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._local = threading.local()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _write(self, changed: List[Note], order: List[int]):
+        """Upsert changed rows, delete missing ones and renumber moved ones in one transaction"""
+        next_id = max(self._next_id, max(order, default=0) + 1)
+        if not changed and order == self._order and next_id == self._next_id and self.path.exists():
+            return
+
+        rows = []
+        terms = []
+        for note in changed:
+            content = note.content
+            meta = {"id": note.id, "title": note.title, "date": note.date}
+            if not note.title:
+                meta["preview"] = content[:PREVIEW_LENGTH]
+            rows.append((note.id, self._seal(json.dumps(meta, ensure_ascii=False)), self._seal(content)))
+            text = f"\0{note.title or ''}\0{content}\0".lower()
+            terms.append((note.id, " ".join(self._tokens(text))))
+
+        live = set(order)
+        removed = [(note_id,) for note_id in self._order if note_id not in live]
+        old_positions = {note_id: position for position, note_id in enumerate(self._order)}
+        changed_ids = {note.id for note in changed}
+
+        with self._write_lock:
+            conn = self._connect_writer()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO notes (id, position, meta, body) VALUES (?, 0, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET meta = excluded.meta, body = excluded.body",
+                    rows
+                )
+                conn.executemany("DELETE FROM notes WHERE id = ?", removed)
+                conn.executemany(
+                    "UPDATE notes SET position = ? WHERE id = ?",
+                    [
+                        (position, note_id) for position, note_id in enumerate(order)
+                        if old_positions.get(note_id) != position or note_id in changed_ids
+                    ]
+                )
+                if self._has_fts:
+                    conn.executemany("DELETE FROM note_terms WHERE rowid = ?", removed + [(row[0],) for row in terms])
+                    conn.executemany("INSERT INTO note_terms (rowid, terms) VALUES (?, ?)", terms)
+                conn.execute(
+                    "INSERT INTO settings (name, value) VALUES ('next_id', ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                    (next_id,)
+                )
+
+        for note in changed:
+            self._fingerprints[note.id] = fingerprint(note)
+        for (note_id,) in removed:
+            del self._fingerprints[note_id]
+        self._order = list(order)
+        self._next_id = next_id
+
+    def _connect_writer(self) -> sqlite3.Connection:
+        """Open the write connection and create the schema (write lock held)"""
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL keeps the database consistent; the last commits may be lost on power failure
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.executescript(_SCHEMA)
+                try:
+                    conn.execute(_FTS_SCHEMA)
+                    self._has_fts = True
+                except sqlite3.OperationalError:
+                    # SQLite built without FTS5: search falls back to the in-memory index
+                    self._has_fts = False
+                conn.execute(
+                    "INSERT OR IGNORE INTO settings (name, value) VALUES ('schema_version', ?)",
+                    (SCHEMA_VERSION,)
+                )
+            self._writer = conn
+        return self._writer
+
+    def _reader(self) -> sqlite3.Connection:
+        """Connection for the calling thread (the database is created first if missing)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._write_lock:
+                self._connect_writer()
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _reader_has_fts(self) -> bool:
+        """Whether the search table exists"""
+        self._reader()
+        return self._has_fts
+
+    def _tokens(self, text: str) -> List[str]:
+        """Keyed hashes of the trigrams of text (hex, sorted)"""
+        if self._search_key is None:
+            self._search_key = self.keys.derive_key(_SEARCH_KEY_INFO)
+        key = self._search_key
+        return sorted({
+            hashlib.blake2b(trigram.encode('utf-8'), digest_size=8, key=key).hexdigest()
+            for trigram in _trigrams(text)
+        })
+
+    def _seal(self, text: str) -> bytes:
+        """Encrypt a string into a stream container"""
+        return b"".join(self.keys.encrypt_stream([text.encode('utf-8')]))
+
+    def _open(self, sealed: bytes) -> str:
+        """Decrypt a stream container to a string"""
+        return b"".join(self.keys.decrypt_stream(io.BytesIO(sealed))).decode('utf-8')
+
+    def _open_meta(self, sealed: bytes) -> dict:
+        """Decrypt row metadata"""
+        return json.loads(self._open(sealed))
+
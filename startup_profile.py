@@ -0,0 +1,105 @@
+"""Startup phase timings (printed by `python main.py --startup-profile`)"""
+import threading
+import time
+from typing import Dict, List
+
+
+class _Phase:
+    """Context manager that adds its duration to a phase"""
+
+    __slots__ = ("profile", "name", "started", "nested")
+
+    def __init__(self, profile: 'StartupProfile', name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.profile._stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        stack = self.profile._stack
+        stack.pop()
+        if stack:
+            # Time of a nested phase is not counted again in the outer one
+            stack[-1].nested += elapsed
+        else:
+            self.profile._phase_time += elapsed
+        self.profile.add(self.name, elapsed - self.nested)
+
+
+class _NoPhase:
+    """Shared no-op phase used while profiling is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class StartupProfile:
+    """
+    Time spent in each startup phase
+
+    Sequential phases are closed with mark(), which books the time since the
+    previous mark. Work that is spread out (decrypting and parsing records)
+    is wrapped in phase(); nested phases are booked exclusively, so the
+    outer phase only gets its own time. phase() is a no-op unless enabled
+    and only times the thread that enabled profiling, so background work
+    does not skew the numbers.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._started = time.perf_counter()
+        self._last_mark = self._started
+        self._thread = None
+        self._stack: List[_Phase] = []
+        self._phases: Dict[str, float] = {}
+        # Time spent in phase() blocks, and its value at the previous mark
+        self._phase_time = 0.0
+        self._phase_time_at_mark = 0.0
+
+    def enable(self):
+        """Start timing phase() blocks on the calling thread"""
+        self.enabled = True
+        self._thread = threading.get_ident()
+
+    def phase(self, name: str):
+        """Context manager that books its duration under name"""
+        if not self.enabled or threading.get_ident() != self._thread:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def mark(self, name: str):
+        """Book the time since the previous mark, minus timed phases, under name"""
+        now = time.perf_counter()
+        self.add(name, (now - self._last_mark) - (self._phase_time - self._phase_time_at_mark))
+        self._last_mark = now
+        self._phase_time_at_mark = self._phase_time
+
+    def add(self, name: str, seconds: float):
+        """Add seconds to a phase"""
+        self._phases[name] = self._phases.get(name, 0.0) + seconds
+
+    def report(self) -> str:
+        """Phase timings in the order the phases first ran"""
+        total = time.perf_counter() - self._started
+        lines = [f"{'phase':<20}{'ms':>10}"]
+        for name, seconds in self._phases.items():
+            lines.append(f"{name:<20}{seconds * 1000:>10.1f}")
+        lines.append(f"{'total':<20}{total * 1000:>10.1f}")
+        return "\n".join(lines)
+
+
+# Created when main.py starts importing, so "imports" covers the module imports
+startup_profile = StartupProfile()
@@ -1,11 +1,24 @@
 """Note storage operations"""
+import atexit
 import json
 import os
 from pathlib import Path
-from typing import List
-from models import Note
-from config import DATA_DIR, NOTES_FILE, KEY_FILE
-from encryption import encrypt_data, decrypt_data, get_or_create_key
+from typing import Iterable, List, Optional, Set
+from models import Note, NoteCollection
+from config import (
+    DATA_DIR, NOTES_FILE, KEY_FILE, RECORDS_FILE, JOURNAL_FILE, JOURNAL_ENABLED,
+    JOURNAL_SYNC_INTERVAL_MS, JOURNAL_COMPACT_ENTRIES, JOURNAL_COMPACT_BYTES, BODY_CACHE_ENTRIES,
+    BODY_CACHE_BYTES, STORAGE_BACKEND, SQLITE_FILE, COMPRESSION, COMPRESSION_LEVEL, COMPRESSION_DICTIONARY
+)
+from body_cache import BodyCache
+from compression import Compressor
+from encryption import KeyLockedError, decrypt_data
+from metrics import metrics
+from note_codec import import_json
+from storage_backend import FileBackend, StorageBackend
+
+_backend: Optional[StorageBackend] = None
+_bodies: Optional[BodyCache] = None
 
 
 def ensure_data_dir():
@@ -13,6 +26,74 @@ def ensure_data_dir():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def get_backend() -> StorageBackend:
+    """Get the shared storage backend chosen by STORAGE_BACKEND (closed automatically at interpreter exit)"""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "sqlite":
+            from sqlite_backend import SqliteBackend
+            _backend = SqliteBackend(SQLITE_FILE)
+        elif STORAGE_BACKEND == "file":
+            _backend = FileBackend(
+                RECORDS_FILE,
+                JOURNAL_FILE,
+                journal_enabled=JOURNAL_ENABLED,
+                sync_interval=JOURNAL_SYNC_INTERVAL_MS / 1000,
+                compact_entries=JOURNAL_COMPACT_ENTRIES,
+                compact_bytes=JOURNAL_COMPACT_BYTES,
+                compressor=Compressor(COMPRESSION, COMPRESSION_LEVEL) if COMPRESSION != "none" else None,
+                train_dictionary=COMPRESSION_DICTIONARY
+            )
+        else:
+            raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND!r}")
+        atexit.register(_backend.close)
+    return _backend
+
+
+def get_body_cache() -> BodyCache:
+    """Get the shared cache of decrypted note bodies"""
+    global _bodies
+    if _bodies is None:
+        _bodies = BodyCache(
+            metrics.timed("storage.read_body")(get_backend().read_body),
+            max_entries=BODY_CACHE_ENTRIES,
+            max_bytes=BODY_CACHE_BYTES
+        )
+        metrics.add_source("body_cache", _bodies.stats)
+    return _bodies
+
+
+def _ensure_unique_ids(notes: List[Note]):
+    """Give notes with missing or duplicate ids a fresh id (older versions could reuse ids)"""
+    next_id = max((note.id for note in notes if isinstance(note.id, int)), default=0) + 1
+    seen = set()
+    for note in notes:
+        if not isinstance(note.id, int) or note.id in seen:
+            note.id = next_id
+            next_id += 1
+        seen.add(note.id)
+
+
+def _move_aside(path: Path, suffix: str):
+    """Rename a file out of the way, keeping it for manual recovery"""
+    try:
+        os.replace(path, path.with_name(path.name + suffix))
+    except OSError:
+        pass
+
+
+def _load_legacy_file() -> Optional[List[Note]]:
+    """Read the single-blob notes.json (encrypted or plain JSON)"""
+    try:
+        encrypted_data = NOTES_FILE.read_bytes()
+        return import_json(decrypt_data(encrypted_data))
+    except Exception:
+        try:
+            return import_json(NOTES_FILE.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, IOError, KeyError, UnicodeDecodeError):
+            return None
+
+
 def _migrate_old_data() -> List[Note]:
     """Migrate notes from old project directory to new app data directory"""
     # Check both old project directory and redirected APPDATA location
@@ -46,9 +127,7 @@ def _migrate_old_data() -> List[Note]:
             from cryptography.fernet import Fernet
             fernet = Fernet(old_key)
             encrypted_data = old_notes_path.read_bytes()
-            decrypted_json = fernet.decrypt(encrypted_data).decode('utf-8')
-            data = json.loads(decrypted_json)
-            notes = [Note.from_dict(note_dict) for note_dict in data]
+            notes = import_json(fernet.decrypt(encrypted_data).decode('utf-8'))
         except Exception:
             # Fall through to try other methods
             pass
@@ -57,15 +136,11 @@ def _migrate_old_data() -> List[Note]:
     if not notes:
         try:
             encrypted_data = old_notes_path.read_bytes()
-            decrypted_json = decrypt_data(encrypted_data)
-            data = json.loads(decrypted_json)
-            notes = [Note.from_dict(note_dict) for note_dict in data]
+            notes = import_json(decrypt_data(encrypted_data))
         except Exception:
             # Try plain text
             try:
-                with old_notes_path.open('r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    notes = [Note.from_dict(note_dict) for note_dict in data]
+                notes = import_json(old_notes_path.read_text(encoding='utf-8'))
             except (json.JSONDecodeError, IOError, KeyError):
                 pass
     
@@ -84,62 +159,97 @@ def _migrate_old_data() -> List[Note]:
     return notes
 
 
-def load_notes() -> List[Note]:
+@metrics.timed("storage.load_notes")
+def load_notes() -> NoteCollection:
     """
     Load notes (encrypted, with backward compatibility and migration)
     
+    Only titles and metadata are decrypted; note bodies are read through
+    the body cache when a note's content is first accessed, and content that
+    is held in memory is kept sealed by it.
+    
     Returns:
-        List of Note objects
+        NoteCollection with the stored notes and id counter
     """
     ensure_data_dir()
-    
-    if NOTES_FILE.exists():
+    backend = get_backend()
+    notes = _load_stored(backend)
+    collection = NoteCollection(notes, next_id=backend.next_id, bodies=get_body_cache())
+    backend.adopt(collection)
+    return collection
+
+
+def _load_stored(backend: StorageBackend) -> List[Note]:
+    """Load from the backend, migrating older formats into it first"""
+    if backend.exists():
         try:
-            with NOTES_FILE.open('rb') as f:
-                encrypted_data = f.read()
-            
-            decrypted_json = decrypt_data(encrypted_data)
-            data = json.loads(decrypted_json)
-            return [Note.from_dict(note_dict) for note_dict in data]
+            return backend.load(bodies=get_body_cache())
+        except KeyLockedError:
+            # Not damage: the stored notes must stay where they are
+            raise
         except Exception:
-            try:
-                with NOTES_FILE.open('r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    notes = [Note.from_dict(note_dict) for note_dict in data]
-                    # Auto-migrate: save encrypted version (using internal save)
-                    if notes:
-                        _save_notes_encrypted(notes)
-                    return notes
-            except (json.JSONDecodeError, IOError, KeyError):
-                pass
+            # Keep the damaged files for recovery (the record file and its
+            # journal together, so neither is replayed without the other)
+            # and fall back to older formats
+            backend.close()
+            for path in backend.paths:
+                _move_aside(path, ".corrupt")
     
-    old_notes = _migrate_old_data()
-    if old_notes:
-        _save_notes_encrypted(old_notes)
-        return old_notes
+    if not isinstance(backend, FileBackend) and (RECORDS_FILE.exists() or JOURNAL_FILE.exists()):
+        # Switched away from the file backend: copy its notes over once
+        source = FileBackend(RECORDS_FILE, JOURNAL_FILE, journal_enabled=False)
+        if backend.save(source.load()):
+            _move_aside(RECORDS_FILE, ".bak")
+            _move_aside(JOURNAL_FILE, ".bak")
+        return backend.load(bodies=get_body_cache())
     
-    return []
-
-
-def _save_notes_encrypted(notes: List[Note]):
-    """Internal function to save notes encrypted (prevents recursion)"""
-    ensure_data_dir()
-    try:
-        notes_data = [note.to_dict() for note in notes]
-        json_str = json.dumps(notes_data, ensure_ascii=False, indent=2)
-        encrypted_data = encrypt_data(json_str)
-        with NOTES_FILE.open('wb') as f:
-            f.write(encrypted_data)
-    except IOError:
-        pass
+    notes = _load_legacy_file() if NOTES_FILE.exists() else None
+    if notes is not None:
+        # Auto-migrate: single-blob notes.json -> storage backend
+        _ensure_unique_ids(notes)
+        if backend.save(notes):
+            _move_aside(NOTES_FILE, ".bak")
+    else:
+        old_notes = _migrate_old_data()
+        if old_notes:
+            _ensure_unique_ids(old_notes)
+            backend.save(old_notes)
+    
+    return backend.load(bodies=get_body_cache())
 
 
-def save_notes(notes: List[Note]):
+@metrics.timed("storage.save_notes")
+def save_notes(notes: Iterable[Note]) -> bool:
     """
-    Save notes (encrypted)
+    Save notes (encrypted, only changed notes are re-encrypted and written)
+    
+    With the file backend in journal mode the changes are appended to the
+    journal and folded into the snapshot later; otherwise changed notes are
+    written directly.
+    
+    The stored id counter advances past every saved id, so ids of deleted
+    notes are not handed out again after a restart.
     
     Args:
-        notes: List of Note objects to save
+        notes: Notes to save, in display order (a list or NoteCollection)
+    
+    Returns:
+        True if the notes were written
     """
-    _save_notes_encrypted(notes)
+    return get_backend().save(notes)
+
+
+def search_notes(query: str) -> Optional[Set[int]]:
+    """Ids of stored notes containing query, or None if the backend has no search index"""
+    return get_backend().search(query)
+
+
+def has_search_index() -> bool:
+    """Whether the storage backend keeps a persistent search index"""
+    return get_backend().has_search_index
+
 
+def flush():
+    """Make sure every saved change is on disk (call before exit)"""
+    if _backend is not None:
+        _backend.close()
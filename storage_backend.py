@@ -0,0 +1,231 @@
+"""Storage backends: the interface storage.py uses and the record file implementation"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set
+
+from compression import Compressor
+from encryption import KeyManager
+from journal import Journal
+from models import Note
+from record_store import RecordStore
+
+
+class StorageBackend(ABC):
+    """
+    Persistent note storage
+
+    load() returns notes without their bodies when a body source is given;
+    bodies are then read one at a time with read_body. save() writes the
+    difference between a full ordered list of notes and what is stored,
+    while put() and delete() change a single note. search() answers a query
+    from a persistent index, or returns None if the backend has none.
+    """
+
+    path: Path
+
+    @property
+    def paths(self) -> List[Path]:
+        """Files holding the stored notes (moved aside together when they cannot be read)"""
+        return [self.path]
+
+    @property
+    @abstractmethod
+    def next_id(self) -> int:
+        """Lowest id that has never been stored"""
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """Check whether anything has been stored yet"""
+
+    @abstractmethod
+    def load(self, bodies=None) -> List[Note]:
+        """
+        Read every note in display order
+
+        Args:
+            bodies: Body source (BodyCache over read_body); if given, notes are
+                returned without content and load it from there
+        """
+
+    def adopt(self, notes: Iterable[Note]):
+        """Called with the loaded notes once they are attached to the body cache"""
+
+    @abstractmethod
+    def get(self, note_id: int) -> Optional[Note]:
+        """Read one note with its content (None if it is not stored)"""
+
+    @abstractmethod
+    def put(self, note: Note):
+        """Write one note (added at the end if it is new)"""
+
+    @abstractmethod
+    def delete(self, note_id: int) -> bool:
+        """Remove one note, returning whether it was stored"""
+
+    @abstractmethod
+    def save(self, notes: Iterable[Note]) -> bool:
+        """
+        Write only what changed
+
+        Args:
+            notes: Full list of notes in display order
+
+        Returns:
+            True if the notes were written
+        """
+
+    @abstractmethod
+    def iter_metadata(self) -> Iterator[dict]:
+        """Yield id, title, date and preview of every note without reading bodies"""
+
+    @abstractmethod
+    def read_body(self, note_id: int) -> str:
+        """Decrypt the stored body of one note"""
+
+    @property
+    def has_search_index(self) -> bool:
+        """Whether search() can answer queries"""
+        return False
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """Ids of notes containing query, or None if the backend has no search index"""
+        return None
+
+    def close(self):
+        """Make sure every change is on disk and release open files"""
+
+
+def note_metadata(note: Note) -> dict:
+    """Metadata dict of a note, as yielded by iter_metadata"""
+    return {"id": note.id, "title": note.title, "date": note.date, "preview": None if note.title else note.preview}
+
+
+class FileBackend(StorageBackend):
+    """
+    Record file (notes.nsr) with an optional write-ahead journal
+
+    In journal mode changes are appended to the journal and folded into the
+    record file in the background; otherwise the record file is updated
+    directly. Neither has a search index of its own.
+    """
+
+    def __init__(self, path: Path, journal_path: Optional[Path] = None, journal_enabled: bool = True,
+                 sync_interval: float = 0.2, compact_entries: int = 500,
+                 compact_bytes: int = 4 * 1024 * 1024, keys: Optional[KeyManager] = None,
+                 compressor: Optional[Compressor] = None, train_dictionary: bool = True):
+        """
+        Args:
+            path: Record file path
+            journal_path: Journal file path (no journal if None)
+            journal_enabled: Append saves to the journal; if False an existing
+                journal is folded into the record file on load
+            sync_interval: Seconds to batch journal appends before fsync
+            compact_entries: Journal entry count that triggers compaction
+            compact_bytes: Journal size that triggers compaction
+            keys: Key manager to encrypt with (shared default if None)
+            compressor: Compresses records before encryption (None for uncompressed records)
+            train_dictionary: See RecordStore
+        """
+        self.path = Path(path)
+        self.store = RecordStore(path, keys, compressor, train_dictionary)
+        self.journal_enabled = journal_enabled and journal_path is not None
+        self.journal: Optional[Journal] = None
+        if journal_path is not None:
+            self.journal = Journal(
+                journal_path,
+                snapshot_writer=self._write_snapshot,
+                sync_interval=sync_interval,
+                compact_entries=compact_entries,
+                compact_bytes=compact_bytes,
+                keys=keys
+            )
+
+    @property
+    def next_id(self) -> int:
+        if self._journal_open:
+            return self.journal.next_id
+        return self.store.next_id
+
+    @property
+    def _journal_open(self) -> bool:
+        return self.journal is not None and self.journal.is_open
+
+    @property
+    def paths(self) -> List[Path]:
+        if self.journal is None:
+            return [self.path]
+        return [self.path, self.journal.path]
+
+    def exists(self) -> bool:
+        return self.store.exists() or (self.journal is not None and self.journal.path.exists())
+
+    def load(self, bodies=None) -> List[Note]:
+        notes = self.store.load(bodies) if self.store.exists() else []
+        journal = self.journal
+        if journal is not None and (self.journal_enabled or journal.path.exists()):
+            notes = journal.open(notes, self.store.next_id)
+            if not self.journal_enabled:
+                # Journal mode was switched off: fold what is left into the snapshot
+                journal.compact(wait=True)
+                journal.close()
+        return notes
+
+    def adopt(self, notes: Iterable[Note]):
+        if self._journal_open:
+            self.journal.adopt(notes)
+
+    def get(self, note_id: int) -> Optional[Note]:
+        if self._journal_open:
+            note = self.journal.get(note_id)
+            if note is None:
+                return None
+            return Note(note.content, note.title, note.id, timestamp=note.timestamp)
+        return self.store.read_note(note_id)
+
+    def put(self, note: Note):
+        if self.journal_enabled and self._journal_open:
+            self.journal.put(note)
+        else:
+            self.store.put(note)
+
+    def delete(self, note_id: int) -> bool:
+        if self.journal_enabled and self._journal_open:
+            return self.journal.delete(note_id)
+        return self.store.delete(note_id)
+
+    def save(self, notes: Iterable[Note]) -> bool:
+        if self.journal_enabled and self._journal_open:
+            try:
+                self.journal.record(notes)
+                return True
+            except IOError:
+                return False
+        return self._write_snapshot(notes)
+
+    def iter_metadata(self) -> Iterator[dict]:
+        if self._journal_open:
+            for note in self.journal.iter_notes():
+                yield note_metadata(note)
+        elif self.store.exists():
+            yield from self.store.iter_metadata()
+
+    def read_body(self, note_id: int) -> str:
+        return self.store.read_body(note_id)
+
+    def compact(self, wait: bool = False):
+        """Fold the journal into the record file"""
+        if self._journal_open:
+            self.journal.compact(wait)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def _write_snapshot(self, notes: Iterable[Note], next_id: Optional[int] = None) -> bool:
+        """Write notes straight to the record file (also the journal's snapshot writer)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.store.save(notes, next_id)
+            return True
+        except IOError:
+            return False
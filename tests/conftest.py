@@ -0,0 +1,198 @@
+"""Shared test setup: the project root on sys.path, password keys and a display-free text widget"""
+import re
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from encryption import KeyManager  # noqa: E402
+
+_OFFSET_INDEX = re.compile(r"^(.+?)\s*([+-])\s*(\d+)\s*c(?:hars)?$")
+
+
+class FakeTk:
+    """
+    Just enough of a Tcl interpreter for one text widget
+
+    Commands are looked up by name, so renaming and wrapping the widget
+    command (as EditorBuffer does) works like it does in Tk.
+    """
+
+    def __init__(self):
+        self.commands = {}
+
+    def call(self, name, *args):
+        if name == "rename":
+            self.commands[args[1]] = self.commands.pop(args[0])
+            return ""
+        return self.commands[name](*args)
+
+    def getboolean(self, value) -> bool:
+        return bool(int(value))
+
+    def createcommand(self, name, func):
+        self.commands[name] = func
+
+    def deletecommand(self, name):
+        del self.commands[name]
+
+
+class FakeText:
+    """
+    Text widget emulation: content, marks, indices and the after() timer
+
+    The content always ends with the newline Tk adds, so "end" is one
+    character past the last one that can be edited. Marks have right
+    gravity (text inserted at a mark goes before it).
+    """
+
+    def __init__(self):
+        self.tk = FakeTk()
+        self.content = ""
+        self.marks = {"insert": 0}
+        self.packed = False
+        self.destroyed = False
+        self._jobs = {}
+        self._next_job = 0
+        self.tk.createcommand(str(self), self._command)
+
+    def __str__(self):
+        return ".text"
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def configure(self, **kwargs):
+        pass
+
+    def pack(self, **kwargs):
+        self.packed = True
+
+    def pack_forget(self):
+        self.packed = False
+
+    def destroy(self):
+        self.destroyed = True
+
+    def after(self, ms, func):
+        self._next_job += 1
+        self._jobs[self._next_job] = func
+        return self._next_job
+
+    def after_idle(self, func):
+        return self.after(0, func)
+
+    def after_cancel(self, job):
+        self._jobs.pop(job, None)
+
+    def run_pending(self, limit: int = None):
+        """Run scheduled callbacks in order (all of them, or at most limit)"""
+        while self._jobs and limit != 0:
+            func = self._jobs.pop(min(self._jobs))
+            func()
+            if limit is not None:
+                limit -= 1
+
+    # tkinter.Text methods, going through the (possibly wrapped) widget command
+    def insert(self, index, chars):
+        return self.tk.call(str(self), "insert", index, chars)
+
+    def delete(self, first, last=None):
+        return self.tk.call(str(self), "delete", first, *([last] if last is not None else []))
+
+    def get(self, first, last=None):
+        return self.tk.call(str(self), "get", first, *([last] if last is not None else []))
+
+    def _offset(self, index) -> int:
+        """Character offset of a Tk index (0 to len(content) + 1 for "end")"""
+        index = str(index).strip()
+        match = _OFFSET_INDEX.match(index)
+        if match:
+            count = int(match.group(3))
+            offset = self._offset(match.group(1)) + (count if match.group(2) == "+" else -count)
+            return max(0, min(offset, len(self.content)))
+        if index == "end":
+            return len(self.content) + 1
+        if index in self.marks:
+            return self.marks[index]
+        line, column = index.split(".")
+        lines = self.content.split("\n")
+        line = int(line)
+        if line > len(lines):
+            # Past the last line: Tk clamps to "end"
+            return len(self.content) + 1
+        start = sum(len(text) + 1 for text in lines[:line - 1])
+        length = len(lines[line - 1])
+        return start + (length if column == "end" else min(int(column), length))
+
+    def _index(self, offset: int) -> str:
+        if offset > len(self.content):
+            return f"{self.content.count(chr(10)) + 2}.0"
+        line = self.content.count("\n", 0, offset) + 1
+        return f"{line}.{offset - (self.content.rfind(chr(10), 0, offset) + 1)}"
+
+    def _command(self, operation, *args):
+        if operation == "insert":
+            offset = min(self._offset(args[0]), len(self.content))
+            chars = "".join(str(chars) for chars in args[1::2])
+            self.content = self.content[:offset] + chars + self.content[offset:]
+            for name, position in self.marks.items():
+                if position >= offset:
+                    self.marks[name] = position + len(chars)
+        elif operation == "delete":
+            first = min(self._offset(args[0]), len(self.content))
+            last = min(self._offset(args[1]) if len(args) > 1 else first + 1, len(self.content))
+            if last > first:
+                self.content = self.content[:first] + self.content[last:]
+                for name, position in self.marks.items():
+                    if position >= last:
+                        self.marks[name] = position - (last - first)
+                    elif position > first:
+                        self.marks[name] = first
+        elif operation == "get":
+            first = self._offset(args[0])
+            last = self._offset(args[1]) if len(args) > 1 else first + 1
+            return (self.content + "\n")[first:last]
+        elif operation == "index":
+            return self._index(self._offset(args[0]))
+        elif operation == "compare":
+            first, second = self._offset(args[0]), self._offset(args[2])
+            return str(int({"<": first < second, "<=": first <= second, "==": first == second,
+                            ">=": first >= second, ">": first > second, "!=": first != second}[args[1]]))
+        elif operation == "count":
+            return str(self._offset(args[-1]) - self._offset(args[-2]))
+        elif operation == "mark":
+            if args[0] == "set":
+                self.marks[args[1]] = min(self._offset(args[2]), len(self.content))
+            elif args[0] == "unset":
+                self.marks.pop(args[1], None)
+        return ""
+
+
+@pytest.fixture(scope="session")
+def keys() -> KeyManager:
+    """Password-derived key, so no key file is read or written"""
+    keys = KeyManager(password="test")
+    keys.unlock()
+    return keys
+
+
+@pytest.fixture(scope="session")
+def other_keys() -> KeyManager:
+    keys = KeyManager(password="another")
+    keys.unlock()
+    return keys
+
+
+@pytest.fixture
+def text_widget() -> FakeText:
+    return FakeText()
+
+
+@pytest.fixture
+def make_text_widget() -> Callable[[], FakeText]:
+    """Factory for more text widgets (e.g. the text boxes of an EditorCache)"""
+    return FakeText
@@ -0,0 +1,151 @@
+"""DesktopApp autosave and search updates, driven through display-free stand-ins for its widgets"""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import main
+import search_index
+from benchmarks.headless import FakeWidget, fake_note_list
+from main import DesktopApp
+from models import Note, NoteCollection
+from search_index import BackgroundIndex
+from search_worker import SearchWorker
+from ui.editor import EditorCache
+
+
+class FakeRoot:
+    """The root window's after() timers, run by hand"""
+
+    def __init__(self):
+        self.jobs = {}
+        self._next_job = 0
+
+    def after(self, ms, func):
+        self._next_job += 1
+        self.jobs[self._next_job] = func
+        return self._next_job
+
+    def after_idle(self, func):
+        return self.after(0, func)
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_pending(self):
+        while self.jobs:
+            self.jobs.pop(min(self.jobs))()
+
+
+class FakeEntry:
+    """Title entry"""
+
+    def __init__(self):
+        self.value = ""
+
+    def get(self) -> str:
+        return self.value
+
+    def delete(self, first, last=None):
+        self.value = ""
+
+    def insert(self, index, text: str):
+        self.value = text + self.value
+
+    def bind(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def app(monkeypatch, make_text_widget) -> DesktopApp:
+    """A DesktopApp with three notes on the virtual note list, without a window"""
+    monkeypatch.setattr(main, "AUTOSAVE_ENABLED", True)
+    app = DesktopApp.__new__(DesktopApp)
+    app.root = FakeRoot()
+    app.notes = NoteCollection(
+        [Note(f"içerik {number}", title=f"Not {number}", note_id=number) for number in range(1, 4)], next_id=4
+    )
+    app.notebook = fake_note_list()
+    app.title_input = FakeEntry()
+    app.editors = EditorCache(make_text_widget, make_text_widget(), on_change=app._schedule_autosave)
+    app.clear_btn = FakeWidget()
+    app.notes_label = FakeWidget()
+    app.current_note_id = None
+    app._search_query = ""
+    app._search_matches = set()
+    app._autosave_job = None
+    app._autosave_started = None
+    app.refresh_tabs()
+    return app
+
+
+def select(app, note_id):
+    """Click the tab of a note"""
+    name = next(name for name, tab_note_id in app.notebook.tab_references.items() if tab_note_id == note_id)
+    app.notebook.set(name)
+    app.on_tab_select(note_id)
+    return name
+
+
+def test_autosave_runs_after_the_delay(app):
+    name = select(app, 1)
+    app.text_input.insert("end", " düzenlendi")
+    assert app.notes.get(1).content == "içerik 1"
+
+    app.root.run_pending()
+    assert app.notes.get(1).content == "içerik 1 düzenlendi"
+    assert app.notebook.get() == name
+
+
+def test_switching_tabs_saves_and_keeps_the_new_tab(app):
+    select(app, 1)
+    app.text_input.insert("end", " düzenlendi")
+    # Switch before the autosave delay is over
+    name = select(app, 2)
+
+    assert app.notes.get(1).content == "içerik 1 düzenlendi"
+    assert app.current_note_id == 2
+    assert app.notebook.get() == name
+    assert app.editor.get_content() == "içerik 2"
+    assert not app.root.jobs
+
+
+def test_switching_tabs_saves_a_new_note(app):
+    app.text_input.insert("end", "yeni not")
+    name = select(app, 3)
+
+    assert [note.content for note in app.notes][-1] == "yeni not"
+    assert app.current_note_id == 3
+    assert app.notebook.get() == name
+
+
+def test_edits_do_not_wait_for_the_search_index_build(app, monkeypatch):
+    built = threading.Event()
+    create_index = search_index.create_index
+
+    def slow_create_index(*args):
+        built.wait(10)
+        return create_index(*args)
+
+    monkeypatch.setattr(search_index, "create_index", slow_create_index)
+    app.search_index = BackgroundIndex(app.notes)
+    searching = threading.Event()
+    app.search_worker = SearchWorker(lambda query: searching.set() or app.search_index.search(query), debounce_ms=0)
+    app.save_queue = SimpleNamespace(submit=lambda notes, on_error: None)
+    app.notes.subscribe(app._on_notes_changed)
+    results = []
+    found = threading.Event()
+    try:
+        app.search_worker.submit("proje", lambda query, result: results.append(result) or found.set())
+        assert searching.wait(5)
+
+        # The search is waiting for the index build; editing a note goes on meanwhile
+        edit = threading.Thread(target=app.notes.update, args=(2,), kwargs={"content": "proje notu"})
+        edit.start()
+        edit.join(1)
+        assert not edit.is_alive()
+    finally:
+        built.set()
+        app.search_worker.close(5)
+    assert found.is_set()
+    assert results == [{2}]
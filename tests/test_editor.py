@@ -0,0 +1,115 @@
+"""EditorBuffer: chunked loading and rebuilding the body from edited lines; EditorCache eviction"""
+import pytest
+
+from models import Note
+from ui.editor import EditorBuffer, EditorCache
+
+BODY = "\n".join(f"satır {number} içerik" for number in range(1, 201))
+LINES = BODY.split("\n")
+
+
+def widget_text(text_widget) -> str:
+    return text_widget.get("1.0", "end-1c")
+
+
+@pytest.fixture
+def buffer(text_widget) -> EditorBuffer:
+    # No time budget: every idle callback inserts exactly one piece
+    buffer = EditorBuffer(text_widget, placeholder_text="", first_chunk_chars=60, chunk_chars=80, chunk_budget_ms=0)
+    buffer.load(BODY)
+    return buffer
+
+
+def test_load_inserts_the_body_in_chunks(buffer, text_widget):
+    assert buffer.is_loading
+    assert BODY.startswith(widget_text(text_widget))
+    text_widget.run_pending()
+    assert not buffer.is_loading
+    assert widget_text(text_widget) == BODY
+    assert buffer.get_content() == BODY
+    assert not buffer.is_modified
+
+
+def test_idle_callbacks_insert_pieces_within_the_time_budget(text_widget):
+    buffer = EditorBuffer(text_widget, placeholder_text="", first_chunk_chars=60, chunk_chars=80,
+                          chunk_budget_ms=60_000)
+    buffer.load(BODY)
+    text_widget.run_pending(limit=1)
+    assert not buffer.is_loading
+    assert buffer.get_content() == BODY
+
+
+def test_edits_after_loading_are_spliced(buffer, text_widget):
+    text_widget.run_pending()
+    text_widget.insert("50.0", "yeni satır\n")
+    text_widget.delete("120.0", "125.0")
+    expected = LINES[:49] + ["yeni satır"] + LINES[49:118] + LINES[123:]
+    assert buffer.get_content() == "\n".join(expected) == widget_text(text_widget)
+
+
+@pytest.mark.parametrize("edit, expected, keeps_loading", [
+    # Delete from the loaded lines into ones not inserted yet
+    (lambda text: text.delete("2.0", "30.0"), LINES[:1] + LINES[29:], False),
+    # Paste at the load mark (the end of the loaded text)
+    (lambda text: text.insert("end-1c", "\nyapıştırılan\nmetin"), LINES + ["yapıştırılan", "metin"], False),
+    # Delete everything shown so far
+    (lambda text: text.delete("1.0", "end"), [], False),
+    # Type in the loaded part
+    (lambda text: text.insert("2.0", "önce "), LINES[:1] + ["önce " + LINES[1]] + LINES[2:], True),
+    # Add lines in the loaded part
+    (lambda text: text.insert("1.0", "bir\niki\n"), ["bir", "iki"] + LINES, True),
+    # Delete up to the load mark (the first two pieces hold lines 1-9)
+    (lambda text: text.delete("2.0", "end-1c"), LINES[:1] + LINES[9:], True),
+], ids=["delete-across-mark", "paste-at-mark", "delete-all", "type-in-loaded-part", "add-lines-in-loaded-part",
+        "delete-up-to-mark"])
+def test_edits_while_loading_keep_line_order(buffer, text_widget, edit, expected, keeps_loading):
+    text_widget.run_pending(limit=1)
+    assert buffer.is_loading
+    edit(text_widget)
+    assert buffer.is_loading == keeps_loading
+    text_widget.run_pending()
+    assert not buffer.is_loading
+    assert widget_text(text_widget) == "\n".join(expected)
+    assert buffer.get_content() == "\n".join(expected)
+
+
+def test_edits_while_loading_count_as_unsaved(buffer, text_widget):
+    changes = []
+    buffer.on_change = lambda: changes.append(buffer.has_unsaved_edits)
+    text_widget.insert("1.0", "x")
+    assert changes == [True]
+    buffer.mark_saved()
+    assert not buffer.has_unsaved_edits
+
+
+def test_cache_evicts_the_least_recently_used_text_box(make_text_widget):
+    cache = EditorCache(make_text_widget, make_text_widget(), max_entries=2)
+    notes = [Note(f"içerik {number}", title=f"Not {number}", note_id=number) for number in range(1, 5)]
+    for note in notes[:3]:
+        cache.open(note, "")
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.open(notes[1], "")
+    assert not cache.open(notes[0], "")
+
+
+def test_cache_keeps_text_boxes_with_unsaved_edits(make_text_widget):
+    cache = EditorCache(make_text_widget, make_text_widget(), max_entries=2)
+    notes = [Note(f"içerik {number}", title=f"Not {number}", note_id=number) for number in range(1, 5)]
+    cache.open(notes[0], "")
+    edited = cache.widget
+    # An edit whose autosave was skipped (e.g. the note was emptied)
+    edited.delete("1.0", "end")
+    for note in notes[1:]:
+        cache.open(note, "Not")
+
+    assert not edited.destroyed
+    assert cache.open(notes[0], "")
+    assert cache.buffer.get_content() == ""
+    assert cache.buffer.has_unsaved_edits
+
+    # Once saved it is evicted like the others
+    cache.buffer.mark_saved()
+    for note in notes[1:3]:
+        cache.open(note, "")
+    assert edited.destroyed
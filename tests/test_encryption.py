@@ -0,0 +1,76 @@
+"""Chunked stream containers: round trip, truncation and tamper detection"""
+import io
+
+import pytest
+
+from encryption import _CHUNK_HEADER, _STREAM_HEADER, _TAG_SIZE, KeyLockedError, KeyManager, StreamFormatError, is_stream
+
+# Small chunks, so a few hundred bytes make a multi-chunk stream
+CHUNK = 64
+DATA = "Çok parçalı akış: ğüşıöç 📝 ".encode('utf-8') * 20
+
+
+def seal(keys, data=DATA, chunk_size=CHUNK) -> bytes:
+    return b"".join(keys.encrypt_stream([data[:100], data[100:]], chunk_size=chunk_size))
+
+
+def open_stream(keys, sealed: bytes) -> bytes:
+    return b"".join(keys.decrypt_stream(io.BytesIO(sealed)))
+
+
+@pytest.mark.parametrize("data", [b"", b"x", DATA[:CHUNK], DATA], ids=["empty", "one-byte", "one-chunk", "many-chunks"])
+def test_round_trip(keys, data):
+    sealed = seal(keys, data)
+    assert is_stream(sealed)
+    assert open_stream(keys, sealed) == data
+
+
+def test_reads_no_further_than_the_final_chunk(keys):
+    reader = io.BytesIO(seal(keys) + b"next record")
+    assert b"".join(keys.decrypt_stream(reader)) == DATA
+    assert reader.read() == b"next record"
+
+
+def test_every_truncation_is_detected(keys):
+    sealed = seal(keys)
+    for cut in range(len(sealed)):
+        with pytest.raises(StreamFormatError):
+            open_stream(keys, sealed[:cut])
+
+
+def test_every_flipped_byte_is_detected(keys):
+    sealed = seal(keys)
+    for position in range(len(sealed)):
+        damaged = bytearray(sealed)
+        damaged[position] ^= 0x01
+        with pytest.raises(StreamFormatError):
+            open_stream(keys, bytes(damaged))
+
+
+def test_reordered_chunks_are_detected(keys):
+    sealed = seal(keys, DATA[:CHUNK * 3])
+    header = _STREAM_HEADER.size
+    size = _CHUNK_HEADER.size + CHUNK + _TAG_SIZE
+    first, second = sealed[header:header + size], sealed[header + size:header + 2 * size]
+    swapped = sealed[:header] + second + first + sealed[header + 2 * size:]
+    with pytest.raises(StreamFormatError):
+        open_stream(keys, swapped)
+
+
+def test_other_key_is_rejected(keys, other_keys):
+    with pytest.raises(StreamFormatError):
+        open_stream(other_keys, seal(keys))
+
+
+def test_not_a_stream(keys):
+    assert not is_stream(b"gAAAAA")
+    with pytest.raises(StreamFormatError):
+        open_stream(keys, b"NOTSTR" + bytes(40))
+
+
+def test_locked_key_manager_refuses(keys):
+    locked = KeyManager(password="test")
+    with pytest.raises(KeyLockedError):
+        seal(locked)
+    locked.unlock()
+    assert open_stream(locked, seal(keys)) == DATA
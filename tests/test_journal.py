@@ -0,0 +1,102 @@
+"""Journal replay on top of the record file, torn tails and unreadable entries"""
+import pytest
+
+from journal import MAGIC, JournalError
+from models import Note
+from storage_backend import FileBackend
+
+
+def open_backend(directory, keys):
+    backend = FileBackend(directory / "notes.nsr", directory / "notes.journal", keys=keys, sync_interval=0.01)
+    return backend, backend.load()
+
+
+def state(notes) -> list:
+    return [(note.id, note.title, note.content) for note in notes]
+
+
+@pytest.fixture
+def journaled(tmp_path, keys):
+    """A journal holding three saves, and the notes after each of them"""
+    backend, _ = open_backend(tmp_path, keys)
+    notes = [Note(f"içerik {number}", title=f"Not {number}", note_id=number) for number in range(1, 4)]
+    history = []
+    sizes = []
+    for step in range(3):
+        if step == 1:
+            notes[0].content = "düzenlendi"
+        if step == 2:
+            notes = [notes[2], notes[0]]
+        backend.save(notes)
+        history.append(state(notes))
+        sizes.append(backend.journal.path.stat().st_size)
+    backend.close()
+    return tmp_path / "notes.journal", history, sizes
+
+
+def test_replay_restores_every_save(tmp_path, keys, journaled):
+    path, history, _ = journaled
+    backend, notes = open_backend(tmp_path, keys)
+    assert state(notes) == history[-1]
+    assert backend.journal.entry_count == 3
+    # The deleted note's id is not handed out again
+    assert backend.next_id == 4
+    backend.close()
+
+
+def test_compaction_folds_the_journal_into_the_record_file(tmp_path, keys, journaled):
+    path, history, _ = journaled
+    backend, _ = open_backend(tmp_path, keys)
+    backend.compact(wait=True)
+    assert backend.journal.entry_count == 0
+    assert path.read_bytes() == MAGIC
+    backend.close()
+    backend, notes = open_backend(tmp_path, keys)
+    backend.close()
+    assert state(notes) == history[-1]
+
+
+@pytest.mark.parametrize("cut", [
+    lambda sizes: sizes[1] + 3,
+    lambda sizes: sizes[1] + 20,
+    lambda sizes: sizes[2] - 1,
+], ids=["in-entry-header", "in-token", "last-byte-missing"])
+def test_torn_tail_is_dropped(tmp_path, keys, journaled, cut):
+    path, history, sizes = journaled
+    path.write_bytes(path.read_bytes()[:cut(sizes)])
+
+    backend, notes = open_backend(tmp_path, keys)
+    assert state(notes) == history[1]
+    assert path.stat().st_size == sizes[1]
+    # Appending after the cut works and replays
+    backend.save([Note("sonra", title="Sonra", note_id=5)])
+    backend.close()
+    backend, notes = open_backend(tmp_path, keys)
+    backend.close()
+    assert state(notes) == [(5, "Sonra", "sonra")]
+
+
+def test_corrupted_last_entry_is_dropped(tmp_path, keys, journaled):
+    path, history, sizes = journaled
+    data = bytearray(path.read_bytes())
+    data[-10] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    backend, notes = open_backend(tmp_path, keys)
+    backend.close()
+    assert state(notes) == history[1]
+    assert path.stat().st_size == sizes[1]
+
+
+def test_wrong_key_raises_and_keeps_the_journal(tmp_path, keys, other_keys, journaled):
+    path, _, _ = journaled
+    data = path.read_bytes()
+    with pytest.raises(JournalError):
+        open_backend(tmp_path, other_keys)
+    assert path.read_bytes() == data
+
+
+def test_not_a_journal(tmp_path, keys):
+    (tmp_path / "notes.journal").write_bytes(b"something else entirely")
+    with pytest.raises(JournalError):
+        open_backend(tmp_path, keys)
@@ -0,0 +1,46 @@
+"""note_codec: binary record metadata and JSON import/export"""
+import json
+
+import pytest
+
+from models import Note
+from note_codec import NoteCodecError, decode_meta, encode_meta, export_json, import_json
+
+NOTES = [
+    Note("süt, ekmek", title="Alışveriş", note_id=1, date="2023-01-02 09:30:00"),
+    Note("başlıksız not 📝\nikinci satır", title="", note_id=300, date="1969-12-31 23:59:00"),
+    Note("", title="Boş", note_id=70000, date="2024-05-06 07:08:09"),
+]
+
+
+def described(notes) -> list:
+    return [(note.id, note.title, note.content, note.date) for note in notes]
+
+
+@pytest.mark.parametrize("note", NOTES, ids=["titled", "untitled", "empty"])
+def test_metadata_round_trip(note):
+    decoded = decode_meta(encode_meta(note, note.content))
+    assert (decoded.id, decoded.title, decoded.timestamp) == (note.id, note.title, note.timestamp)
+    assert not decoded.is_loaded
+    # Untitled notes carry a preview for their label
+    assert decoded.preview == (note.preview if not note.title else "")
+
+
+def test_truncated_metadata_is_an_error():
+    data = encode_meta(NOTES[1], NOTES[1].content)
+    for cut in range(len(data) - 1):
+        with pytest.raises(NoteCodecError):
+            decode_meta(data[:cut])
+
+
+def test_json_export_round_trip():
+    text = export_json(NOTES)
+    assert "Alışveriş" in text
+    assert described(import_json(text)) == described(NOTES)
+
+
+def test_json_import_reads_the_old_notes_json_layout():
+    old = [{"id": 1, "title": "Eski", "content": "eski not", "date": "2022-03-04 05:06:07"}, {"content": "yalnız içerik"}]
+    notes = import_json(json.dumps(old))
+    assert described(notes[:1]) == [(1, "Eski", "eski not", "2022-03-04 05:06:07")]
+    assert (notes[1].id, notes[1].title, notes[1].content) == (None, "", "yalnız içerik")
@@ -0,0 +1,144 @@
+"""RecordStore: round trip, incremental saves and records written by older versions"""
+import pytest
+
+from body_cache import BodyCache
+from compression import Compressor
+from encryption import StreamFormatError
+from models import Note
+from record_store import CODEC_PACKED, CODEC_SPLIT, RecordStore, RecordStoreError
+
+COMPRESSORS = {
+    "none": None,
+    "zlib": Compressor("zlib"),
+    "lzma": Compressor("lzma"),
+}
+
+
+def make_notes(count: int = 40) -> list:
+    notes = [
+        Note(f"İçerik {number}: toplantı notları, proje raporu ve yapılacaklar\n" * (number % 5 + 1),
+             title=f"Not {number}" if number % 3 else "", note_id=number, date="2024-05-0%d 10:%02d:00" % (number % 9 + 1, number))
+        for number in range(1, count + 1)
+    ]
+    notes.append(Note("büyük 📝 " * 20000, title="Büyük", note_id=count + 1))
+    return notes
+
+
+def snapshot(notes) -> list:
+    return [(note.id, note.title, note.date, note.content) for note in notes]
+
+
+@pytest.fixture(params=sorted(COMPRESSORS))
+def store_factory(request, tmp_path, keys):
+    def factory(**kwargs):
+        kwargs.setdefault("compressor", COMPRESSORS[request.param])
+        return RecordStore(tmp_path / "notes.nsr", keys, **kwargs)
+    return factory
+
+
+def test_round_trip(store_factory):
+    notes = make_notes()
+    store = store_factory()
+    assert store.save(notes) == len(notes)
+
+    reopened = store_factory()
+    assert snapshot(reopened.load()) == snapshot(notes)
+    assert reopened.next_id == len(notes) + 1
+    assert reopened.read_body(7) == notes[6].content
+    assert reopened.read_note(3).title == notes[2].title
+    assert [meta["id"] for meta in reopened.iter_metadata()] == [note.id for note in notes]
+
+
+def test_lazy_load_reads_bodies_on_demand(store_factory, keys):
+    notes = make_notes()
+    store_factory().save(notes)
+
+    store = store_factory()
+    bodies = BodyCache(store.read_body, keys)
+    loaded = store.load(bodies=bodies)
+    assert not any(note.is_loaded for note in loaded)
+    assert [note.title for note in loaded] == [note.title for note in notes]
+    # Untitled notes are labelled by their preview without reading the body
+    assert loaded[2].preview == notes[2].content[:len(loaded[2].preview)]
+    assert snapshot(loaded) == snapshot(notes)
+
+
+def test_only_changed_notes_are_written(store_factory):
+    notes = make_notes()
+    store = store_factory()
+    store.save(notes)
+    assert store.save(notes) == 0
+
+    notes[4].content += " düzenlendi"
+    notes.insert(0, notes.pop(10))
+    del notes[20]
+    assert store.save(notes) == 1
+    assert snapshot(store_factory().load()) == snapshot(notes)
+
+
+def test_put_and_delete(store_factory):
+    notes = make_notes(5)
+    store = store_factory()
+    store.save(notes)
+    store.put(Note("yeni", title="Yeni", note_id=9))
+    assert store.delete(2)
+    assert not store.delete(2)
+
+    reopened = store_factory()
+    assert [note.id for note in reopened.load()] == [1, 3, 4, 5, 6, 9]
+    assert reopened.read_note(9).content == "yeni"
+    assert reopened.read_note(2) is None
+    assert reopened.next_id == 10
+
+
+def test_compaction_keeps_the_notes(store_factory):
+    notes = make_notes()
+    store = store_factory()
+    store.save(notes)
+    for note in notes[::2]:
+        note.content += " v2"
+    store.save(notes)
+    size = store.path.stat().st_size
+    store.compact()
+    assert store.path.stat().st_size < size
+    assert snapshot(store_factory().load()) == snapshot(notes)
+
+
+def test_recreated_file_holds_every_note(store_factory):
+    notes = make_notes()
+    store = store_factory()
+    store.save(notes)
+    store.path.unlink()
+    assert store.save(notes[:3]) == 3
+    assert snapshot(store_factory().load()) == snapshot(notes[:3])
+
+
+@pytest.mark.parametrize("codec", [CODEC_SPLIT, CODEC_PACKED], ids=["split", "packed"])
+def test_older_records_are_read_and_migrated(tmp_path, keys, codec):
+    class OlderStore(RecordStore):
+        write_codec = codec
+
+    path = tmp_path / "notes.nsr"
+    notes = make_notes()
+    OlderStore(path, keys, Compressor("zlib")).save(notes)
+
+    store = RecordStore(path, keys, Compressor("zlib"))
+    assert snapshot(store.load()) == snapshot(notes)
+    # Edited notes are written in the current format next to the old records
+    notes[0].content = "güncel"
+    assert store.save(notes) == 1
+    store.compact()
+    assert snapshot(RecordStore(path, keys).load()) == snapshot(notes)
+
+
+def test_wrong_key_and_damage_are_errors(tmp_path, keys, other_keys):
+    path = tmp_path / "notes.nsr"
+    RecordStore(path, keys).save(make_notes(3))
+    with pytest.raises(StreamFormatError):
+        RecordStore(path, other_keys).load()
+
+    data = bytearray(path.read_bytes())
+    data[-3] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(RecordStoreError):
+        RecordStore(path, keys).load()
@@ -0,0 +1,41 @@
+"""Search indexes: results match a plain scan, lazily loaded bodies stay out of the cache"""
+import pytest
+
+from body_cache import BodyCache
+from models import Note
+from search_index import create_index
+from utils import filter_notes_by_query
+
+BODIES = {
+    1: "proje raporu hazırlanacak\nperşembe toplantısı",
+    2: "alışveriş: süt, ekmek, peynir",
+    3: "toplantı notları ve proje planı",
+    4: "kitap listesi 📚",
+}
+QUERIES = ["proje", "toplantı", "proje raporu", "süt ekmek", "rapor pro", "PLAN", "📚", "yok"]
+
+
+@pytest.fixture
+def lazy_notes():
+    """Notes whose bodies are read through a BodyCache, and the cache"""
+    bodies = BodyCache(BODIES.__getitem__)
+    notes = [Note.lazy(note_id, f"Not {note_id}" if note_id % 2 else "", note_id, bodies) for note_id in BODIES]
+    return notes, bodies
+
+
+@pytest.mark.parametrize("kind", ["word", "trigram"])
+def test_results_match_a_scan(kind, lazy_notes):
+    notes, _ = lazy_notes
+    index = create_index(notes, kind, keep_text=False)
+    for query in QUERIES:
+        assert index.search(query) == {note.id for note in filter_notes_by_query(notes, query)}, query
+
+
+@pytest.mark.parametrize("kind", ["word", "trigram"])
+def test_searching_leaves_the_body_cache_alone(kind, lazy_notes):
+    notes, bodies = lazy_notes
+    index = create_index(notes, kind, keep_text=False)
+    bodies.clear()
+    for query in QUERIES:
+        index.search(query)
+    assert len(bodies) == 0
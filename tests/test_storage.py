@@ -0,0 +1,160 @@
+"""Loading and migrating through storage.py, and the file and SQLite backends side by side"""
+import json
+
+import pytest
+
+import encryption
+import storage
+from encryption import encrypt_data
+from models import Note
+from sqlite_backend import SqliteBackend
+from storage_backend import FileBackend
+from utils import filter_notes_by_query
+
+LEGACY_NOTES = [
+    {"id": 1, "title": "Alışveriş", "content": "süt, ekmek", "date": "2023-01-02 09:30:00"},
+    {"id": 2, "title": "", "content": "başlıksız not\nikinci satır", "date": "2023-01-03 10:00:00"},
+    # Older versions could store the same id twice
+    {"id": 2, "title": "Proje", "content": "proje raporu 📝", "date": "2023-01-04 11:15:00"},
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch, keys):
+    """Point storage.py (and the shared key manager) at a temporary data directory"""
+    directory = tmp_path / "NoteStack"
+    for name, file_name in [("NOTES_FILE", "notes.json"), ("RECORDS_FILE", "notes.nsr"),
+                            ("JOURNAL_FILE", "notes.journal"), ("SQLITE_FILE", "notes.db"), ("KEY_FILE", ".key")]:
+        monkeypatch.setattr(storage, name, directory / file_name)
+    monkeypatch.setattr(storage, "DATA_DIR", directory)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "file")
+    monkeypatch.setattr(encryption, "KEY_FILE", directory / ".key")
+    monkeypatch.setattr(encryption, "_default_manager", keys)
+    # The pre-1.0 locations: data/ under the working directory and %APPDATA%
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("APPDATA", raising=False)
+    yield directory
+    restart_storage()
+
+
+def restart_storage():
+    """Forget the shared backend, as a new session would"""
+    if storage._backend is not None:
+        storage._backend.close()
+    storage._backend = None
+    storage._bodies = None
+
+
+def loaded(collection) -> list:
+    return [(note.id, note.title, note.content, note.date) for note in collection]
+
+
+def test_encrypted_notes_json_is_migrated(data_dir):
+    data_dir.mkdir()
+    (data_dir / "notes.json").write_bytes(encrypt_data(json.dumps(LEGACY_NOTES)))
+
+    notes = storage.load_notes()
+    assert [(note.title, note.content, note.date) for note in notes] == [
+        (item["title"], item["content"], item["date"]) for item in LEGACY_NOTES
+    ]
+    assert len(set(notes.ids())) == 3
+    assert not (data_dir / "notes.json").exists()
+    assert (data_dir / "notes.json.bak").exists()
+
+    restart_storage()
+    assert loaded(storage.load_notes()) == loaded(notes)
+
+
+def test_plain_notes_json_in_the_old_project_directory_is_migrated(data_dir, tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "notes.json").write_text(json.dumps(LEGACY_NOTES[:2]), encoding="utf-8")
+
+    notes = storage.load_notes()
+    assert [note.content for note in notes] == ["süt, ekmek", "başlıksız not\nikinci satır"]
+    restart_storage()
+    assert loaded(storage.load_notes()) == loaded(notes)
+
+
+def test_saved_notes_survive_a_restart(data_dir):
+    notes = storage.load_notes()
+    notes.add(Note("ilk", title="Bir", note_id=notes.next_id))
+    notes.add(Note("ikinci", title="İki", note_id=notes.next_id))
+    assert storage.save_notes(notes)
+    notes.update(1, content="ilk, düzenlendi")
+    assert storage.save_notes(notes)
+
+    restart_storage()
+    assert loaded(storage.load_notes()) == loaded(notes)
+
+
+def test_damaged_files_are_moved_aside_together(data_dir):
+    data_dir.mkdir()
+    (data_dir / "notes.nsr").write_bytes(b"NSTREC" + bytes(64))
+    (data_dir / "notes.journal").write_bytes(b"not a journal")
+
+    assert len(storage.load_notes()) == 0
+    assert (data_dir / "notes.nsr.corrupt").exists()
+    assert (data_dir / "notes.journal.corrupt").exists()
+
+
+def make_notes() -> list:
+    return [
+        Note(f"{word} içerik {number}\nikinci satır", title=f"{word.title()} {number}" if number % 4 else "",
+             note_id=number, date=f"2024-02-{number:02d} 08:00:00")
+        for number, word in enumerate(["proje", "toplantı", "alışveriş", "rapor", "kitap", "proje"] * 3, start=1)
+    ]
+
+
+BACKENDS = {
+    "file-journal": lambda directory, keys: FileBackend(directory / "notes.nsr", directory / "notes.journal", keys=keys),
+    "file-direct": lambda directory, keys: FileBackend(directory / "notes.nsr", keys=keys),
+    "sqlite": lambda directory, keys: SqliteBackend(directory / "notes.db", keys),
+}
+
+
+def exercise(make_backend, directory, keys) -> dict:
+    """Run the same saves, edits, reorders and deletes, then reopen and describe the result"""
+    backend = make_backend(directory, keys)
+    backend.load()
+    notes = make_notes()
+    backend.save(notes)
+
+    notes[3].content = "değişti"
+    notes[5].title = "Yeni başlık"
+    notes.insert(0, notes.pop(9))
+    del notes[12]
+    backend.save(notes)
+    backend.put(Note("eklendi proje", title="Ek", note_id=40, date="2024-03-01 12:00:00"))
+    backend.put(Note("yeniden", title="Yeniden", note_id=2, date="2024-03-02 12:00:00"))
+    backend.delete(7)
+    backend.close()
+
+    backend = make_backend(directory, keys)
+    notes = backend.load()
+    result = {
+        "notes": loaded(notes),
+        "metadata": [(meta["id"], meta["title"], meta["date"]) for meta in backend.iter_metadata()],
+        "get": [loaded([backend.get(note_id)]) for note_id in (1, 2, 40)],
+        "missing": backend.get(7),
+        "next_id": backend.next_id,
+        "search": sorted(note.id for note in filter_notes_by_query(notes, "proje")),
+    }
+    indexed = backend.search("proje")
+    if indexed is not None:
+        assert indexed == set(result["search"])
+    backend.close()
+    return result
+
+
+def test_backends_give_the_same_results(tmp_path, keys):
+    results = {}
+    for name, make_backend in BACKENDS.items():
+        directory = tmp_path / name
+        directory.mkdir()
+        results[name] = exercise(make_backend, directory, keys)
+
+    expected = results.pop("file-journal")
+    assert expected["notes"][0][0] == 10
+    assert expected["missing"] is None
+    for name, result in results.items():
+        assert result == expected, name
@@ -1,6 +1,9 @@
 import customtkinter as ctk
 from tkinter import ttk
 
+from config import NOTE_LIST_AUTO_THRESHOLD, NOTE_LIST_MODE, NOTE_LIST_ROW_HEIGHT, NOTE_LIST_VISIBLE_ROWS
+from ui.tab_handlers import highlight_matching_tabs
+
 
 def create_options_button(parent) -> ctk.CTkButton:
     """Create options button in top right"""
@@ -60,6 +63,14 @@ def create_text_area(parent) -> tuple[ctk.CTkTextbox, ctk.CTkFrame]:
     text_frame = ctk.CTkFrame(parent, fg_color="transparent")
     text_frame.pack(pady=10, padx=20, fill="both", expand=True)
     
+    text_input = create_text_box(text_frame)
+    text_input.pack(fill="both", expand=True)
+    
+    return text_input, text_frame
+
+
+def create_text_box(text_frame) -> ctk.CTkTextbox:
+    """Create a note text box showing the placeholder (not packed)"""
     text_input = ctk.CTkTextbox(
         text_frame,
         font=("Arial", 14),
@@ -72,9 +83,7 @@ def create_text_area(parent) -> tuple[ctk.CTkTextbox, ctk.CTkFrame]:
     text_input.insert("1.0", "Notunuzu buraya yazın...")
     text_input.configure(text_color="#999999")
     
-    text_input.pack(fill="both", expand=True)
-    
-    return text_input, text_frame
+    return text_input
 
 
 def create_buttons(parent, save_command, clear_command) -> tuple[ctk.CTkFrame, ctk.CTkButton]:
@@ -131,8 +140,24 @@ def create_labels(parent, notes_count: int) -> tuple[ctk.CTkLabel, ctk.CTkLabel]
     return notes_label, footer
 
 
-def create_note_tabs(parent, notes, on_tab_select=None, new_note_command=None) -> ctk.CTkTabview:
-    """Create tabs section to display notes"""
+def use_note_list(note_count: int, mode: str = NOTE_LIST_MODE) -> bool:
+    """Whether notes are shown in the virtualized list instead of tabs"""
+    if mode == "list":
+        return True
+    if mode == "tabs":
+        return False
+    if mode == "auto":
+        return note_count > NOTE_LIST_AUTO_THRESHOLD
+    raise ValueError(f"Unknown note list mode: {mode}")
+
+
+def create_note_tabs(parent, notes, on_tab_select=None, new_note_command=None, on_delete=None):
+    """
+    Create tabs section to display notes
+    
+    Large notebooks (see NOTE_LIST_MODE) get a VirtualNoteList instead of a
+    CTkTabview; both expose tab_references, set() and get().
+    """
     notebook_frame = ctk.CTkFrame(parent, fg_color="transparent")
     notebook_frame.pack(fill="x", padx=20, pady=10)
     
@@ -173,7 +198,18 @@ def create_note_tabs(parent, notes, on_tab_select=None, new_note_command=None) -
     tabs_container = ctk.CTkFrame(notebook_frame, fg_color="transparent")
     tabs_container.pack(fill="x", pady=(0, 10))
     
-    tabview = ctk.CTkTabview(tabs_container, height=50)
+    if use_note_list(len(notes)):
+        from ui.note_list import VirtualNoteList
+        
+        tabview = VirtualNoteList(
+            tabs_container,
+            on_tab_select=on_tab_select,
+            on_delete=on_delete,
+            row_height=NOTE_LIST_ROW_HEIGHT,
+            visible_rows=NOTE_LIST_VISIBLE_ROWS
+        )
+    else:
+        tabview = ctk.CTkTabview(tabs_container, height=50)
     tabview.pack(side="left", fill="x", expand=True)
     
     tabview.clear_filter_btn = clear_filter_btn
@@ -190,25 +226,22 @@ def create_note_tabs(parent, notes, on_tab_select=None, new_note_command=None) -
             font=("Arial", 10),
             corner_radius=5
         )
-        new_btn.pack(side="right", padx=(10, 0))
+        new_btn.pack(side="right", padx=(10, 0), anchor="n")
+    
+    tabview.search_entry = search_entry
+    if not isinstance(tabview, ctk.CTkTabview):
+        tabview.reconcile(notes)
+        return tabview
     
     # Store tab references with note_id
     tabview.tab_references = {}
-    used_tab_names = set()
     
-    for note in notes:
-        base_tab_name = get_tab_label(note)
-        tab_name = base_tab_name
-        
-        counter = 1
-        while tab_name in used_tab_names:
-            tab_name = f"{base_tab_name} ({counter})"
-            counter += 1
-        
-        used_tab_names.add(tab_name)
+    for tab_name, note_id in build_tab_entries(notes):
         tab_frame = tabview.add(tab_name)
-        tab_frame.note_id = note.id
-        tabview.tab_references[tab_name] = note.id
+        tab_frame.note_id = note_id
+        tabview.tab_references[tab_name] = note_id
+    
+    highlight_matching_tabs(tabview, tabview.tab_references, set())
     
     if on_tab_select:
         def on_tab_changed(value=None):
@@ -222,17 +255,44 @@ def create_note_tabs(parent, notes, on_tab_select=None, new_note_command=None) -
         if hasattr(tabview, '_segmented_button'):
             tabview._segmented_button.configure(command=on_tab_changed)
     
-    tabview.search_entry = search_entry
     return tabview
 
 
+def build_tab_entries(notes) -> list[tuple[str, int]]:
+    """
+    Compute unique tab names for notes, in display order
+    
+    Args:
+        notes: List of Note objects
+    
+    Returns:
+        List of (tab_name, note_id) tuples
+    """
+    entries = []
+    used_tab_names = set()
+    
+    for note in notes:
+        base_tab_name = get_tab_label(note)
+        tab_name = base_tab_name
+        
+        counter = 1
+        while tab_name in used_tab_names:
+            tab_name = f"{base_tab_name} ({counter})"
+            counter += 1
+        
+        used_tab_names.add(tab_name)
+        entries.append((tab_name, note.id))
+    
+    return entries
+
+
 def get_tab_label(note) -> str:
     """Generate label for tab from note"""
     if note.title:
         title = note.title[:20] + "..." if len(note.title) > 20 else note.title
         return f"📄 {title}"
     else:
-        content_preview = note.content[:15].strip() if note.content else "Untitled"
+        content_preview = note.preview[:15].strip() if note.preview else "Untitled"
         return f"📄 {content_preview}..."
 
 
@@ -0,0 +1,521 @@
+"""Note editors: chunked loading of large bodies, edit tracking for saving and a cache of open notes"""
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from config import (
+    EDITOR_CACHE_BYTES, EDITOR_CACHE_ENTRIES, EDITOR_CHUNK_BUDGET_MS, EDITOR_CHUNK_CHARS, EDITOR_FIRST_CHUNK_CHARS
+)
+from metrics import metrics
+
+_LOAD_MARK = "notestack_load"
+_WHOLE = (1, float("inf"))
+# Rough memory use of a text widget: a fixed part plus the stored text
+# (UTF-8 segments and line tree) per character
+_WIDGET_BYTES = 64 * 1024
+_WIDGET_BYTES_PER_CHAR = 3
+
+
+class EditorBuffer:
+    """
+    Keeps a note body and its text widget in step without copying the whole body
+
+    load() inserts the first EDITOR_FIRST_CHUNK_CHARS right away, so the first
+    screen paints immediately, and the rest in EDITOR_CHUNK_CHARS pieces from
+    idle callbacks, each running for at most EDITOR_CHUNK_BUDGET_MS. The
+    widget's Tcl command is wrapped so every insert and delete (typing,
+    pasting, programmatic changes) marks the lines it touched; get_content()
+    then rebuilds the body from the loaded text plus only the edited lines
+    read back from the widget. An edit at or after the load mark while loading
+    first inserts the rest of the body, so it never lands between the two
+    parts; edits in the loaded text leave loading running.
+    """
+
+    def __init__(self, text_input, placeholder_text: str = "Notunuzu buraya yazın...",
+                 first_chunk_chars: int = EDITOR_FIRST_CHUNK_CHARS, chunk_chars: int = EDITOR_CHUNK_CHARS,
+                 chunk_budget_ms: float = EDITOR_CHUNK_BUDGET_MS):
+        """
+        Args:
+            text_input: CTkTextbox (or tk.Text) to manage
+            placeholder_text: Text shown while the editor is empty (never returned as content)
+            first_chunk_chars: Characters inserted synchronously by load()
+            chunk_chars: Characters inserted per piece afterwards
+            chunk_budget_ms: Time one idle callback may spend inserting pieces
+                (at least one piece is inserted per callback)
+        """
+        self.text = getattr(text_input, '_textbox', text_input)
+        self.placeholder_text = placeholder_text
+        self.first_chunk_chars = first_chunk_chars
+        self.chunk_chars = chunk_chars
+        self.chunk_budget = chunk_budget_ms / 1000
+
+        self._source = ""
+        self._loaded = 0  # Characters of _source inserted so far
+        self._load_job = None
+        # First line and offset of every inserted piece, to find line offsets
+        # in the source without indexing every line
+        self._piece_lines = array('q')
+        self._piece_offsets = array('q')
+        self._lines_loaded = 1
+        # Edited lines as (first, last) in current line numbers, and how many
+        # lines the edits added (negative if removed)
+        self._dirty = None
+        self._line_delta = 0
+        # Edits so far and at the last mark_saved(), and a callback run after every edit
+        self._edits = 0
+        self._saved_edits = 0
+        self.on_change: Optional[Callable[[], None]] = None
+
+        self._tk = self.text.tk
+        self._command = str(self.text)
+        self._original = self._command + "_notestack"
+        self._tk.call("rename", self._command, self._original)
+        self._tk.createcommand(self._command, self._dispatch)
+        self.text.bind("<Destroy>", self._on_destroy, add="+")
+        # Whatever the widget already shows (the placeholder) is the starting body
+        self._source = self._call("get", "1.0", "end-1c")
+
+    @property
+    def is_loading(self) -> bool:
+        """Whether part of the body is still waiting to be inserted"""
+        return self._load_job is not None
+
+    @property
+    def is_modified(self) -> bool:
+        """Whether the text was edited since the last load() or clear()"""
+        return self._dirty is not None
+
+    @property
+    def has_unsaved_edits(self) -> bool:
+        """Whether the text was edited since the last load() or mark_saved()"""
+        return self._edits != self._saved_edits
+
+    def mark_saved(self):
+        """The current content was saved"""
+        self._saved_edits = self._edits
+
+    def memory_size(self) -> int:
+        """Estimated bytes held by the body and the widget"""
+        chars = len(self._source)
+        if self._dirty is not None:
+            chars = int(self._call("count", "-chars", "1.0", "end"))
+        return sys.getsizeof(self._source) + _WIDGET_BYTES + _WIDGET_BYTES_PER_CHAR * chars
+
+    def load(self, text: str):
+        """Show text, inserting the first screen now and the rest in the background"""
+        self.cancel()
+        self._call("delete", "1.0", "end")
+        self._source = text
+        self._loaded = 0
+        self._piece_lines = array('q')
+        self._piece_offsets = array('q')
+        self._lines_loaded = 1
+        self._dirty = None
+        self._line_delta = 0
+        self._edits = self._saved_edits = 0
+
+        self._call("insert", "end", self._next_piece(self.first_chunk_chars))
+        self._call("mark", "set", "insert", "1.0")
+        self._call("see", "1.0")
+        if self._loaded < len(text):
+            self._call("mark", "set", _LOAD_MARK, "end-1c")
+            self._load_job = self.text.after_idle(self._load_next)
+        else:
+            self._loaded_all()
+
+    def clear(self):
+        """Empty the widget and start a new body"""
+        self.load("")
+
+    def cancel(self):
+        """Stop inserting the rest of the body (the loaded part stays)"""
+        if self._load_job is not None:
+            self.text.after_cancel(self._load_job)
+            self._load_job = None
+
+    def finish(self):
+        """Insert whatever is still waiting to be loaded"""
+        if self._load_job is not None:
+            self.cancel()
+            pieces = []
+            while self._loaded < len(self._source):
+                pieces.append(self._next_piece(self.chunk_chars))
+            self._call("insert", _LOAD_MARK, "".join(pieces))
+            self._loaded_all()
+
+    @metrics.timed("editor.get_content")
+    def get_content(self) -> str:
+        """
+        Current content without surrounding whitespace ("" while the placeholder is shown)
+
+        Unedited bodies are returned as loaded; otherwise only the edited
+        lines are read from the widget and joined with the unchanged ones.
+        """
+        self.finish()
+        if self._dirty is None:
+            content = self._source
+        elif self._dirty == _WHOLE:
+            content = self._call("get", "1.0", "end-1c")
+        else:
+            content = self._splice()
+
+        # Only copy the content if there is whitespace to strip
+        if content[:1].isspace() or content[-1:].isspace():
+            content = content.strip()
+        if content == self.placeholder_text:
+            return ""
+        return content
+
+    def _splice(self) -> str:
+        """Unchanged lines before and after the edited ones around the edited lines read from the widget"""
+        first, last = self._dirty
+        source = self._source
+        start = self._line_offset(first)
+        prefix = source[:start] if start is not None else source + "\n"
+        middle = self._call("get", f"{first}.0", f"{last}.end")
+        # Source line right after the edited ones, with the line break before it
+        following = self._line_offset(last - self._line_delta + 1)
+        suffix = source[following - 1:] if following is not None else ""
+        return prefix + middle + suffix
+
+    def _line_offset(self, line: int) -> Optional[int]:
+        """Offset of the first character of a source line (None past the last line)"""
+        piece = bisect_right(self._piece_lines, line) - 1
+        if piece < 0:
+            return 0 if line == 1 else None
+        current, offset = self._piece_lines[piece], self._piece_offsets[piece]
+        # Scan at most one piece
+        while current < line:
+            offset = self._source.find("\n", offset) + 1
+            if offset == 0:
+                return None
+            current += 1
+        return offset
+
+    def _next_piece(self, limit: int) -> str:
+        """Next part of the source to insert, ending at a line break where possible"""
+        start = self._loaded
+        end = min(len(self._source), start + limit)
+        if end < len(self._source):
+            newline = self._source.rfind("\n", start, end)
+            if newline != -1:
+                end = newline + 1
+        piece = self._source[start:end]
+        if start == 0 or self._source[start - 1] == "\n":
+            # Pieces cut mid-line (no line break within the limit) are no use as a starting point
+            self._piece_lines.append(self._lines_loaded)
+            self._piece_offsets.append(start)
+        self._lines_loaded += piece.count("\n")
+        self._loaded = end
+        return piece
+
+    def _load_next(self):
+        """Insert pieces until the time budget is used up, then wait for Tk to be idle again"""
+        self._load_job = None
+        deadline = time.perf_counter() + self.chunk_budget
+        with metrics.timer("editor.load_chunk"):
+            self._call("insert", _LOAD_MARK, self._next_piece(self.chunk_chars))
+            while self._loaded < len(self._source) and time.perf_counter() < deadline:
+                self._call("insert", _LOAD_MARK, self._next_piece(self.chunk_chars))
+        if self._loaded < len(self._source):
+            # Idle callbacks added while Tk runs this one wait for the next idle
+            # pass, so input and redraws are handled in between
+            self._load_job = self.text.after_idle(self._load_next)
+        else:
+            self._loaded_all()
+
+    def _loaded_all(self):
+        """Forget the load mark and keep loading out of the undo history"""
+        self._call("mark", "unset", _LOAD_MARK)
+        self._call("edit", "reset")
+        self._call("edit", "modified", 0)
+
+    def _call(self, *args):
+        """Run a widget subcommand without recording it as an edit"""
+        return self._tk.call(self._original, *args)
+
+    def _line(self, index: str) -> int:
+        """Line number of index, clamped to the last line"""
+        line = int(self._call("index", index).split(".")[0])
+        return min(line, int(self._call("index", "end-1c").split(".")[0]))
+
+    def _dispatch(self, operation, *args):
+        """Widget command wrapper: record the lines an edit touches, then run it"""
+        if operation not in ("insert", "delete", "replace") and not (
+                operation == "edit" and args and args[0] in ("undo", "redo")):
+            return self._call(operation, *args)
+        if self._load_job is not None and self._reaches_load_mark(operation, args):
+            # The edit would end up between the loaded text and the rest:
+            # insert the rest first
+            self.finish()
+
+        if operation == "insert" and len(args) >= 2:
+            line = self._line(args[0])
+            added = sum(str(chars).count("\n") for chars in args[1::2])
+            result = self._call(operation, *args)
+            self._inserted(line, added)
+        elif operation == "delete" and 1 <= len(args) <= 2:
+            first = self._line(args[0])
+            last = self._line(args[1]) if len(args) == 2 else self._line(f"{args[0]}+1c")
+            result = self._call(operation, *args)
+            if last >= first:
+                self._deleted(first, last)
+        elif operation == "replace" and len(args) >= 3:
+            first, last = self._line(args[0]), self._line(args[1])
+            added = sum(str(chars).count("\n") for chars in args[2::2])
+            result = self._call(operation, *args)
+            if last >= first:
+                self._deleted(first, last)
+            self._inserted(first, added)
+        else:
+            # Changes whose lines are not worth working out: read everything back
+            self._dirty = _WHOLE
+            result = self._call(operation, *args)
+
+        self._edits += 1
+        if self.on_change is not None:
+            self.on_change()
+        return result
+
+    def _reaches_load_mark(self, operation, args) -> bool:
+        """Whether an edit touches the load mark or the (not yet loaded) text after it"""
+        if operation == "insert" and len(args) >= 2:
+            return self._compare(args[0], ">=", _LOAD_MARK)
+        if operation == "delete" and 1 <= len(args) <= 2:
+            last = args[1] if len(args) == 2 else f"{args[0]}+1c"
+            return self._compare(last, ">", _LOAD_MARK)
+        if operation == "replace" and len(args) >= 3:
+            return self._compare(args[1], ">", _LOAD_MARK)
+        # Undo, redo and unusual argument lists: no telling where they land
+        return True
+
+    def _compare(self, first: str, operator: str, second: str) -> bool:
+        """Compare two indices"""
+        return self._tk.getboolean(self._call("compare", first, operator, second))
+
+    def _inserted(self, line: int, added: int):
+        """Text with added line breaks was inserted into line"""
+        if self._dirty == _WHOLE:
+            return
+        first, last = self._dirty if self._dirty is not None else (line, line)
+        if first > line:
+            first += added
+        if last >= line:
+            last += added
+        self._dirty = (min(first, line), max(last, line + added))
+        self._line_delta += added
+
+    def _deleted(self, first_line: int, last_line: int):
+        """Text from first_line to last_line (joining them) was deleted"""
+        if self._dirty == _WHOLE:
+            return
+        removed = last_line - first_line
+        first, last = self._dirty if self._dirty is not None else (first_line, first_line)
+
+        def moved(line):
+            # Lines inside the deleted range are merged into first_line
+            if line > last_line:
+                return line - removed
+            return line if line < first_line else first_line
+
+        self._dirty = (min(moved(first), first_line), max(moved(last), first_line))
+        self._line_delta -= removed
+
+    def _on_destroy(self, event):
+        """Drop the command wrapper along with the widget"""
+        if event.widget is self.text:
+            self.cancel()
+            try:
+                self._tk.deletecommand(self._command)
+            except Exception:
+                pass
+
+
+class _CachedEditor:
+    """A note's text box, its buffer and the title entry text it was left with"""
+
+    __slots__ = ("widget", "buffer", "timestamp", "title", "size")
+
+    def __init__(self, widget, buffer: EditorBuffer):
+        self.widget = widget
+        self.buffer = buffer
+        self.timestamp = None
+        self.title = ""
+        self.size = 0
+
+
+class EditorCache:
+    """
+    Text boxes of recently opened notes, swapped in and out of the editor area
+
+    Switching back to a cached note packs its text box again instead of
+    reloading the body, so cursor, scroll position, undo history and unsaved
+    edits are kept. An entry is reloaded when the note's timestamp no longer
+    matches. When the cache exceeds max_entries or max_bytes (estimated by
+    EditorBuffer.memory_size) the least recently used text boxes are
+    destroyed; the one on screen is always kept, and so is any box with
+    unsaved edits (e.g. an autosave skipped because the note was empty or
+    too long). New notes are written in a separate scratch text box that is
+    never evicted.
+    """
+
+    def __init__(self, create_widget: Callable, scratch_widget,
+                 max_entries: int = EDITOR_CACHE_ENTRIES, max_bytes: int = EDITOR_CACHE_BYTES,
+                 on_change: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            create_widget: Creates an unpacked text box showing the placeholder
+            scratch_widget: Packed text box used for new notes
+            max_entries: Number of note text boxes kept
+            max_bytes: Estimated memory the kept text boxes may use
+            on_change: Called after every edit in any of the text boxes
+        """
+        self.create_widget = create_widget
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_change = on_change
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scratch = self._new_entry(scratch_widget)
+        self._current = self._scratch
+        self._editors: Dict[int, _CachedEditor] = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._editors)
+
+    @property
+    def widget(self):
+        """Text box on screen"""
+        return self._current.widget
+
+    @property
+    def buffer(self) -> EditorBuffer:
+        """Buffer of the text box on screen"""
+        return self._current.buffer
+
+    @property
+    def title(self) -> str:
+        """Title entry text of the text box on screen"""
+        return self._current.title
+
+    @metrics.timed("editor.open")
+    def open(self, note, title: str) -> bool:
+        """
+        Show the text box of a note, loading the note unless a current one is cached
+
+        Args:
+            note: Note to show
+            title: Title entry text to keep with the text box being swapped out
+
+        Returns:
+            Whether a cached text box was reused
+        """
+        entry = self._editors.get(note.id)
+        reused = entry is not None and entry.timestamp == note.timestamp
+        if reused:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if entry is None:
+                entry = self._editors[note.id] = self._new_entry(self.create_widget())
+            entry.buffer.load(note.content)
+            entry.widget.configure(text_color=("gray10", "gray90"))
+            entry.timestamp = note.timestamp
+            entry.title = note.title
+        self._editors.move_to_end(note.id)
+        self._swap(entry, title)
+        self._trim()
+        return reused
+
+    def open_scratch(self, title: str):
+        """Show the text box for new notes"""
+        self._swap(self._scratch, title)
+
+    def adopt(self, note):
+        """
+        The scratch text box was saved as a new note: keep it as that note's
+
+        A new scratch text box is created (unpacked) for the next new note.
+        """
+        entry = self._scratch
+        entry.timestamp = note.timestamp
+        entry.title = note.title
+        entry.size = entry.buffer.memory_size()
+        self._editors[note.id] = entry
+        self._size += entry.size
+        self._scratch = self._new_entry(self.create_widget())
+        self._trim()
+
+    def saved(self, note):
+        """The note on screen was saved from its text box: keep the box for the new timestamp"""
+        entry = self._editors.get(note.id)
+        if entry is not None:
+            entry.timestamp = note.timestamp
+            entry.title = note.title
+
+    def discard(self, note_id: int):
+        """Destroy the text box of a note (e.g. after the note was deleted)"""
+        entry = self._editors.get(note_id)
+        if entry is None:
+            return
+        if entry is self._current:
+            self._swap(self._scratch, "")
+        del self._editors[note_id]
+        self._size -= entry.size
+        entry.widget.destroy()
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters and current usage"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._editors),
+            "bytes": self._size,
+        }
+
+    def _new_entry(self, widget) -> _CachedEditor:
+        """Entry for a text box, reporting its edits to on_change"""
+        buffer = EditorBuffer(widget)
+        buffer.on_change = self._changed
+        return _CachedEditor(widget, buffer)
+
+    def _changed(self):
+        """A text box was edited"""
+        if self.on_change is not None:
+            self.on_change()
+
+    def _swap(self, entry: _CachedEditor, title: str):
+        """Pack entry's text box in place of the current one"""
+        previous = self._current
+        previous.title = title
+        if entry is previous:
+            return
+        previous.widget.pack_forget()
+        entry.widget.pack(fill="both", expand=True)
+        self._current = entry
+        # Sizes are taken when a text box is swapped in, after its body was loaded
+        if entry is not self._scratch:
+            size = entry.buffer.memory_size()
+            self._size += size - entry.size
+            entry.size = size
+
+    def _trim(self):
+        """Destroy least recently used text boxes over the limits, keeping unsaved ones"""
+        while len(self._editors) > self.max_entries or self._size > self.max_bytes:
+            note_id = next((
+                note_id for note_id, entry in self._editors.items()
+                if entry is not self._current and not entry.buffer.has_unsaved_edits
+            ), None)
+            if note_id is None:
+                # Only the box on screen and ones with unsaved edits are left
+                break
+            entry = self._editors.pop(note_id)
+            self._size -= entry.size
+            entry.widget.destroy()
+            self.evictions += 1
@@ -9,17 +9,24 @@ def setup_text_handlers(text_input, placeholder_text: str = "Notunuzu buraya yaz
         text_input: Text widget (CTkTextbox)
         placeholder_text: Placeholder text
     """
+    # Only this much of the text is read on focus changes, so large notes are not copied
+    probe = f"1.0 + {len(placeholder_text) + 64} chars"
+    
+    def is_short():
+        """Whether the whole text fits into the probe"""
+        return text_input.compare("end-1c", "<=", probe)
+    
     def on_focus_in(event):
         """Clear placeholder when text area is focused"""
-        current_text = text_input.get("1.0", "end-1c")
-        if current_text.strip() == placeholder_text:
+        current_text = text_input.get("1.0", probe)
+        if current_text.strip() == placeholder_text and is_short():
             text_input.delete("1.0", "end")
             text_input.configure(text_color=("gray10", "gray90"))
     
     def on_focus_out(event):
         """Add placeholder if text area is empty when focus is lost"""
-        current_text = text_input.get("1.0", "end-1c")
-        if not current_text.strip():
+        current_text = text_input.get("1.0", probe)
+        if not current_text.strip() and is_short():
             text_input.insert("1.0", placeholder_text)
             text_input.configure(text_color="gray")
     
@@ -65,8 +72,14 @@ def setup_search_handler(search_entry, search_callback):
         search_entry: Search entry widget
         search_callback: Callback function that receives search query and updates tabs
     """
+    last_query = [search_entry.get()]
+    
     def on_search(event=None):
         search_query = search_entry.get()
+        # Arrow keys, modifiers etc. don't change the text; only react to edits
+        if event is not None and search_query == last_query[0]:
+            return
+        last_query[0] = search_query
         search_callback(search_query)
     
     search_entry.bind("<KeyRelease>", on_search)
@@ -0,0 +1,242 @@
+"""Virtualized note list for large notebooks"""
+import customtkinter as ctk
+from tkinter import Menu
+
+from ui.components import build_tab_entries
+
+NORMAL_COLOR = ["#3B3B3B", "#2B2B2B"]
+NORMAL_HOVER_COLOR = ["#4A4A4A", "#3A3A3A"]
+MATCH_COLOR = "#FF3B30"
+MATCH_HOVER_COLOR = "#CC2E24"
+SELECTED_COLOR = "#007AFF"
+SELECTED_HOVER_COLOR = "#0056CC"
+
+
+class VirtualNoteList(ctk.CTkFrame):
+    """
+    Scrollable note list that only creates widgets for the visible rows
+
+    Rows are recycled while scrolling: a scroll only changes which entry each
+    row shows. Exposes the parts of the CTkTabview API the app relies on
+    (tab_references, set, get) so it can replace the tab strip.
+    """
+
+    def __init__(self, master, on_tab_select=None, on_delete=None, row_height: int = 28,
+                 visible_rows: int = 6, **kwargs):
+        """
+        Args:
+            master: Parent widget
+            on_tab_select: Callback receiving the note_id of a clicked row
+            on_delete: Callback receiving the note_id chosen in the context menu
+            row_height: Height of one row in pixels
+            visible_rows: Number of rows shown at once
+        """
+        super().__init__(master, height=row_height * visible_rows, fg_color="transparent", **kwargs)
+        self.on_tab_select = on_tab_select
+        self.on_delete = on_delete
+        self.row_height = row_height
+        self.tab_references = {}
+        self.tab_highlights = set()
+
+        self._entries = []
+        self._index_by_name = {}
+        self._current_name = ""
+        self._first = 0
+        self._rows = []
+        self._row_states = []
+        self._menu_note_id = None
+
+        self._body = ctk.CTkFrame(self, fg_color="transparent", height=row_height * visible_rows)
+        self._body.pack(side="left", fill="both", expand=True)
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.pack(side="right", fill="y")
+
+        self._menu = Menu(self, tearoff=0, bg="#2a2a2a", fg="white",
+                          activebackground="#007AFF", activeforeground="white")
+        self._menu.add_command(label="🗑️ Delete", command=self._delete_menu_note)
+
+        self._body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self._body)
+        self._ensure_rows(visible_rows)
+
+    def reconcile(self, notes, matched_note_ids=()) -> bool:
+        """
+        Show notes in the given order
+
+        Args:
+            notes: Notes to show, in display order
+            matched_note_ids: Note ids to highlight as search matches
+
+        Returns:
+            True if the set or order of entries changed
+        """
+        entries = build_tab_entries(notes)
+        changed = entries != self._entries
+        self._entries = entries
+        self._index_by_name = {name: i for i, (name, _) in enumerate(entries)}
+        self.tab_references = {name: note_id for name, note_id in entries}
+        self.tab_highlights = set(matched_note_ids) & set(self.tab_references.values())
+        if self._current_name not in self._index_by_name:
+            self._current_name = entries[0][0] if entries else ""
+        self._first = min(self._first, self._max_first())
+        self._render()
+        return changed
+
+    def set(self, name: str):
+        """Select an entry by name and scroll it into view"""
+        if name not in self._index_by_name:
+            raise ValueError(f"VirtualNoteList has no entry named '{name}'")
+        self._current_name = name
+        self.see(self._index_by_name[name])
+
+    def get(self) -> str:
+        """Name of the selected entry"""
+        return self._current_name
+
+    def see(self, index: int):
+        """Scroll so that the entry at index is visible"""
+        visible = len(self._visible_rows())
+        if index < self._first:
+            self._first = index
+        elif index >= self._first + visible:
+            self._first = index - visible + 1
+        self._first = max(0, min(self._first, self._max_first()))
+        self._render()
+
+    def _visible_rows(self):
+        """Rows that fit into the current height"""
+        height = self._body.winfo_height()
+        count = max(1, height // self.row_height) if height > 1 else len(self._rows)
+        return self._rows[:count]
+
+    def _max_first(self) -> int:
+        """Largest valid index of the first visible entry"""
+        return max(0, len(self._entries) - len(self._visible_rows()))
+
+    def _ensure_rows(self, count: int):
+        """Grow the row pool to count rows (rows are never destroyed)"""
+        while len(self._rows) < count:
+            position = len(self._rows)
+            row = ctk.CTkButton(
+                self._body,
+                text="",
+                anchor="w",
+                height=self.row_height - 2,
+                corner_radius=5,
+                font=("Arial", 11),
+                fg_color=NORMAL_COLOR,
+                hover_color=NORMAL_HOVER_COLOR,
+                command=lambda position=position: self._on_row_click(position)
+            )
+            row.place(x=0, y=position * self.row_height, relwidth=1.0)
+            row.bind("<Button-3>", lambda e, position=position: self._on_row_menu(position, e))
+            self._bind_wheel(row)
+            self._rows.append(row)
+            self._row_states.append(None)
+
+    def _render(self):
+        """Update row texts and colors for the current scroll position"""
+        rows = self._visible_rows()
+        for position, row in enumerate(self._rows):
+            index = self._first + position
+            if position < len(rows) and index < len(self._entries):
+                name, note_id = self._entries[index]
+                if name == self._current_name:
+                    colors = (SELECTED_COLOR, SELECTED_HOVER_COLOR)
+                elif note_id in self.tab_highlights:
+                    colors = (MATCH_COLOR, MATCH_HOVER_COLOR)
+                else:
+                    colors = (NORMAL_COLOR, NORMAL_HOVER_COLOR)
+                state = (name, colors)
+            else:
+                state = None
+
+            # Skip rows that already show the right thing
+            if state == self._row_states[position]:
+                continue
+            self._row_states[position] = state
+            if state is None:
+                row.place_forget()
+            else:
+                name, (fg_color, hover_color) = state
+                row.configure(text=name, fg_color=fg_color, hover_color=hover_color)
+                row.place(x=0, y=position * self.row_height, relwidth=1.0)
+
+        total = len(self._entries)
+        if total:
+            self._scrollbar.set(self._first / total, min(1.0, (self._first + len(rows)) / total))
+        else:
+            self._scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, first: int):
+        """Move the window to start at entry first"""
+        first = max(0, min(first, self._max_first()))
+        if first != self._first:
+            self._first = first
+            self._render()
+
+    def _on_scrollbar(self, action, *args):
+        """Handle scrollbar drags and clicks"""
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * len(self._entries)))
+        elif action == "scroll":
+            amount = int(args[0])
+            if len(args) > 1 and args[1] == "pages":
+                amount *= len(self._visible_rows())
+            self._scroll_to(self._first + amount)
+
+    def _on_wheel(self, event):
+        """Scroll by three entries per wheel step"""
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self._scroll_to(self._first - 3)
+        else:
+            self._scroll_to(self._first + 3)
+        return "break"
+
+    def _bind_wheel(self, widget):
+        """Bind mouse wheel scrolling (Windows/macOS and X11 events)"""
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel)
+        widget.bind("<Button-5>", self._on_wheel)
+
+    def _on_resize(self, event):
+        """Create rows for newly visible space and re-render"""
+        self._ensure_rows(max(1, event.height // self.row_height))
+        self._first = min(self._first, self._max_first())
+        self._render()
+
+    def _entry_at(self, position: int):
+        """(name, note_id) shown in the row at position, or None"""
+        index = self._first + position
+        if 0 <= index < len(self._entries):
+            return self._entries[index]
+        return None
+
+    def _on_row_click(self, position: int):
+        """Select the clicked entry"""
+        entry = self._entry_at(position)
+        if entry is None:
+            return
+        name, note_id = entry
+        self._current_name = name
+        self._render()
+        if self.on_tab_select:
+            self.on_tab_select(note_id)
+
+    def _on_row_menu(self, position: int, event):
+        """Show the context menu for a row"""
+        entry = self._entry_at(position)
+        if entry is None or not self.on_delete:
+            return
+        self._menu_note_id = entry[1]
+        try:
+            self._menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            self._menu.grab_release()
+
+    def _delete_menu_note(self):
+        """Delete the note chosen in the context menu"""
+        if self._menu_note_id is not None and self.on_delete:
+            note_id = self._menu_note_id
+            self._menu_note_id = None
+            self.on_delete(note_id)
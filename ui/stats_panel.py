@@ -0,0 +1,106 @@
+"""Live view of the instrumentation metrics (opened from the ⚙️ button)"""
+import customtkinter as ctk
+
+from metrics import Metrics
+
+REFRESH_MS = 1000
+
+
+class StatsPanel(ctk.CTkToplevel):
+    """
+    Window showing timers, counters and cache statistics
+
+    The table is redrawn every REFRESH_MS while the window is open. When
+    metrics are off it says how to turn them on and offers to start
+    recording for the rest of the session.
+    """
+
+    def __init__(self, parent, metrics: Metrics, dump_path=None):
+        """
+        Args:
+            parent: Parent window
+            metrics: Registry to show
+            dump_path: JSON lines file for the "Kaydet" button (hidden if None)
+        """
+        super().__init__(parent)
+        self.metrics = metrics
+        self.dump_path = dump_path
+        self._refresh_job = None
+        self._notice = ""
+        self.title("İstatistikler")
+        self.geometry("760x480")
+        self.configure(fg_color="#1a1a1a")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.status_label = ctk.CTkLabel(self, text="", font=("Arial", 12), anchor="w")
+        self.status_label.pack(fill="x", padx=15, pady=(15, 5))
+
+        self.textbox = ctk.CTkTextbox(self, font=("Courier", 12), wrap="none")
+        self.textbox.pack(fill="both", expand=True, padx=15, pady=5)
+
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(fill="x", padx=15, pady=(5, 15))
+        self.toggle_btn = ctk.CTkButton(buttons, text="", width=130, command=self._toggle)
+        self.toggle_btn.pack(side="left")
+        ctk.CTkButton(
+            buttons, text="Sıfırla", width=100, fg_color="#6c6c6c", hover_color="#555555",
+            command=self._reset
+        ).pack(side="left", padx=(10, 0))
+        if dump_path is not None:
+            ctk.CTkButton(buttons, text="Kaydet", width=100, command=self._dump).pack(side="left", padx=(10, 0))
+        ctk.CTkButton(buttons, text="Kapat", width=100, command=self.close).pack(side="right")
+
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the table and schedule the next redraw"""
+        if self.metrics.enabled:
+            status = "📊 Ölçüm açık"
+            self.toggle_btn.configure(text="Durdur")
+        else:
+            status = "⏸️ Ölçüm kapalı (NOTESTACK_METRICS=1 veya METRICS_ENABLED)"
+            self.toggle_btn.configure(text="Başlat")
+        self.status_label.configure(text=f"{status}   {self._notice}" if self._notice else status)
+
+        text = self.metrics.report()
+        if self.textbox.get("1.0", "end-1c") != text:
+            self.textbox.configure(state="normal")
+            self.textbox.delete("1.0", "end")
+            self.textbox.insert("1.0", text)
+            self.textbox.configure(state="disabled")
+        self._refresh_job = self.after(REFRESH_MS, self.refresh)
+
+    def close(self):
+        """Stop refreshing and close the window"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self.destroy()
+
+    def _toggle(self):
+        """Start or stop recording"""
+        if self.metrics.enabled:
+            self.metrics.disable()
+        else:
+            self.metrics.enable()
+        self._redraw_now()
+
+    def _reset(self):
+        """Forget recorded values"""
+        self.metrics.reset()
+        self._redraw_now()
+
+    def _dump(self):
+        """Append the current values to the dump file"""
+        try:
+            lines = self.metrics.dump(self.dump_path)
+            self._notice = f"✓ {lines} satır yazıldı: {self.dump_path}"
+        except OSError as e:
+            self._notice = f"❌ Yazılamadı: {e}"
+        self._redraw_now()
+
+    def _redraw_now(self):
+        """Refresh immediately instead of at the next tick"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+        self.refresh()
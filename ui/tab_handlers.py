@@ -1,7 +1,53 @@
 import customtkinter as ctk
+from bisect import bisect_right
 from tkinter import Menu
+import time
 import tkinter as tk
 
+from config import HOVER_THROTTLE_MS
+from metrics import metrics
+
+
+class TabGeometry:
+    """
+    Screen boxes of the tab strip and of each tab button
+    
+    Boxes are sorted by their left edge, so the tab under a point is found
+    with a binary search instead of a scan.
+    """
+    
+    __slots__ = ("left", "top", "right", "bottom", "_lefts", "_rights", "_names")
+    
+    def __init__(self, left, top, right, bottom, boxes):
+        """
+        Args:
+            left, top, right, bottom: Tab strip box in root coordinates
+            boxes: (left, right, tab name) of each tab button in root coordinates
+        """
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+        boxes = sorted(boxes, key=lambda box: box[0])
+        self._lefts = [box[0] for box in boxes]
+        self._rights = [box[1] for box in boxes]
+        self._names = [box[2] for box in boxes]
+    
+    def contains(self, x, y) -> bool:
+        """Whether a point lies inside the tab strip"""
+        return self.left <= x <= self.right and self.top <= y <= self.bottom
+    
+    def boxes(self):
+        """(left, right, tab name) of every button, left to right"""
+        return list(zip(self._lefts, self._rights, self._names))
+    
+    def hit(self, x):
+        """Name of the tab button at x (None between or outside the buttons)"""
+        index = bisect_right(self._lefts, x) - 1
+        if index >= 0 and x < self._rights[index]:
+            return self._names[index]
+        return None
+
 
 class TabHoverHandler:
     """Handle tab hover events and context menu"""
@@ -21,10 +67,21 @@ class TabHoverHandler:
         self.hovered_tab_name = None
         self.tab_menu = None
         self.hover_timer = None
-        self.overlay_widgets = {}  # Store overlay widgets for each tab
+        self.overlay_widgets = {}  # Overlay widget of each tab (from the pool below)
+        self._overlays = []  # Pooled overlay labels, bound once to their slot
+        self._overlay_names = []  # Tab name each slot currently stands for
+        self._overlay_places = []  # Last placement of each slot (None while hidden)
+        self._overlay_parent_widget = None
+        self._overlays_supported = True
+        self._overlay_job = None
+        self.throttle = HOVER_THROTTLE_MS / 1000
+        self._geometry = None  # Cached TabGeometry (None until measured)
+        self._pointer = (0, 0)
+        self._last_motion = 0.0
+        self._motion_job = None
         
         self._setup_menu()
-        self._create_overlays()
+        self._sync_overlays()
         self._bind_events()
     
     def _setup_menu(self):
@@ -33,63 +90,125 @@ class TabHoverHandler:
                            activebackground="#007AFF", activeforeground="white")
         self.tab_menu.add_command(label="🗑️ Delete", command=self._delete_hovered_note)
     
-    def _create_overlays(self):
-        """Create invisible overlay widgets on top of tab headers for hover detection"""
+    def _overlay_parent(self):
+        """Widget the overlays are placed in (None if the tab strip has none)"""
+        seg_button = getattr(self.tabview, '_segmented_button', None)
+        for attribute in ('_canvas', '_frame', '_parent_canvas'):
+            if hasattr(seg_button, attribute):
+                return getattr(seg_button, attribute)
+        return None
+    
+    def _sync_overlays(self):
+        """
+        Place invisible overlays on top of the tab headers for hover detection
+        
+        Overlays come from a pool: existing widgets are moved and relabelled
+        to the current tabs, new ones are only created when there are more
+        tabs than ever before, and surplus ones are hidden for later reuse.
+        Each overlay is bound once, to its pool slot, so a refresh creates
+        no widgets and no Tcl callback commands.
+        """
+        self._overlay_job = None
         try:
-            if hasattr(self.tabview, '_segmented_button'):
-                seg_button = self.tabview._segmented_button
-                
-                # Get tab values from tab_references instead
-                if hasattr(self.tabview, 'tab_references') and self.tabview.tab_references:
-                    values = list(self.tabview.tab_references.keys())
-                    
-                    # Get the canvas or frame that contains the buttons
-                    parent_widget = None
-                    if hasattr(seg_button, '_canvas'):
-                        parent_widget = seg_button._canvas
-                    elif hasattr(seg_button, '_frame'):
-                        parent_widget = seg_button._frame
-                    elif hasattr(seg_button, '_parent_canvas'):
-                        parent_widget = seg_button._parent_canvas
-                    
-                    if parent_widget and values:
-                        # Calculate button positions
-                        try:
-                            total_width = seg_button.winfo_width()
-                            total_height = seg_button.winfo_height()
-                            
-                            if total_width > 0 and len(values) > 0:
-                                button_width = total_width / len(values)
-                                
-                                # Create invisible labels for each tab
-                                for i, tab_name in enumerate(values):
-                                    if tab_name in self.tabview.tab_references:
-                                        # Create invisible label overlay
-                                        overlay = tk.Label(
-                                            parent_widget,
-                                            bg='',
-                                            width=int(button_width),
-                                            height=1,
-                                            cursor='arrow'
-                                        )
-                                        
-                                        # Place overlay at button position
-                                        overlay.place(x=i * button_width, y=0, width=button_width, height=total_height)
-                                        
-                                        # Bind hover events
-                                        overlay.bind('<Enter>', lambda e, name=tab_name: self.on_tab_enter(name, e))
-                                        overlay.bind('<Leave>', lambda e: self.on_tab_leave())
-                                        
-                                        self.overlay_widgets[tab_name] = overlay
-                        except Exception:
-                            pass
+            parent_widget = self._overlay_parent()
+            if parent_widget is not self._overlay_parent_widget:
+                # The tab strip was rebuilt: its overlays went with it
+                self._destroy_overlays()
+                self._overlay_parent_widget = parent_widget
+            
+            geometry = self._measure() if parent_widget is not None and self._overlays_supported else None
+            boxes = geometry.boxes() if geometry is not None else []
+            while len(self._overlays) < len(boxes) and self._grow_overlays(parent_widget):
+                pass
+            
+            origin_x = parent_widget.winfo_rootx() if boxes else 0
+            height = geometry.bottom - geometry.top if geometry is not None else 0
+            self.overlay_widgets = {}
+            for slot, (left, right, tab_name) in enumerate(boxes[:len(self._overlays)]):
+                overlay = self._overlays[slot]
+                self._overlay_names[slot] = tab_name
+                place = (left - origin_x, right - left, height)
+                if self._overlay_places[slot] != place:
+                    overlay.place(x=place[0], y=0, width=place[1], height=height)
+                    self._overlay_places[slot] = place
+                self.overlay_widgets[tab_name] = overlay
+            self._hide_overlays(len(self.overlay_widgets))
         except Exception:
             pass
     
+    def _grow_overlays(self, parent_widget) -> bool:
+        """Add one overlay to the pool, returning False if overlays cannot be created"""
+        slot = len(self._overlays)
+        try:
+            overlay = tk.Label(parent_widget, bg='', height=1, cursor='arrow')
+        except tk.TclError:
+            # Not supported by this Tk: hover falls back to the motion binding
+            self._overlays_supported = False
+            return False
+        overlay.bind('<Enter>', lambda e, slot=slot: self._on_overlay_enter(slot, e))
+        overlay.bind('<Leave>', self._on_overlay_leave)
+        self._overlays.append(overlay)
+        self._overlay_names.append(None)
+        self._overlay_places.append(None)
+        return True
+    
+    def _hide_overlays(self, start: int):
+        """Hide pooled overlays from slot start on"""
+        for slot in range(start, len(self._overlays)):
+            self._overlay_names[slot] = None
+            if self._overlay_places[slot] is not None:
+                self._overlays[slot].place_forget()
+                self._overlay_places[slot] = None
+    
+    def _destroy_overlays(self):
+        """Destroy the whole pool"""
+        for overlay in self._overlays:
+            try:
+                overlay.destroy()
+            except tk.TclError:
+                pass
+        self._overlays = []
+        self._overlay_names = []
+        self._overlay_places = []
+        self.overlay_widgets = {}
+    
+    def _schedule_overlay_sync(self):
+        """Sync overlays once Tk has laid out the tabs (several requests run once)"""
+        if self._overlay_job is None and self._overlays_supported:
+            self._overlay_job = self.root.after_idle(self._sync_overlays)
+    
+    def _on_overlay_enter(self, slot: int, event):
+        """Pointer entered the overlay in slot"""
+        tab_name = self._overlay_names[slot]
+        if tab_name is not None:
+            self.on_tab_enter(tab_name, event)
+    
+    def _on_overlay_leave(self, event):
+        """Pointer left an overlay"""
+        self.on_tab_leave()
+    
     def _bind_events(self):
-        """Bind hover events - alternative approach using periodic checking"""
-        # Also bind to root window as fallback
+        """Bind hover events"""
+        # Motion anywhere in the window reaches the root binding; hit-testing
+        # uses cached geometry, which resizing or moving the tab strip
+        # invalidates (see _on_configure)
         self.root.bind("<Motion>", self.on_mouse_motion)
+        self.root.bind("<Configure>", self._on_configure, add="+")
+    
+    def _on_configure(self, event):
+        """Invalidate the tab boxes if the tab strip, one of its buttons or a widget containing it changed"""
+        # The root binding also sees <Configure> of every other widget in the
+        # window (text box, note list rows, ...), which cannot move the tabs
+        seg_button = getattr(self.tabview, '_segmented_button', None)
+        if seg_button is None:
+            self._invalidate_geometry()
+            return
+        strip = str(seg_button)
+        widget = str(event.widget)
+        # Widget paths nest: ".a.b" is inside ".a" (and everything is inside ".")
+        if (widget == strip or widget.startswith(strip + ".")
+                or strip.startswith(widget.rstrip(".") + ".")):
+            self._invalidate_geometry()
     
     def on_tab_enter(self, tab_name, event):
         """Handle mouse entering a tab button"""
@@ -117,86 +236,112 @@ class TabHoverHandler:
             self.root.after_cancel(self.hover_timer)
             self.hover_timer = None
     
+    @metrics.timed("ui.hover")
     def on_mouse_motion(self, event):
-        """Handle mouse motion - fallback method"""
+        """
+        Handle pointer motion anywhere in the window
+        
+        Motion outside the cached tab strip box only clears a previous hover;
+        inside it, events are handled at most once per HOVER_THROTTLE_MS (the
+        last position is handled when the interval ends).
+        """
         try:
-            if not hasattr(self.tabview, '_segmented_button'):
+            geometry = self._geometry if self._geometry is not None else self._measure()
+            if geometry is None:
                 return
             
-            seg_button = self.tabview._segmented_button
-            
-            try:
-                seg_x = seg_button.winfo_rootx()
-                seg_y = seg_button.winfo_rooty()
-                seg_width = seg_button.winfo_width()
-                seg_height = seg_button.winfo_height()
-            except:
-                seg_x = self.tabview.winfo_rootx()
-                seg_y = self.tabview.winfo_rooty()
-                seg_width = self.tabview.winfo_width()
-                seg_height = 50
-            
-            root_x = event.x_root
-            root_y = event.y_root
+            x, y = event.x_root, event.y_root
+            if not geometry.contains(x, y):
+                self._leave_strip()
+                return
             
-            if (seg_x <= root_x <= seg_x + seg_width and 
-                seg_y <= root_y <= seg_y + seg_height):
-                rel_x = root_x - seg_x
-                tab_name = self._get_tab_at_position(rel_x, seg_button)
-                
-                if tab_name and tab_name in self.tabview.tab_references:
-                    if self.hovered_tab_name != tab_name:
-                        self.hovered_tab_name = tab_name
-                        if self.hover_timer:
-                            self.root.after_cancel(self.hover_timer)
-                        menu_x = root_x
-                        menu_y = root_y + 20
-                        self._close_menu()
-                        self.hover_timer = self.root.after(400, lambda: self._show_menu(menu_x, menu_y))
-                else:
-                    self._close_menu()
-                    self.hovered_tab_name = None
+            self._pointer = (x, y)
+            if self._motion_job is not None:
+                return
+            wait = self._last_motion + self.throttle - time.monotonic()
+            if wait > 0:
+                self._motion_job = self.root.after(int(wait * 1000) + 1, self._handle_pending_motion)
             else:
+                self._handle_motion(x, y)
+        except Exception:
+            pass
+    
+    def _handle_pending_motion(self):
+        """Handle the last position seen during the throttle interval"""
+        self._motion_job = None
+        try:
+            geometry = self._geometry if self._geometry is not None else self._measure()
+            if geometry is not None and geometry.contains(*self._pointer):
+                self._handle_motion(*self._pointer)
+        except Exception:
+            pass
+    
+    def _handle_motion(self, x, y):
+        """Update the hovered tab for a pointer position inside the tab strip"""
+        self._last_motion = time.monotonic()
+        tab_name = self._geometry.hit(x) if self._geometry is not None else None
+        
+        if tab_name and tab_name in self.tabview.tab_references:
+            if self.hovered_tab_name != tab_name:
+                self.hovered_tab_name = tab_name
                 if self.hover_timer:
                     self.root.after_cancel(self.hover_timer)
-                    self.hover_timer = None
+                menu_x = x
+                menu_y = y + 20
                 self._close_menu()
-                self.hovered_tab_name = None
-        except Exception:
-            pass
+                self.hover_timer = self.root.after(400, lambda: self._show_menu(menu_x, menu_y))
+        else:
+            self._close_menu()
+            self.hovered_tab_name = None
+    
+    def _leave_strip(self):
+        """Forget the hovered tab once the pointer is outside the tab strip"""
+        if self.hover_timer:
+            self.root.after_cancel(self.hover_timer)
+            self.hover_timer = None
+        if self.hovered_tab_name is not None:
+            self._close_menu()
+            self.hovered_tab_name = None
     
-    def _get_tab_at_position(self, x, seg_button):
-        """Determine which tab is at the given x position"""
+    def _invalidate_geometry(self, event=None):
+        """Drop the cached tab boxes and move the overlays (window or widget geometry changed)"""
+        self._geometry = None
+        if self._overlay_parent() is not None:
+            self._schedule_overlay_sync()
+    
+    def _measure(self):
+        """Read the tab strip and per-tab boxes from Tk and cache them"""
+        seg_button = getattr(self.tabview, '_segmented_button', None)
+        if seg_button is None:
+            return None
+        
         try:
-            # Get tab names from tabview.tab_references instead of segmented_button.values
-            if not hasattr(self.tabview, 'tab_references') or not self.tabview.tab_references:
-                return None
-            
-            # Get tab names from tab_references keys
-            values = list(self.tabview.tab_references.keys())
-            if not values:
+            left = seg_button.winfo_rootx()
+            top = seg_button.winfo_rooty()
+            width = seg_button.winfo_width()
+            height = seg_button.winfo_height()
+            if width <= 1 or height <= 1:
+                # Not mapped yet: measure again on the next event
                 return None
             
-            try:
-                total_width = seg_button.winfo_width()
-            except:
-                return None
-            
-            if total_width <= 0:
-                return None
-            
-            button_width = total_width / len(values) if len(values) > 0 else 0
-            
-            if button_width <= 0:
-                return None
-            
-            button_index = int(x / button_width)
-            button_index = max(0, min(button_index, len(values) - 1))
-            
-            result = values[button_index]
-            return result
-        except Exception:
+            buttons = getattr(seg_button, '_buttons_dict', {})
+            names = list(self.tabview.tab_references)
+            boxes = []
+            for name in names:
+                button = buttons.get(name)
+                if button is not None:
+                    button_left = button.winfo_rootx()
+                    boxes.append((button_left, button_left + button.winfo_width(), name))
+        except tk.TclError:
             return None
+        
+        if not boxes and names:
+            # No button widgets to measure: assume equal widths
+            step = width / len(names)
+            boxes = [(left + i * step, left + (i + 1) * step, name) for i, name in enumerate(names)]
+        
+        self._geometry = TabGeometry(left, top, left + width, top + height, boxes)
+        return self._geometry
     
     def _show_menu(self, x, y):
         """Show menu at specific position"""
@@ -233,22 +378,26 @@ class TabHoverHandler:
     
     def reset(self):
         """Reset hover state (call after tab refresh)"""
-        # Destroy old overlays
-        for overlay in self.overlay_widgets.values():
-            try:
-                overlay.destroy()
-            except:
-                pass
-        self.overlay_widgets.clear()
-        
         self.hovered_tab_name = None
         self._close_menu()
         if self.hover_timer:
             self.root.after_cancel(self.hover_timer)
             self.hover_timer = None
+        if self._motion_job is not None:
+            self.root.after_cancel(self._motion_job)
+            self._motion_job = None
+        self._geometry = None
         
-        # Recreate overlays after refresh
-        self._create_overlays()
+        # Reuse the pooled overlays for the new tabs once they are laid out
+        self._schedule_overlay_sync()
+
+
+def apply_tab_highlight(button, matched: bool):
+    """Color a tab button as a search match (red) or normal"""
+    if matched:
+        button.configure(fg_color="#FF3B30", hover_color="#CC2E24")
+    else:
+        button.configure(fg_color=["#3B3B3B", "#2B2B2B"], hover_color=["#4A4A4A", "#3A3A3A"])
 
 
 def highlight_matching_tabs(tabview, tab_references, matched_note_ids):
@@ -269,8 +418,6 @@ def highlight_matching_tabs(tabview, tab_references, matched_note_ids):
     
     for tab_name, note_id in tab_references.items():
         if tab_name in seg_button._buttons_dict:
-            button = seg_button._buttons_dict[tab_name]
-            if note_id in matched_note_ids:
-                button.configure(fg_color="#FF3B30", hover_color="#CC2E24")
-            else:
-                button.configure(fg_color=["#3B3B3B", "#2B2B2B"], hover_color=["#4A4A4A", "#3A3A3A"])
+            apply_tab_highlight(seg_button._buttons_dict[tab_name], note_id in matched_note_ids)
+    
+    tabview.tab_highlights = {note_id for note_id in tab_references.values() if note_id in matched_note_ids}
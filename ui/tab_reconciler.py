@@ -0,0 +1,125 @@
+"""Incremental tab updates: apply only the differences between two tab lists"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+
+from ui.components import build_tab_entries
+from ui.tab_handlers import apply_tab_highlight
+
+
+def _longest_increasing_subsequence(values: List[int]) -> Set[int]:
+    """Indices of one longest strictly increasing subsequence"""
+    tails: List[int] = []
+    tail_indices: List[int] = []
+    previous: List[Optional[int]] = [None] * len(values)
+
+    for i, value in enumerate(values):
+        position = bisect_left(tails, value)
+        if position == len(tails):
+            tails.append(value)
+            tail_indices.append(i)
+        else:
+            tails[position] = value
+            tail_indices[position] = i
+        previous[i] = tail_indices[position - 1] if position > 0 else None
+
+    kept = set()
+    i = tail_indices[-1] if tail_indices else None
+    while i is not None:
+        kept.add(i)
+        i = previous[i]
+    return kept
+
+
+def reconcile_tabs(tabview, notes, matched_note_ids: Iterable[int] = ()) -> bool:
+    """
+    Bring the tabs in line with notes using the fewest tab operations
+
+    Tabs are matched by note id; only removed, added, renamed, moved and
+    re-highlighted tabs are touched. tabview.tab_references is rebuilt in
+    display order.
+
+    Args:
+        tabview: CTkTabview widget (created by components.create_note_tabs)
+        notes: Notes to show, in display order
+        matched_note_ids: Note ids to highlight as search matches
+
+    Returns:
+        True if tabs were added, removed, renamed or moved
+    """
+    matched = set(matched_note_ids)
+    highlights: Set[int] = getattr(tabview, 'tab_highlights', set())
+    old_names: Dict[int, str] = {note_id: name for name, note_id in tabview.tab_references.items()}
+    entries = build_tab_entries(notes)
+    new_names: Dict[int, str] = {note_id: name for name, note_id in entries}
+    touched: Set[int] = set()
+
+    # Removed tabs
+    for note_id, name in old_names.items():
+        if note_id not in new_names:
+            try:
+                tabview.delete(name)
+            except ValueError:
+                pass
+    current_names = {note_id: name for note_id, name in old_names.items() if note_id in new_names}
+
+    # Renamed tabs (through a temporary name when the new one is still taken)
+    in_use = set(current_names.values())
+    staged = []
+    for note_id, old_name in current_names.items():
+        new_name = new_names[note_id]
+        if new_name == old_name:
+            continue
+        target = new_name if new_name not in in_use else f"{new_name}\u200b{note_id}"
+        tabview.rename(old_name, target)
+        in_use.discard(old_name)
+        in_use.add(target)
+        current_names[note_id] = target
+        touched.add(note_id)
+        if target != new_name:
+            staged.append(note_id)
+    for note_id in staged:
+        tabview.rename(current_names[note_id], new_names[note_id])
+        current_names[note_id] = new_names[note_id]
+
+    # Added tabs, inserted at their final position
+    for index, (name, note_id) in enumerate(entries):
+        if note_id not in current_names:
+            tab_frame = tabview.insert(index, name)
+            tab_frame.note_id = note_id
+            current_names[note_id] = name
+            touched.add(note_id)
+
+    # Moved tabs: keep the longest run already in order, move the rest
+    seg_button = getattr(tabview, '_segmented_button', None)
+    if seg_button is not None and hasattr(seg_button, '_value_list'):
+        target_index = {note_id: i for i, (_, note_id) in enumerate(entries)}
+        name_to_id = {name: note_id for note_id, name in current_names.items()}
+        display = [name_to_id[name] for name in seg_button._value_list if name in name_to_id]
+        if display != [note_id for _, note_id in entries]:
+            kept = _longest_increasing_subsequence([target_index[note_id] for note_id in display])
+            stray = sorted(
+                (note_id for i, note_id in enumerate(display) if i not in kept),
+                key=target_index.get
+            )
+            for note_id in stray:
+                display.remove(note_id)
+                position = target_index[note_id]
+                # Insert right after the tab that precedes it in the final order
+                new_index = display.index(entries[position - 1][1]) + 1 if position > 0 else 0
+                display.insert(new_index, note_id)
+                tabview.move(new_index, new_names[note_id])
+                touched.add(note_id)
+
+    tabview.tab_references = {name: note_id for name, note_id in entries}
+
+    # Recolor only tabs whose highlight changed or whose button was recreated
+    buttons = getattr(seg_button, '_buttons_dict', {}) if seg_button is not None else {}
+    for note_id, name in new_names.items():
+        is_matched = note_id in matched
+        if note_id in touched or is_matched != (note_id in highlights):
+            button = buttons.get(name)
+            if button is not None:
+                apply_tab_highlight(button, is_matched)
+    tabview.tab_highlights = matched & set(new_names)
+
+    return bool(touched) or len(old_names) != len(current_names)
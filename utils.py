@@ -1,21 +1,40 @@
 """Utility functions for the desktop app"""
-from datetime import datetime
-from ui.dialogs import show_confirm
+from config import MAX_NOTE_LENGTH
+from metrics import metrics
+from models import format_timestamp, parse_timestamp
 
-def format_date(date_string):
-    """Format date string to readable format"""
+def format_date(date_value):
+    """Format a note date (timestamp or stored date string) to readable format"""
     try:
-        dt = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S")
-        return dt.strftime("%d %b %Y, %H:%M")
-    except:
-        return date_string
+        if isinstance(date_value, str):
+            date_value = parse_timestamp(date_value)
+        return format_timestamp(date_value)
+    except (TypeError, ValueError):
+        return date_value
 
-def validate_note(content):
-    """Validate note content"""
-    if not content or not content.strip():
+def validate_note(content, max_length: int = MAX_NOTE_LENGTH):
+    """
+    Validate note content without copying it
+    
+    Args:
+        content: Note content, as a string or an iterable of string pieces
+        max_length: Longest allowed content in characters
+    
+    Returns:
+        (is_valid, error message)
+    """
+    pieces = (content,) if isinstance(content, str) else content
+    length = 0
+    has_text = False
+    for piece in pieces:
+        length += len(piece)
+        if length > max_length:
+            return False, f"Note is too long (max {max_length} characters)"
+        # isspace() stops at the first other character
+        if not has_text and piece and not piece.isspace():
+            has_text = True
+    if not has_text:
         return False, "Note cannot be empty"
-    if len(content) > 5000:
-        return False, "Note is too long (max 5000 characters)"
     return True, ""
 
 def confirm_delete(parent, note_title: str = None) -> bool:
@@ -34,16 +53,20 @@ def confirm_delete(parent, note_title: str = None) -> bool:
     else:
         message = "Bu notu silmek istediğinizden emin misiniz?\n\nBu işlem geri alınamaz."
     
+    # Imported here so the other helpers can be used without the GUI toolkit
+    from ui.dialogs import show_confirm
     return show_confirm(parent, "Not Sil", message)
 
 
-def filter_notes_by_query(notes, query: str):
+@metrics.timed("search.filter")
+def filter_notes_by_query(notes, query: str, index=None):
     """
     Filter notes by search query
     
     Args:
         notes: List of Note objects
         query: Search query string
+        index: Optional SearchIndex over the same notes (avoids scanning every note)
     
     Returns:
         List of filtered Note objects
@@ -51,12 +74,18 @@ def filter_notes_by_query(notes, query: str):
     if not query or not query.strip():
         return notes
     
+    if index is not None:
+        matched_ids = index.search(query)
+        return [note for note in notes if note.id in matched_ids]
+    
     query_lower = query.strip().lower()
     filtered = []
     
     for note in notes:
         title_match = note.title.lower() if note.title else ""
-        content_match = note.content.lower() if note.content else ""
+        # Peek so a full scan does not flush the body cache
+        content = note.peek_content()
+        content_match = content.lower() if content else ""
         if query_lower in title_match or query_lower in content_match:
             filtered.append(note)
     